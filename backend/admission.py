@@ -0,0 +1,107 @@
+"""Registration admission: outcomes, and fast answers for full events.
+
+Seats are counted in the database (crud.admit_registration takes one with a
+conditional UPDATE of the event's rollup), which is what keeps an event from
+being overbooked. This module only saves the database from the herd that
+keeps knocking once the last seat is gone: when a registration finds an
+event full, the worker reads who holds its seats once and remembers both
+for ADMISSION_FULL_TTL_SECONDS. The next registrants are answered from that
+memory, "full" or "already registered", without touching the registrations
+table, the seat UPDATE or the write lock. Registrations that ask to join
+the waitlist still go to the database, to get their place in line.
+
+Each worker also queues its registrations for an event (AdmissionQueues)
+and sends them to the database one at a time. Taking seats for an event is
+serialized by the database anyway (one SQLite writer; PostgreSQL locks the
+rollup row), so this costs no throughput: it hands the seat over in arrival
+order instead of leaving a crowd of connections busy-waiting on the write
+lock, and once the event fills, everyone still in the queue is answered
+from memory.
+
+The memory is per worker. A cancellation or a capacity change clears it in
+the worker that handled it; other workers notice when it expires, so a seat
+freed elsewhere can be refused for up to the TTL (and with a waitlist, the
+freed seat goes to the front of the queue anyway). For as long, a student
+promoted or cancelled through another worker can get "full" where
+"already registered" would be right, or the other way round.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from config import ADMISSION_FULL_TTL_SECONDS
+
+# admit_registration outcomes
+ADMITTED = "admitted"
+ALREADY_REGISTERED = "already_registered"
+FULL = "full"
+WAITLISTED = "waitlisted"
+
+# cancel_registration outcomes
+CANCELLED = "cancelled"
+CHECKED_IN = "checked_in"
+NOT_FOUND = "not_found"
+
+class FullEvents:
+    """Events recently found full, by (shard, event_id), with the students
+    holding their seats at the time"""
+
+    def __init__(self, ttl_seconds: float = ADMISSION_FULL_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._until: Dict[Tuple[int, int], Tuple[float, FrozenSet[int]]] = {}
+        self._lock = threading.Lock()
+        self.fast_refusals = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def refusal(self, shard: int, event_id: int, student_id: int) -> Optional[str]:
+        """FULL or ALREADY_REGISTERED while the event is remembered as full, else None"""
+        entry = self._until.get((shard, event_id))
+        if entry is None:
+            return None
+        until, registered = entry
+        if until <= time.monotonic():
+            with self._lock:
+                self._until.pop((shard, event_id), None)
+            return None
+        self.fast_refusals += 1
+        return ALREADY_REGISTERED if student_id in registered else FULL
+
+    def mark_full(self, shard: int, event_id: int, registered: Iterable[int]):
+        if self.enabled:
+            with self._lock:
+                if len(self._until) >= 10000:
+                    now = time.monotonic()
+                    self._until = {key: entry for key, entry in self._until.items() if entry[0] > now}
+                self._until[(shard, event_id)] = (time.monotonic() + self.ttl_seconds, frozenset(registered))
+
+    def clear(self, shard: int, event_id: int):
+        with self._lock:
+            self._until.pop((shard, event_id), None)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "full_events": sum(1 for until, _ in self._until.values() if until > now),
+            "fast_refusals": self.fast_refusals,
+        }
+
+class AdmissionQueues:
+    """A FIFO lock per (shard, event_id), dropped once nobody holds or awaits it"""
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[Tuple[int, int], asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def turn(self, shard: int, event_id: int) -> asyncio.Lock:
+        lock = self._locks.get((shard, event_id))
+        if lock is None:
+            lock = self._locks[(shard, event_id)] = asyncio.Lock()
+        return lock
+
+full_events = FullEvents()
+admission_queues = AdmissionQueues()
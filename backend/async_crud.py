@@ -0,0 +1,186 @@
+"""Async counterparts of the functions in crud.py.
+
+Each function takes an AsyncSession and runs the matching crud.py function on
+the session's sync facade via AsyncSession.run_sync. The queries are the same
+ones crud.py issues, but every round trip is awaited through the async driver
+(aiosqlite / asyncpg), so the event loop is free while the database works.
+Keeping crud.py as the single implementation means the two can't drift.
+
+Event and college lookups go through lookup_cache, and the writes that change
+them invalidate it.
+"""
+import functools
+import json
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import DateTime, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+from crud import STREAM_BATCH_SIZE
+from database import AsyncSessionLocal, session_shard
+from lookup_cache import lookup_cache
+from models import College, Event
+
+def _awaitable(crud_function):
+    @functools.wraps(crud_function)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(crud_function, *args, **kwargs)
+    return wrapper
+
+def _row(instance) -> dict:
+    """Column values of a model instance, JSON-ready for the shared cache tier."""
+    row = {}
+    for column in instance.__table__.columns:
+        value = getattr(instance, column.key)
+        row[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+def _instance(model, row: dict):
+    """A new session-less instance built from a cached row; safe to modify."""
+    values = {}
+    for column in model.__table__.columns:
+        value = row[column.key]
+        values[column.key] = datetime.fromisoformat(value) if value is not None and isinstance(column.type, DateTime) else value
+    return model(**values)
+
+def _cached(crud_function, model, tag):
+    """Read-through cached version of a crud lookup returning `model` rows.
+
+    `tag(shard, *args, **kwargs)` names the invalidation tag. Misses load from
+    the shard's primary, never a replica, so a lagging replica can't put an
+    old row back into the cache right after a write invalidated it. A read
+    session that is already on the primary loads through its own connection,
+    so a burst of misses can't tie up the pool with requests each holding one
+    connection and waiting for another.
+    """
+    @functools.wraps(crud_function)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        shard = session_shard(db)
+
+        async def load():
+            if db.info.get("primary_read"):
+                result = await db.run_sync(crud_function, *args, **kwargs)
+            else:
+                async with AsyncSessionLocal(info={"shard": shard}) as primary:
+                    result = await primary.run_sync(crud_function, *args, **kwargs)
+            if result is None:
+                return None
+            return [_row(instance) for instance in result] if isinstance(result, list) else _row(result)
+
+        params = json.dumps([args, kwargs], sort_keys=True)
+        value = await lookup_cache.get(tag(shard, *args, **kwargs), params, load)
+        if value is None:
+            return None
+        return [_instance(model, row) for row in value] if isinstance(value, list) else _instance(model, value)
+    return wrapper
+
+def _invalidating(crud_function, tags):
+    """Run a committing crud write, then invalidate `tags(shard, *args, **kwargs)`."""
+    @functools.wraps(crud_function)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        result = await db.run_sync(crud_function, *args, **kwargs)
+        await lookup_cache.invalidate(*tags(session_shard(db), *args, **kwargs))
+        return result
+    return wrapper
+
+def _event_tag(shard: int, event_id: int, *args, **kwargs) -> str:
+    return f"event:{shard}:{event_id}"
+
+def _college_tag(shard: int, college_id: int) -> str:
+    return f"college:{shard}:{college_id}"
+
+def _colleges_tag(shard: int, *args, **kwargs) -> str:
+    return f"colleges:{shard}"
+
+# Resource versions (ETags)
+get_resource_versions = _awaitable(crud.get_resource_versions)
+
+# User CRUD operations
+create_user = _awaitable(crud.create_user)
+get_user_by_email = _awaitable(crud.get_user_by_email)
+get_user_by_id = _awaitable(crud.get_user_by_id)
+update_user = _awaitable(crud.update_user)
+update_user_password_hash = _awaitable(crud.update_user_password_hash)
+get_users = _awaitable(crud.get_users)
+get_existing_emails = _awaitable(crud.get_existing_emails)
+get_user_ids_by_email = _awaitable(crud.get_user_ids_by_email)
+bulk_insert_users = _awaitable(crud.bulk_insert_users)
+
+# College CRUD operations
+create_college = _invalidating(crud.create_college, lambda shard, *args: [_colleges_tag(shard)])
+get_colleges = _cached(crud.get_colleges, College, _colleges_tag)
+get_college_by_id = _cached(crud.get_college_by_id, College, _college_tag)
+copy_college = _invalidating(crud.copy_college, lambda shard, college_id, name: [_colleges_tag(shard), _college_tag(shard, college_id)])
+get_existing_college_names = _awaitable(crud.get_existing_college_names)
+get_colleges_by_name = _awaitable(crud.get_colleges_by_name)
+bulk_insert_colleges = _awaitable(crud.bulk_insert_colleges)
+
+# Event CRUD operations
+create_event = _awaitable(crud.create_event)
+get_events = _awaitable(crud.get_events)
+get_events_by_date = _awaitable(crud.get_events_by_date)
+get_event_by_id = _cached(crud.get_event_by_id, Event, _event_tag)
+get_existing_event_ids = _awaitable(crud.get_existing_event_ids)
+update_event = _invalidating(crud.update_event, lambda shard, event_id, *args: [_event_tag(shard, event_id)])
+delete_event = _invalidating(crud.delete_event, lambda shard, event_id: [_event_tag(shard, event_id)])
+search_events = _awaitable(crud.search_events)
+
+# Registration CRUD operations
+admit_registration = _awaitable(crud.admit_registration)
+cancel_registration = _awaitable(crud.cancel_registration)
+fill_from_waitlist = _awaitable(crud.fill_from_waitlist)
+leave_waitlist = _awaitable(crud.leave_waitlist)
+bulk_insert_registrations = _awaitable(crud.bulk_insert_registrations)
+get_registration = _awaitable(crud.get_registration)
+get_registration_id = _awaitable(crud.get_registration_id)
+get_registered_student_ids = _awaitable(crud.get_registered_student_ids)
+get_registration_by_id = _awaitable(crud.get_registration_by_id)
+get_user_registrations = _awaitable(crud.get_user_registrations)
+get_event_registrations = _awaitable(crud.get_event_registrations)
+get_all_registrations = _awaitable(crud.get_all_registrations)
+
+# Attendance CRUD operations
+create_attendance = _awaitable(crud.create_attendance)
+get_attendance = _awaitable(crud.get_attendance)
+bulk_create_attendance = _awaitable(crud.bulk_create_attendance)
+insert_attendance_rows = _awaitable(crud.insert_attendance_rows)
+get_event_roster = _awaitable(crud.get_event_roster)
+get_user_attendance = _awaitable(crud.get_user_attendance)
+get_all_attendance = _awaitable(crud.get_all_attendance)
+
+# Feedback CRUD operations
+create_feedback = _awaitable(crud.create_feedback)
+get_user_feedback = _awaitable(crud.get_user_feedback)
+get_event_feedback = _awaitable(crud.get_event_feedback)
+get_all_feedback = _awaitable(crud.get_all_feedback)
+
+# Rating summary operations
+get_event_rating_summary = _awaitable(crud.get_event_rating_summary)
+get_event_average_ratings = _awaitable(crud.get_event_average_ratings)
+get_event_average_rating = _awaitable(crud.get_event_average_rating)
+rebuild_event_rating_summaries = _awaitable(crud.rebuild_event_rating_summaries)
+ensure_event_rating_summaries = _awaitable(crud.ensure_event_rating_summaries)
+
+# Activity rollups
+reconcile_activity_rollups = _awaitable(crud.reconcile_activity_rollups)
+ensure_activity_rollups = _awaitable(crud.ensure_activity_rollups)
+get_event_counters = _awaitable(crud.get_event_counters)
+get_top_events = _awaitable(crud.get_top_events)
+get_top_students = _awaitable(crud.get_top_students)
+get_activity_breakdown = _awaitable(crud.get_activity_breakdown)
+
+# Column rows and streaming
+get_rows = _awaitable(crud.get_rows)
+get_max_id = _awaitable(crud.get_max_id)
+
+async def stream_rows(db: AsyncSession, model, batch_size: int = STREAM_BATCH_SIZE, **filters) -> AsyncIterator:
+    """Async version of crud.iter_rows: plain column rows in id order, fetched
+    `batch_size` at a time from a server-side cursor."""
+    query = select(*model.__table__.columns).order_by(model.id)
+    for column, value in filters.items():
+        query = query.filter(getattr(model, column) == value)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for row in result:
+        yield row
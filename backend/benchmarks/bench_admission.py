@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Registration rush: thousands of students for the 500 seats of one event.
+
+Generates a scratch database with generate_data.py at `--scale`, adds
+`--registrants` students to the opening event's college, and has all of
+them POST /registrations for the opening event (500 seats), `--concurrency`
+at a time, against `uvicorn main:app`. Each registrant in flight has a
+connection of its own, as browsers would: sharing one client's pool among
+hundreds of requests left them waiting seconds for a connection on a small
+machine once the server answered quickly, which showed up as latency. Runs twice on copies of the same
+database: with ADMISSION_FULL_TTL_SECONDS=0 (every refusal runs the seat
+UPDATE) and with `--full-ttl` (refusals answered from memory once the
+event has been found full). Reports per round:
+
+- admitted, refused ("full", or "waitlisted" with `--join-waitlist`) and
+  failed requests, and the registrations actually stored for the event;
+  more than 500 would be an overbooking
+- p50/p95 latency of admissions and of refusals, and requests per second
+- database statements run by POST /registrations, from /metrics
+- how many refusals were answered from memory (/registrations/admission-stats)
+
+Usage (from the backend directory):
+    python benchmarks/bench_admission.py --registrants 3000 --concurrency 500
+    python benchmarks/bench_admission.py --registrants 3000 --join-waitlist
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from bench_live_counters import free_port, wait_until_up
+
+METRIC_LINE = re.compile(r'^db_queries_total\{method="POST",route="/registrations"\} (\S+)$')
+
+def add_registrants(database_path: str, college_id: int, count: int) -> list:
+    """Insert `count` students at the college and return their ids"""
+    now = datetime.utcnow()
+    connection = sqlite3.connect(database_path)
+    with connection:
+        password_hash = connection.execute("SELECT hashed_password FROM users LIMIT 1").fetchone()[0]
+        first = connection.execute("SELECT MAX(id) FROM users").fetchone()[0] + 1
+        ids = list(range(first, first + count))
+        connection.executemany(
+            "INSERT INTO users (id, email, full_name, hashed_password, role, college_id, is_active, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'student', ?, 1, ?, ?)",
+            [(user_id, f"rush{user_id}@bench.local", f"Rush {user_id}", password_hash, college_id, now, now) for user_id in ids])
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # each round copies the file on its own
+    connection.close()
+    return ids
+
+def percentile(samples: list, share: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * share))] * 1000, 1)
+
+async def rush(args, base_url: str, database_path: str, manifest: dict, students: list) -> dict:
+    from auth import create_access_token
+
+    def headers(user_id: int, role: str, college_id: int) -> dict:
+        token = create_access_token(data={"sub": str(user_id), "college_id": college_id, "role": role}, expires_delta=timedelta(hours=1))
+        return {"Authorization": f"Bearer {token}"}
+
+    async def statements(client: httpx.AsyncClient) -> float:
+        response = await client.get("/metrics")
+        return sum(float(match.group(1)) for match in map(METRIC_LINE.match, response.text.splitlines()) if match)
+
+    event_id, college_id = manifest["opening_event_id"], manifest["opening_event_college_id"]
+    with sqlite3.connect(database_path) as connection:
+        admin = connection.execute("SELECT id FROM users WHERE role = 'admin' AND college_id = ?", (college_id,)).fetchone()[0]
+    tokens = [headers(student_id, "student", college_id) for student_id in students]
+    body = {"event_id": event_id, "join_waitlist": args.join_waitlist}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        queries_before = await statements(client)
+        results = {"admitted": [], "refused": [], "failed": []}
+        positions = []
+        connected, start = asyncio.Semaphore(0), asyncio.Event()
+        queue = list(tokens)
+
+        async def registrant():
+            async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=1)) as browser:
+                await browser.get("/")  # connect before the rush starts
+                connected.release()
+                await start.wait()
+                while queue:
+                    student_headers = queue.pop()
+                    started = time.perf_counter()
+                    try:
+                        response = await browser.post("/registrations", json=body, headers=student_headers)
+                    except httpx.TransportError:
+                        results["failed"].append(time.perf_counter() - started)
+                        continue
+                    elapsed = time.perf_counter() - started
+                    if response.status_code == 200:
+                        results["admitted"].append(elapsed)
+                    elif response.status_code in (202, 409):
+                        results["refused"].append(elapsed)
+                        if response.status_code == 202:
+                            positions.append(response.json()["position"])
+                    else:
+                        results["failed"].append(elapsed)
+
+        workers = [asyncio.create_task(registrant()) for _ in range(args.concurrency)]
+        for _ in workers:
+            await connected.acquire()
+        started = time.perf_counter()
+        start.set()
+        await asyncio.gather(*workers)
+        seconds = time.perf_counter() - started
+        queries = await statements(client) - queries_before
+        admission = (await client.get("/registrations/admission-stats", headers=headers(admin, "admin", college_id))).json()
+
+    with sqlite3.connect(database_path) as connection:
+        stored = connection.execute("SELECT COUNT(*) FROM registrations WHERE event_id = ?", (event_id,)).fetchone()[0]
+        waitlisted = connection.execute("SELECT COUNT(*) FROM waitlist_entries WHERE event_id = ?", (event_id,)).fetchone()[0]
+        seats = connection.execute("SELECT max_attendees FROM events WHERE id = ?", (event_id,)).fetchone()[0]
+    requests = len(students)
+    return {
+        "full_ttl_seconds": admission["ttl_seconds"],
+        "seconds": round(seconds, 2),
+        "requests_per_second": round(requests / seconds),
+        "seats": seats,
+        "admitted": len(results["admitted"]),
+        "refused": len(results["refused"]),
+        "failed": len(results["failed"]),
+        "registrations_stored": stored,
+        "overbooked": max(0, stored - seats),
+        "waitlist_entries": waitlisted,
+        "waitlist_positions_in_order": sorted(positions) == list(range(1, len(positions) + 1)),
+        "admitted_p50_ms": percentile(results["admitted"], 0.5),
+        "admitted_p95_ms": percentile(results["admitted"], 0.95),
+        "refused_p50_ms": percentile(results["refused"], 0.5),
+        "refused_p95_ms": percentile(results["refused"], 0.95),
+        "db_statements": round(queries),
+        "db_statements_per_request": round(queries / requests, 2),
+        "fast_refusals": admission["fast_refusals"],
+    }
+
+def run_round(args, template_path: str, scratch: str, manifest: dict, students: list, full_ttl: float) -> dict:
+    database_path = os.path.join(scratch, f"rush-{full_ttl:g}.db")
+    shutil.copyfile(template_path, database_path)
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}", "ROLLUP_RECONCILE_INTERVAL_SECONDS": "0",
+           "ADMISSION_FULL_TTL_SECONDS": str(full_ttl), "METRICS_TOKEN": ""}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+                               "--backlog", str(max(2048, args.concurrency * 2)), "--timeout-keep-alive", "60"],
+                              cwd=BACKEND_DIR, env=env, stderr=subprocess.DEVNULL)
+    try:
+        async def drive():
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                await wait_until_up(client, server)
+            return await rush(args, f"http://127.0.0.1:{port}", database_path, manifest, students)
+        return asyncio.run(drive())
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=0.1, help="generate_data.py scale for the rest of the database")
+    parser.add_argument("--registrants", type=int, default=3000, help="students rushing the opening event")
+    parser.add_argument("--concurrency", type=int, default=500, help="registrations in flight at once")
+    parser.add_argument("--full-ttl", type=float, default=2, help="ADMISSION_FULL_TTL_SECONDS for the second round")
+    parser.add_argument("--join-waitlist", action="store_true", help="every registrant asks to join the waitlist when full")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        template_path = os.path.join(scratch, "template.db")
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "generate_data.py"), "--database", template_path,
+                        "--scale", str(args.scale)], check=True, stdout=subprocess.DEVNULL)
+        with open(template_path + ".json") as handle:
+            manifest = json.load(handle)
+        students = add_registrants(template_path, manifest["opening_event_college_id"], args.registrants)
+        rounds = [run_round(args, template_path, scratch, manifest, students, full_ttl) for full_ttl in (0, args.full_ttl)]
+
+    result = {"registrants": args.registrants, "concurrency": args.concurrency, "join_waitlist": args.join_waitlist, "rounds": rounds}
+    print(f"{args.registrants} registrants, {args.concurrency} at a time, for {rounds[0]['seats']} seats"
+          f"{' (joining the waitlist)' if args.join_waitlist else ''}")
+    for name, result_round in zip(("no full-event memory", f"full for {args.full_ttl:g} s"), rounds):
+        print(f"{name:>22}: {result_round['admitted']} admitted, {result_round['refused']} refused, {result_round['failed']} failed, "
+              f"{result_round['registrations_stored']} stored ({result_round['overbooked']} overbooked) in {result_round['seconds']} s; "
+              f"admitted p50 {result_round['admitted_p50_ms']} ms, refused p50 {result_round['refused_p50_ms']} ms "
+              f"(p95 {result_round['refused_p95_ms']} ms); {result_round['db_statements_per_request']} statements/request, "
+              f"{result_round['fast_refusals']} refused from memory")
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Concurrent-request throughput: sync Session vs AsyncSession inside `async def` routes.
+
+Builds a scratch SQLite database, then serves the same two routes from two
+FastAPI apps:
+
+- "sync":  async def route + blocking Session + crud.py (the old main.py pattern)
+- "async": async def route + AsyncSession (aiosqlite) running crud.py via run_sync,
+  as async_crud.py does (bypassing its lookup cache, which would hide the
+  database from the measurement)
+
+While `--slow-clients` clients keep a heavy report query running, `--concurrency`
+clients hammer GET /events/{id}. With a blocking session every slow query
+stalls the event loop, so the cheap lookups queue behind it.
+
+Both engines get a pool large enough for every client. With the default
+pool (5 + 10 overflow) the sync variant doesn't just slow down: a request
+blocked in pool checkout holds the event loop, so the requests that would
+return connections can't run and the worker stalls until the pool timeout.
+
+Usage (from the backend directory):
+    python benchmarks/bench_async_db.py --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import crud
+from database import Base
+from models import College, Event, Feedback, User
+
+# Deliberately unindexed self-join standing in for an expensive admin report
+SLOW_REPORT_SQL = text(
+    "SELECT COUNT(*) FROM feedback f1 JOIN feedback f2 ON f1.rating = f2.rating "
+    "WHERE f1.id < :window"
+)
+
+def seed(url: str, events: int, feedback: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(College(id=1, name="Bench College"))
+        db.add(User(id=1, email="admin@bench.local", hashed_password="x", full_name="Admin", role="admin", college_id=1))
+        db.flush()
+        db.execute(insert(Event), [
+            dict(id=i, title=f"Event {i}", type="Workshop", date=datetime(2030, 1, 1), college_id=1, created_by=1)
+            for i in range(1, events + 1)
+        ])
+        db.execute(insert(Feedback), [
+            dict(registration_id=i, student_id=1, event_id=1 + i % events, rating=1 + i % 5)
+            for i in range(1, feedback + 1)
+        ])
+        db.commit()
+    engine.dispose()
+
+def sync_app(url: str, slow_window: int, pool_size: int) -> FastAPI:
+    engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=pool_size)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/events/{event_id}")
+    async def get_event(event_id: int, db: Session = Depends(get_db)):
+        return {"title": crud.get_event_by_id(db, event_id).title}
+
+    @app.get("/report")
+    async def report(db: Session = Depends(get_db)):
+        return {"count": db.execute(SLOW_REPORT_SQL, {"window": slow_window}).scalar()}
+
+    return app
+
+def async_app(url: str, slow_window: int, pool_size: int) -> FastAPI:
+    engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=AsyncAdaptedQueuePool, pool_size=pool_size
+    )
+    SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    app = FastAPI()
+
+    async def get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    @app.get("/events/{event_id}")
+    async def get_event(event_id: int, db: AsyncSession = Depends(get_db)):
+        return {"title": (await db.run_sync(crud.get_event_by_id, event_id)).title}
+
+    @app.get("/report")
+    async def report(db: AsyncSession = Depends(get_db)):
+        return {"count": (await db.execute(SLOW_REPORT_SQL, {"window": slow_window})).scalar()}
+
+    return app
+
+async def drive(app: FastAPI, args) -> dict:
+    latencies = []
+    remaining = args.requests
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def fast_client(worker: int):
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                response = await client.get(f"/events/{1 + (remaining + worker) % args.events}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        async def slow_client():
+            while not done.is_set():
+                (await client.get("/report")).raise_for_status()
+
+        slow_tasks = [asyncio.create_task(slow_client()) for _ in range(args.slow_clients)]
+        started = time.perf_counter()
+        await asyncio.gather(*(fast_client(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*slow_tasks)
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--slow-clients", type=int, default=2)
+    parser.add_argument("--slow-window", type=int, default=400, help="rows joined by the slow report query")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--feedback", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        url = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+        seed(url, args.events, args.feedback)
+        pool_size = args.concurrency + args.slow_clients
+        results = {
+            "sync_session": asyncio.run(drive(sync_app(url, args.slow_window, pool_size), args)),
+            "async_session": asyncio.run(drive(async_app(url, args.slow_window, pool_size), args)),
+        }
+
+    for name, result in results.items():
+        print(f"{name:14} {result['throughput_rps']:>9} req/s   p50 {result['p50_ms']:>8} ms   p99 {result['p99_ms']:>8} ms")
+    print(json.dumps(results))
+
+if __name__ == "__main__":
+    main()
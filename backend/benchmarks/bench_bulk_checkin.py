@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Offline scanner sync: one bulk check-in vs replaying scans one at a time.
+
+Seeds a scratch SQLite database with one event and `--scans` registered
+students, then checks them all in twice:
+
+- "per_scan": what replaying POST /attendance/qr does per scan (registration
+  lookup + insert + commit)
+- "bulk":     crud.bulk_create_attendance, as used by POST /attendance/qr/batch
+
+Both paths parse every QR payload with qr_codes.parse_attendance_qr.
+
+Usage (from the backend directory):
+    python benchmarks/bench_bulk_checkin.py --scans 1000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import Session
+
+import crud
+from database import Base
+from models import Attendance, College, Event, Registration, User
+from qr_codes import parse_attendance_qr
+from schemas import AttendanceCreate
+
+EVENT_ID = 1
+
+def seed(engine, students: int) -> None:
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(College(id=1, name="Bench College"))
+        db.flush()
+        db.execute(insert(User), [
+            dict(id=i, email=f"student{i}@bench.local", hashed_password="x", full_name=f"Student {i}", college_id=1)
+            for i in range(1, students + 1)
+        ])
+        db.add(Event(id=EVENT_ID, title="Fest", type="Fest", date=datetime(2030, 1, 1), college_id=1, created_by=1))
+        db.flush()
+        db.execute(insert(Registration), [dict(student_id=i, event_id=EVENT_ID) for i in range(1, students + 1)])
+        db.commit()
+
+def scans(students: int) -> list:
+    return [json.dumps({"type": "attendance", "eventId": EVENT_ID, "studentId": i}) for i in range(1, students + 1)]
+
+def per_scan(engine, payloads: list) -> None:
+    with Session(engine) as db:
+        for payload in payloads:
+            qr_code = parse_attendance_qr(payload, EVENT_ID)
+            registration = crud.get_registration(db, qr_code.student_id, EVENT_ID)
+            crud.create_attendance(db, AttendanceCreate(registration_id=registration.id, event_id=EVENT_ID), qr_code.student_id)
+
+def bulk(engine, payloads: list) -> None:
+    with Session(engine) as db:
+        checkins = [(parse_attendance_qr(payload, EVENT_ID).student_id, None) for payload in payloads]
+        results = crud.bulk_create_attendance(db, EVENT_ID, checkins)
+        assert all(status == "marked" for status, _ in results)
+
+def timed(function, engine, payloads) -> float:
+    with Session(engine) as db:
+        db.execute(delete(Attendance))
+        db.commit()
+    started = time.perf_counter()
+    function(engine, payloads)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+        seed(engine, args.scans)
+        payloads = scans(args.scans)
+        results = {
+            "per_scan_seconds": round(timed(per_scan, engine, payloads), 4),
+            "bulk_seconds": round(timed(bulk, engine, payloads), 4),
+        }
+        engine.dispose()
+
+    results["scans"] = args.scans
+    results["speedup"] = round(results["per_scan_seconds"] / results["bulk_seconds"], 1)
+    print(f"{args.scans} scans: per-scan {results['per_scan_seconds']}s, bulk {results['bulk_seconds']}s ({results['speedup']}x)")
+    print(json.dumps(results))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+"Upcoming events at my college" as the events table grows.
+
+For each size in `--sizes`, builds a scratch SQLite database with that many
+events spread over `--colleges` colleges and dates from two years back to
+two years ahead, then times the first page (`--limit` rows) of a student's
+upcoming events two ways:
+
+- "scan": the same query with the events indexes disabled (NOT INDEXED), so
+  SQLite reads every event and sorts the college's upcoming ones, as it must
+  without a (college_id, date) index
+- "index": crud.get_events_by_date, as GET /events?when=upcoming runs it,
+  which walks ix_events_college_id_date in date order and stops after
+  `--limit` rows
+
+Also times the next page through the keyset cursor, checks both ways return
+the same rows, and prints each query plan.
+
+Usage (from the backend directory):
+    python benchmarks/bench_college_events.py --sizes 10000,100000,400000 --colleges 50
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import Session
+
+import crud
+from database import Base
+from fast_json import schema_columns
+from models import College, Event, User
+from schemas import EventResponse
+
+COLUMNS = schema_columns(EventResponse, Event)
+NOW = datetime(2030, 1, 1)
+EVENT_TYPES = ["Workshop", "Fest", "Seminar", "Hackathon", "Tech Talk"]
+
+def seed(engine, events: int, colleges: int) -> None:
+    Base.metadata.create_all(engine)
+    rng = random.Random(events)
+    with Session(engine) as db:
+        db.execute(insert(College), [dict(id=i, name=f"College {i}") for i in range(1, colleges + 1)])
+        db.add(User(id=1, email="admin@bench.local", hashed_password="x", full_name="Admin", role="admin", college_id=1))
+        db.flush()
+        for start in range(0, events, 50000):
+            db.execute(insert(Event), [
+                dict(id=i, title=f"Event {i}", type=rng.choice(EVENT_TYPES), location="Main Hall",
+                     date=NOW + timedelta(minutes=rng.randint(-2 * 525600, 2 * 525600)),
+                     college_id=rng.randint(1, colleges), created_by=1)
+                for i in range(start + 1, min(start + 50000, events) + 1)
+            ])
+        db.commit()
+    with engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+def full_scan(db: Session, college_id: int, limit: int) -> list:
+    names = ", ".join(column.key for column in COLUMNS)
+    return db.execute(text(
+        f"SELECT {names} FROM events NOT INDEXED WHERE college_id = :college_id AND date >= :now ORDER BY date, id LIMIT :limit"
+    ), {"college_id": college_id, "now": NOW, "limit": limit}).all()
+
+def indexed(db: Session, college_id: int, limit: int, after_id=None) -> list:
+    return crud.get_events_by_date(db, COLUMNS, college_id, date_from=NOW, limit=limit, after_id=after_id)
+
+def query_plan(engine, run) -> str:
+    """EXPLAIN QUERY PLAN for the last statement `run` executes"""
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", capture)
+    with Session(engine) as db:
+        run(db)
+    event.remove(engine, "before_cursor_execute", capture)
+    statement, parameters = statements[-1]
+    with engine.connect() as connection:
+        return "; ".join(row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+
+def time_query(engine, run, repeat: int) -> float:
+    samples = []
+    with Session(engine) as db:
+        run(db)  # warm the page cache
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run(db)
+            samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,400000", help="comma-separated event counts")
+    parser.add_argument("--colleges", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for size in (int(value) for value in args.sizes.split(",")):
+            engine = create_engine(f"sqlite:///{os.path.join(scratch, f'bench_{size}.db')}")
+            seed(engine, size, args.colleges)
+            college_id = args.colleges // 2
+            with Session(engine) as db:
+                first_page = indexed(db, college_id, args.limit)
+                if [row.id for row in first_page] != [row.id for row in full_scan(db, college_id, args.limit)]:
+                    sys.exit("indexed query returned different rows from the full scan")
+            cursor = first_page[-1].id
+            results.append({
+                "events": size,
+                "scan_ms": time_query(engine, lambda db: full_scan(db, college_id, args.limit), args.repeat),
+                "index_ms": time_query(engine, lambda db: indexed(db, college_id, args.limit), args.repeat),
+                "index_next_page_ms": time_query(engine, lambda db: indexed(db, college_id, args.limit, cursor), args.repeat),
+                "scan_plan": query_plan(engine, lambda db: full_scan(db, college_id, args.limit)),
+                "index_plan": query_plan(engine, lambda db: indexed(db, college_id, args.limit)),
+            })
+            engine.dispose()
+
+    for result in results:
+        print(f"{result['events']:>9} events   scan {result['scan_ms']:>9} ms   index {result['index_ms']:>7} ms   next page {result['index_next_page_ms']:>7} ms")
+    print(f"scan plan:  {results[-1]['scan_plan']}")
+    print(f"index plan: {results[-1]['index_plan']}")
+    print(json.dumps({"colleges": args.colleges, "limit": args.limit, "results": results}))
+
+if __name__ == "__main__":
+    main()
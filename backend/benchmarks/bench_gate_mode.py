@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Gate check-in throughput: database-backed scans vs gate mode.
+
+Seeds a scratch SQLite database with one event and `--students` registered
+students and checks every student in (plus `--repeat-ratio` re-scans, as
+happens at a real gate):
+
+- "database":  the per-scan path of POST /attendance/qr (event lookup,
+  registration lookup, conflict-checked insert, commit)
+- "gate_mode": gate_mode.EventRoster validation from memory, with the
+  pending rows written by crud.insert_attendance_rows every `--flush-batch`
+  scans, as the background flusher does
+
+Usage (from the backend directory):
+    python benchmarks/bench_gate_mode.py --students 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+import crud
+from database import Base
+from gate_mode import EventRoster
+from models import Attendance, College, Event, Registration, User
+from schemas import AttendanceCreate
+
+EVENT_ID = 1
+
+def seed(engine, students: int) -> None:
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(College(id=1, name="Bench College"))
+        db.flush()
+        db.execute(insert(User), [
+            dict(id=i, email=f"student{i}@bench.local", hashed_password="x", full_name=f"Student {i}", college_id=1)
+            for i in range(1, students + 1)
+        ])
+        db.add(Event(id=EVENT_ID, title="Fest", type="Fest", date=datetime(2030, 1, 1), college_id=1, created_by=1))
+        db.flush()
+        db.execute(insert(Registration), [dict(student_id=i, event_id=EVENT_ID) for i in range(1, students + 1)])
+        db.commit()
+
+def database_path(engine, student_ids: list, args) -> None:
+    with Session(engine) as db:
+        for student_id in student_ids:
+            crud.get_event_by_id(db, EVENT_ID)
+            registration = crud.get_registration(db, student_id, EVENT_ID)
+            crud.create_attendance(db, AttendanceCreate(registration_id=registration.id, event_id=EVENT_ID), student_id)
+
+def gate_mode_path(engine, student_ids: list, args) -> None:
+    with Session(engine) as db:
+        event = crud.get_event_by_id(db, EVENT_ID)
+        registrations, attended = crud.get_event_roster(db, EVENT_ID)
+        roster = EventRoster(event.id, event.title, registrations, attended)
+        for scanned, student_id in enumerate(student_ids, start=1):
+            roster.check_in(student_id)
+            if scanned % args.flush_batch == 0:
+                crud.insert_attendance_rows(db, roster.drain())
+        crud.insert_attendance_rows(db, roster.drain())
+
+def timed(function, engine, student_ids, args) -> dict:
+    with Session(engine) as db:
+        db.execute(delete(Attendance))
+        db.commit()
+    started = time.perf_counter()
+    function(engine, student_ids, args)
+    elapsed = time.perf_counter() - started
+    with Session(engine) as db:
+        rows = db.scalar(select(func.count()).select_from(Attendance))
+    return {"seconds": round(elapsed, 4), "scans_per_second": round(len(student_ids) / elapsed), "rows": rows}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--repeat-ratio", type=float, default=0.1, help="fraction of extra duplicate scans")
+    parser.add_argument("--flush-batch", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    student_ids = list(range(1, args.students + 1))
+    student_ids += rng.sample(student_ids, int(args.students * args.repeat_ratio))
+    rng.shuffle(student_ids)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+        seed(engine, args.students)
+        results = {
+            "database": timed(database_path, engine, student_ids, args),
+            "gate_mode": timed(gate_mode_path, engine, student_ids, args),
+        }
+        engine.dispose()
+
+    for name, result in results.items():
+        print(f"{name:10} {result['scans_per_second']:>9} scans/s  ({len(student_ids)} scans, {result['rows']} rows written)")
+    print(json.dumps(results))
+
+if __name__ == "__main__":
+    main()
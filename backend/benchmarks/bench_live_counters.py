@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Check-in dashboards: polling /attendance/all vs the live counters stream.
+
+Generates a scratch database with generate_data.py at `--scale`, starts
+`uvicorn main:app` on it, opens `--subscribers` streams on
+GET /events/{id}/live for the opening event, then makes `--writes`
+registrations for it (`--write-concurrency` at once). Reports:
+
+- how many updates and bytes each subscriber received, and how many
+  counter queries the publisher ran for all of them
+- the lag from the last write to every subscriber seeing the final count
+- what the same dashboards cost polling /attendance/all every
+  `--poll-seconds` instead: bytes and time of one poll, scaled to the
+  subscribers and the length of the burst
+
+Usage (from the backend directory):
+    python benchmarks/bench_live_counters.py --subscribers 200 --writes 250
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def wait_until_up(client: httpx.AsyncClient, server: subprocess.Popen):
+    for _ in range(300):
+        if server.poll() is not None:
+            sys.exit("uvicorn exited during startup")
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    sys.exit("uvicorn didn't start")
+
+async def run(args, base_url: str, database_path: str, manifest: dict) -> dict:
+    from auth import create_access_token
+
+    def headers(user_id: int, role: str, college_id: int) -> dict:
+        token = create_access_token(data={"sub": str(user_id), "college_id": college_id, "role": role}, expires_delta=timedelta(hours=1))
+        return {"Authorization": f"Bearer {token}"}
+
+    event_id, college_id = manifest["opening_event_id"], manifest["opening_event_college_id"]
+    with sqlite3.connect(database_path) as connection:
+        students = [row[0] for row in connection.execute(
+            "SELECT id FROM users WHERE role = 'student' AND college_id = ? ORDER BY id LIMIT ?", (college_id, args.writes))]
+        admin = connection.execute("SELECT id FROM users WHERE role = 'admin' AND college_id = ?", (college_id,)).fetchone()[0]
+    admin_headers = headers(admin, "admin", college_id)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        received = []  # per subscriber: [updates, bytes, time the final count arrived]
+        ready = asyncio.Event()
+
+        async def subscriber(slot: list):
+            async with client.stream("GET", f"/events/{event_id}/live", params={"college_id": college_id}, headers=admin_headers) as response:
+                async for line in response.aiter_lines():
+                    slot[1] += len(line) + 1
+                    if not line.startswith("data:"):
+                        continue
+                    slot[0] += 1
+                    if slot[0] == 1 and sum(1 for other in received if other[0]) == args.subscribers:
+                        ready.set()
+                    if json.loads(line[5:])["registered"] >= len(students):
+                        slot[2] = time.perf_counter()
+                        return
+
+        streams = []
+        for _ in range(args.subscribers):
+            received.append([0, 0, None])
+            streams.append(asyncio.create_task(subscriber(received[-1])))
+        await asyncio.wait_for(ready.wait(), 60)
+        before = (await client.get("/live/counter-stats", headers=admin_headers)).json()
+
+        queue = list(students)
+        started = time.perf_counter()
+
+        async def writer():
+            while queue:
+                student_id = queue.pop()
+                await client.post("/registrations", json={"event_id": event_id}, headers=headers(student_id, "student", college_id))
+
+        await asyncio.gather(*(writer() for _ in range(args.write_concurrency)))
+        finished = time.perf_counter()
+        await asyncio.wait_for(asyncio.gather(*streams), 60)
+        after = (await client.get("/live/counter-stats", headers=admin_headers)).json()
+
+        poll_samples, poll_bytes = [], 0
+        for _ in range(args.poll_repeat):
+            poll_started = time.perf_counter()
+            response = await client.get("/attendance/all", headers=admin_headers)
+            poll_samples.append(time.perf_counter() - poll_started)
+            poll_bytes = len(response.content)
+
+    burst_seconds = finished - started
+    lags = sorted(slot[2] - finished for slot in received)
+    updates = [slot[0] - 1 for slot in received]  # not counting the initial snapshot
+    polls = args.subscribers * max(1.0, burst_seconds / args.poll_seconds)
+    return {
+        "subscribers": args.subscribers,
+        "writes": len(students),
+        "burst_seconds": round(burst_seconds, 2),
+        "max_ticks_per_second": after["max_ticks_per_second"],
+        "live": {
+            "updates_per_subscriber": round(statistics.mean(updates), 1),
+            "bytes_per_subscriber": round(statistics.mean(slot[1] for slot in received)),
+            "publisher_queries": after["queries"] - before["queries"],
+            "lag_p50_ms": round(statistics.median(lags) * 1000, 1),
+            "lag_max_ms": round(lags[-1] * 1000, 1),
+        },
+        "polling": {
+            "attendance_rows_bytes": poll_bytes,
+            "poll_ms": round(statistics.median(poll_samples) * 1000, 1),
+            "polls_in_burst": round(polls),
+            "bytes_in_burst": round(polls * poll_bytes),
+            "server_seconds_in_burst": round(polls * statistics.median(poll_samples), 1),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=0.5, help="generate_data.py scale; sets how many attendance rows a poll downloads")
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=250, help="registrations for the opening event (at most its college's students)")
+    parser.add_argument("--write-concurrency", type=int, default=10)
+    parser.add_argument("--ticks-per-second", type=float, default=2)
+    parser.add_argument("--poll-seconds", type=float, default=5, help="how often a polling dashboard refreshes")
+    parser.add_argument("--poll-repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        database_path = os.path.join(scratch, "live.db")
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "generate_data.py"), "--database", database_path,
+                        "--scale", str(args.scale)], check=True, stdout=subprocess.DEVNULL)
+        with open(database_path + ".json") as handle:
+            manifest = json.load(handle)
+        port = free_port()
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}", "ROLLUP_RECONCILE_INTERVAL_SECONDS": "0",
+               "LIVE_COUNTERS_MAX_TICKS_PER_SECOND": str(args.ticks_per_second)}
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                                  cwd=BACKEND_DIR, env=env, stderr=subprocess.DEVNULL)
+        try:
+            async def drive():
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                    await wait_until_up(client, server)
+                return await run(args, f"http://127.0.0.1:{port}", database_path, manifest)
+            result = asyncio.run(drive())
+        finally:
+            server.terminate()
+            server.wait()
+        result["attendance_rows"] = manifest["rows"]["attendance"]
+
+    live, polling = result["live"], result["polling"]
+    print(f"{result['writes']} registrations in {result['burst_seconds']} s, {result['subscribers']} subscribers, "
+          f"{result['max_ticks_per_second']:g} ticks/s")
+    print(f"live:    {live['updates_per_subscriber']} updates and {live['bytes_per_subscriber']} bytes per subscriber, "
+          f"{live['publisher_queries']} counter queries in all, final count seen {live['lag_p50_ms']} ms (max {live['lag_max_ms']} ms) after the last write")
+    print(f"polling: {polling['polls_in_burst']} polls of /attendance/all ({result['attendance_rows']} rows, {polling['attendance_rows_bytes']} bytes, "
+          f"{polling['poll_ms']} ms each) = {polling['bytes_in_burst']} bytes, {polling['server_seconds_in_burst']} s of server time")
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Large list responses: ORM objects through response_model vs the fast path.
+
+Builds a scratch SQLite database with `--rows` registrations and serves
+GET /registrations from two FastAPI apps:
+
+- "orm":  crud.get_all_registrations, returned through
+  response_model=List[RegistrationResponse] (validate every object, then
+  jsonable_encoder, then the stdlib json module), as main.py used to
+- "fast": crud.get_rows with the schema's columns, encoded by
+  fast_json.json_response (orjson when installed), as main.py does now
+
+Both apps still declare the same response_model. Each response body is
+checked to be the same JSON before timing. Also reports the encode step on
+its own and the gzipped body size the fast path sends to clients that
+accept it.
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py --rows 10000 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+import crud
+import fast_json
+from config import RESPONSE_GZIP_LEVEL
+from database import Base
+from fast_json import json_response, row_dicts, schema_columns
+from models import College, Event, Registration, User
+from schemas import RegistrationResponse
+
+COLUMNS = schema_columns(RegistrationResponse, Registration)
+
+def seed(url: str, rows: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    created = datetime(2030, 1, 1, 9, 30, 15, 123456)
+    with Session(engine) as db:
+        db.add(College(id=1, name="Bench College"))
+        db.add(User(id=1, email="admin@bench.local", hashed_password="x", full_name="Admin", role="admin", college_id=1))
+        db.flush()
+        db.execute(insert(Event), [
+            dict(id=i, title=f"Event {i}", type="Workshop", date=datetime(2030, 1, 1), college_id=1, created_by=1)
+            for i in range(1, 101)
+        ])
+        db.execute(insert(Registration), [
+            dict(id=i, student_id=i, event_id=1 + i % 100, created_at=created + timedelta(seconds=i))
+            for i in range(1, rows + 1)
+        ])
+        db.commit()
+    engine.dispose()
+
+def make_app(url: str, fast: bool) -> FastAPI:
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    app = FastAPI()
+
+    async def get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    if fast:
+        @app.get("/registrations", response_model=List[RegistrationResponse])
+        async def registrations(request: Request, response: Response, limit: int, db: AsyncSession = Depends(get_db)):
+            rows = await db.run_sync(crud.get_rows, Registration, COLUMNS, limit=limit)
+            return json_response(request, response, row_dicts(rows))
+    else:
+        @app.get("/registrations", response_model=List[RegistrationResponse])
+        async def registrations(limit: int, db: AsyncSession = Depends(get_db)):
+            return await db.run_sync(crud.get_all_registrations, limit=limit)
+
+    return app
+
+async def drive(app: FastAPI, args, accept_encoding: str) -> dict:
+    latencies = []
+    headers = {"Accept-Encoding": accept_encoding}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        first = await client.get("/registrations", params={"limit": args.rows}, headers=headers)
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = await client.get("/registrations", params={"limit": args.rows}, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "encoding": first.headers.get("content-encoding", "identity"),
+        "wire_bytes": int(first.headers["content-length"]),
+        "body": first.content,  # httpx has already decompressed it
+    }
+
+def time_encoders(url: str, repeat: int) -> dict:
+    """The encode step alone, from rows already in memory."""
+    engine = create_engine(url)
+    with Session(engine) as db:
+        objects = crud.get_all_registrations(db, limit=None)
+        rows = row_dicts(crud.get_rows(db, Registration, COLUMNS))
+    engine.dispose()
+
+    def pydantic_path():
+        return json.dumps(
+            jsonable_encoder([RegistrationResponse.model_validate(obj) for obj in objects]),
+            ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        ).encode()
+
+    def fast_path():
+        return fast_json.dumps(rows)
+
+    timings = {}
+    for name, encode in (("pydantic", pydantic_path), ("fast_json", fast_path)):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            encode()
+            samples.append(time.perf_counter() - started)
+        timings[name] = round(statistics.median(samples) * 1000, 2)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        url = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+        seed(url, args.rows)
+        orm = asyncio.run(drive(make_app(url, fast=False), args, "identity"))
+        fast = asyncio.run(drive(make_app(url, fast=True), args, "identity"))
+        fast_gzip = asyncio.run(drive(make_app(url, fast=True), args, "gzip"))
+        encode_ms = time_encoders(url, args.requests)
+
+    if json.loads(orm["body"]) != json.loads(fast["body"]) or fast["body"] != fast_gzip["body"]:
+        sys.exit("fast path returned different JSON from the response_model path")
+
+    results = {
+        "rows": args.rows,
+        "encoder": "orjson" if fast_json.orjson is not None else "json",
+        "encode_ms": encode_ms,
+        "orm_response_model": {key: value for key, value in orm.items() if key != "body"},
+        "fast_path": {key: value for key, value in fast.items() if key != "body"},
+        "fast_path_gzip": {key: value for key, value in fast_gzip.items() if key != "body"},
+        "gzip_level": RESPONSE_GZIP_LEVEL,
+    }
+    print(f"encode only      pydantic {encode_ms['pydantic']:>8} ms   {results['encoder']} {encode_ms['fast_json']:>8} ms")
+    for name in ("orm_response_model", "fast_path", "fast_path_gzip"):
+        print(f"{name:18} p50 {results[name]['p50_ms']:>8} ms   max {results[name]['max_ms']:>8} ms")
+    print(f"body {fast['wire_bytes']} bytes, {fast_gzip['encoding']} {fast_gzip['wire_bytes']} bytes")
+    print(json.dumps(results))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Synthetic data at the scale in doc/scale.md, bulk-loaded into a database.
+
+At `--scale 1` (the documented year of data):
+
+- 50 colleges, 25,000 students and 150 admins
+- 2,000 events, dated from nine months ago to three months ahead
+- ~800,000 registrations: about 32 per student, mostly for their own
+  college's events
+- ~320,000 attendance records, only for events that have started
+- feedback from half of the attendees (doc/scale.md gives no figure)
+
+Two more events are set up for load_test.py: an "opening" event at the
+first college with 500 seats and no registrations yet, for a registration
+rush, and a "gate" event at the second college that started half an hour
+ago, with every student of that college registered and none checked in.
+
+The schema comes from the real migrations (run_migrations), and rows go in
+through executemany in one transaction per table. The rating summaries and
+activity rollups are rebuilt afterwards, so the API starts with them in
+step. Every user's password is "bench-password".
+
+Usage (from the backend directory):
+    python benchmarks/generate_data.py --database /tmp/scale.db
+    python benchmarks/generate_data.py --database /tmp/small.db --scale 0.1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COLLEGES = 50
+STUDENTS = 25000
+ADMINS = 150
+EVENTS = 2000
+REGISTRATIONS = 800000
+ATTENDANCE = 320000
+FEEDBACK_SHARE = 0.5  # of attendance records
+OWN_COLLEGE_SHARE = 0.8  # of each student's registrations
+OPENING_EVENT_SEATS = 500
+PASSWORD = "bench-password"
+
+EVENT_TYPES = ["Workshop", "Fest", "Seminar", "Hackathon", "Tech Talk", "Sports", "Cultural"]
+TOPICS = ["Robotics", "Machine Learning", "Photography", "Startups", "Cloud Computing", "Debate", "Music",
+          "Web Development", "Cybersecurity", "Data Science", "Drama", "Entrepreneurship", "Chess", "Design"]
+LEVELS = ["Intro to", "Advanced", "Hands-on", "Annual", "Inter-college", "Weekend"]
+LOCATIONS = ["Main Auditorium", "Seminar Hall A", "Seminar Hall B", "Computer Lab 3", "Open Air Theatre",
+             "Library Conference Room", "Sports Complex", "Innovation Hub"]
+
+def scaled(value: int, scale: float) -> int:
+    return max(1, round(value * scale))
+
+def build(scale: float, seed: int, now: datetime) -> dict:
+    """Every row to insert, as tuples per table, plus a manifest for load_test.py"""
+    rng = random.Random(seed)
+    students, admins, events = scaled(STUDENTS, scale), max(COLLEGES, scaled(ADMINS, scale)), scaled(EVENTS, scale)
+
+    colleges = [(college_id, f"College {college_id}", now) for college_id in range(1, COLLEGES + 1)]
+    users = []
+    for index in range(admins):
+        users.append((len(users) + 1, f"admin{index + 1}@bench.local", f"Admin {index + 1}", "admin", index % COLLEGES + 1))
+    for index in range(students):
+        users.append((len(users) + 1, f"student{index + 1}@bench.local", f"Student {index + 1}", "student", index % COLLEGES + 1))
+    admin_of = {college_id: user_id for user_id, _, _, role, college_id in reversed(users) if role == "admin"}
+    students_by_college = {}
+    for user_id, _, _, role, college_id in users:
+        if role == "student":
+            students_by_college.setdefault(college_id, []).append(user_id)
+
+    event_rows = []
+    for event_id in range(1, events + 1):
+        college_id = rng.randint(1, COLLEGES)
+        topic, event_type = rng.choice(TOPICS), rng.choice(EVENT_TYPES)
+        date = now + timedelta(minutes=rng.randint(-270 * 1440, 90 * 1440))
+        event_rows.append((
+            event_id, f"{rng.choice(LEVELS)} {topic} {event_type}",
+            f"A {event_type.lower()} on {topic.lower()} for students of every year.",
+            event_type, date, rng.choice(LOCATIONS), rng.choice([None, 100, 200, 500]), college_id, admin_of[college_id],
+        ))
+    opening_id, gate_id = events + 1, events + 2
+    event_rows.append((opening_id, "Opening Day Fest", "Registration opens now, 500 seats.", "Fest",
+                       now + timedelta(days=14), "Open Air Theatre", OPENING_EVENT_SEATS, 1, admin_of[1]))
+    event_rows.append((gate_id, "Gate Night Concert", "Doors are open.", "Cultural",
+                       now - timedelta(minutes=30), "Sports Complex", None, 2, admin_of[2]))
+
+    events_by_college = {}
+    for row in event_rows[:events]:
+        events_by_college.setdefault(row[7], []).append(row[0])
+    event_dates = {row[0]: row[4] for row in event_rows}
+    all_events = [row[0] for row in event_rows[:events]]
+
+    registrations = []
+    per_student = REGISTRATIONS / STUDENTS
+    for college_id, college_students in students_by_college.items():
+        own_events = events_by_college.get(college_id, [])
+        for student_id in college_students:
+            wanted = min(len(all_events), rng.randint(int(per_student / 2), int(per_student * 1.5)))
+            chosen = set(rng.sample(own_events, min(len(own_events), round(wanted * OWN_COLLEGE_SHARE))))
+            while len(chosen) < wanted:
+                chosen.add(rng.choice(all_events))
+            for event_id in chosen:
+                registrations.append([student_id, event_id, event_dates[event_id] - timedelta(minutes=rng.randint(60, 30 * 1440))])
+    for student_id in students_by_college.get(2, []):
+        registrations.append([student_id, gate_id, now - timedelta(days=rng.randint(1, 10))])
+    rng.shuffle(registrations)  # ids in rough arrival order across events, as in production
+    registrations.sort(key=lambda row: row[2])
+    for registration_id, row in enumerate(registrations, start=1):
+        row.insert(0, registration_id)
+
+    started = [row for row in registrations if event_dates[row[2]] <= now and row[2] != gate_id]
+    attend_share = min(1.0, ATTENDANCE / REGISTRATIONS * len(registrations) / max(1, len(started)))
+    attendance, feedback = [], []
+    for registration_id, student_id, event_id, _ in started:
+        if rng.random() < attend_share:
+            checked_in = event_dates[event_id] + timedelta(minutes=rng.randint(-15, 45))
+            attendance.append((len(attendance) + 1, registration_id, student_id, event_id, checked_in))
+            if rng.random() < FEEDBACK_SHARE:
+                feedback.append((len(feedback) + 1, registration_id, student_id, event_id, rng.choice([1, 2, 3, 3, 4, 4, 4, 5, 5, 5]),
+                                 rng.choice([None, "Great session", "Too crowded", "Learned a lot"]), checked_in + timedelta(hours=3)))
+
+    return {
+        "colleges": colleges,
+        "users": users,
+        "events": event_rows,
+        "registrations": [tuple(row) for row in registrations],
+        "attendance": attendance,
+        "feedback": feedback,
+        "manifest": {
+            "scale": scale,
+            "seed": seed,
+            "password": PASSWORD,
+            "opening_event_id": opening_id,
+            "opening_event_college_id": 1,
+            "gate_event_id": gate_id,
+            "gate_event_college_id": 2,
+            "search_words": [topic.split()[0].lower() for topic in TOPICS],
+        },
+    }
+
+def load(data: dict, password_hash: str) -> dict:
+    """Insert the rows through database.engine and rebuild the rollups"""
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+
+    import crud
+    from database import engine
+    from models import Attendance, College, Event, Feedback, Registration, User
+
+    now = datetime.utcnow()
+    tables = [
+        (College, ("id", "name", "created_at"), data["colleges"]),
+        (User, ("id", "email", "full_name", "role", "college_id"), data["users"]),
+        (Event, ("id", "title", "description", "type", "date", "location", "max_attendees", "college_id", "created_by"), data["events"]),
+        (Registration, ("id", "student_id", "event_id", "created_at"), data["registrations"]),
+        (Attendance, ("id", "registration_id", "student_id", "event_id", "check_in_time"), data["attendance"]),
+        (Feedback, ("id", "registration_id", "student_id", "event_id", "rating", "comment", "created_at"), data["feedback"]),
+    ]
+    counts = {}
+    with engine.begin() as connection:
+        for model, columns, rows in tables:
+            extra = {"hashed_password": password_hash, "is_active": True, "created_at": now, "updated_at": now} if model is User else {}
+            if model is Event:
+                extra = {"created_at": now, "updated_at": now}
+            for start in range(0, len(rows), 50000):
+                connection.execute(insert(model), [dict(zip(columns, row), **extra) for row in rows[start:start + 50000]])
+            counts[model.__tablename__] = len(rows)
+    with Session(engine) as db:
+        crud.rebuild_event_rating_summaries(db)
+        crud.reconcile_activity_rollups(db)
+        db.commit()
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            connection.exec_driver_sql("ANALYZE")
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")  # so the file can be copied on its own
+    engine.dispose()
+    return counts
+
+def generate(url: str, scale: float = 1.0, seed: int = 1) -> dict:
+    """Migrate the (empty) database at `url` and fill it. database.py reads
+    DATABASE_URL when first imported, so this must run before anything else
+    imports it in this process. Returns the manifest with row counts."""
+    os.environ["DATABASE_URL"] = url
+    from auth import get_password_hash
+    from database import SQLALCHEMY_DATABASE_URL, run_migrations
+    if SQLALCHEMY_DATABASE_URL != url:
+        raise RuntimeError(f"database.py was already imported for {SQLALCHEMY_DATABASE_URL}")
+    run_migrations()
+
+    started = time.perf_counter()
+    data = build(scale, seed, datetime.utcnow().replace(microsecond=0))
+    built = time.perf_counter()
+    counts = load(data, get_password_hash(PASSWORD))
+    return {**data["manifest"], "rows": counts, "build_seconds": round(built - started, 2), "load_seconds": round(time.perf_counter() - built, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="SQLite file to create (must not exist)")
+    parser.add_argument("--scale", type=float, default=1.0, help="fraction of the documented volumes")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        sys.exit(f"{args.database} already exists")
+    manifest = generate(f"sqlite:///{os.path.abspath(args.database)}", args.scale, args.seed)
+    with open(args.database + ".json", "w") as handle:
+        json.dump(manifest, handle)
+    print(f"{', '.join(f'{count} {table}' for table, count in manifest['rows'].items())}")
+    print(f"built in {manifest['build_seconds']} s, loaded in {manifest['load_seconds']} s")
+    print(json.dumps(manifest))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Load test: the real API against the volumes in doc/scale.md.
+
+Fills a scratch SQLite database with generate_data.py (or copies one it
+generated earlier, see --data), starts main.app on it, and runs these
+scenarios one after another:
+
+- browse:   students (`--concurrency` at once, for `--duration` seconds)
+            list upcoming events at their college, open one and its rating,
+            search, and check their registrations
+- rush:     every student of the opening event's college registers for it,
+            `--rush-concurrency` at once
+- gate:     an admin opens gate mode for the gate event, `--gate-concurrency`
+            scanners check in all of its registrants with signed QR codes,
+            then gate mode is closed (flushing the check-ins)
+- reports:  admins (`--concurrency` at once, for `--duration` seconds) read
+            the top-events, top-students and breakdown reports and page
+            through /registrations/all and /attendance/all
+
+`--mode inprocess` (the default) drives the app through httpx's ASGI
+transport, on the same event loop as the clients. `--mode uvicorn` starts
+`uvicorn main:app` on a local port with `--workers` workers and drives it
+over HTTP, closer to a deployment. Tokens are signed here with the app's
+SECRET_KEY instead of logging in, so bcrypt doesn't dominate the results.
+
+Reports per scenario and per endpoint (method and route template): request
+count, throughput, status codes, and p50/p95/p99/max latency. With one
+worker, also the database statements per request, from /metrics. Results are
+printed as a table and one JSON line, and written to `--output`. `--baseline`
+compares a run with an earlier output file, and `--fail-over` makes the
+script exit with status 1 when any endpoint's p95 grew by more than that
+percentage.
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py --scale 0.1 --duration 10
+    python benchmarks/load_test.py --data /tmp/scale.db --output run.json
+    python benchmarks/load_test.py --data /tmp/scale.db --mode uvicorn --workers 4 --baseline run.json --fail-over 20
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+import generate_data
+
+SCENARIOS = ("browse", "rush", "gate", "reports")
+METRIC_LINE = re.compile(r'^(db_queries_total|http_request_db_queries_count)\{method="([^"]*)",route="([^"]*)"\} (\S+)$')
+
+def percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+class Recorder:
+    """Latency and status of every request, by endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def call(self, client: httpx.AsyncClient, method: str, template: str, headers: dict, path_params: dict = None, **kwargs):
+        endpoint = f"{method} {template}"
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, template.format(**(path_params or {})), headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[endpoint].append(time.perf_counter() - started)
+            self.statuses[endpoint][type(e).__name__] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        self.statuses[endpoint][str(response.status_code)] += 1
+        return response
+
+    def summary(self, seconds: float, db_queries: dict) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                "count": len(ordered),
+                "rps": round(len(ordered) / seconds, 1),
+                "errors": sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500),
+                "statuses": dict(sorted(statuses.items())),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+            if endpoint in db_queries:
+                endpoints[endpoint]["db_queries_per_request"] = db_queries[endpoint]
+        requests = sum(endpoint["count"] for endpoint in endpoints.values())
+        return {
+            "seconds": round(seconds, 2),
+            "requests": requests,
+            "rps": round(requests / seconds, 1),
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+class LoadTest:
+    def __init__(self, args, client: httpx.AsyncClient, database_path: str, manifest: dict):
+        from auth import create_access_token
+        self.args = args
+        self.client = client
+        self.manifest = manifest
+        with sqlite3.connect(database_path) as connection:
+            users = connection.execute("SELECT id, role, college_id FROM users").fetchall()
+            self.upcoming_by_college = defaultdict(list)
+            for event_id, college_id in connection.execute(
+                "SELECT id, college_id FROM events WHERE date >= ? AND id NOT IN (?, ?)",
+                (datetime.utcnow(), manifest["opening_event_id"], manifest["gate_event_id"]),
+            ):
+                self.upcoming_by_college[college_id].append(event_id)
+            self.gate_registrations = connection.execute(
+                "SELECT id, student_id FROM registrations WHERE event_id = ?", (manifest["gate_event_id"],)
+            ).fetchall()
+
+        def headers(user_id: int, role: str, college_id: int) -> dict:
+            token = create_access_token(data={"sub": str(user_id), "college_id": college_id, "role": role}, expires_delta=timedelta(hours=6))
+            return {"Authorization": f"Bearer {token}"}
+
+        rng = random.Random(args.seed)
+        students = [user for user in users if user[1] == "student"]
+        self.browsers = [headers(*user) for user in rng.sample(students, min(len(students), args.users))]
+        self.rushers = [headers(*user) for user in students if user[2] == manifest["opening_event_college_id"]]
+        self.admins = [headers(*user) for user in users if user[1] == "admin"]
+        self.gate_admin = next(headers(*user) for user in users if user[1] == "admin" and user[2] == manifest["gate_event_college_id"])
+
+    async def for_duration(self, step):
+        """Run `step` in a loop from `--concurrency` virtual users until time is up"""
+        deadline = time.perf_counter() + self.args.duration
+
+        async def virtual_user(number: int):
+            rng = random.Random(self.args.seed * 1000 + number)
+            while time.perf_counter() < deadline:
+                await step(rng)
+
+        await asyncio.gather(*(virtual_user(number) for number in range(self.args.concurrency)))
+
+    async def for_each(self, items: list, concurrency: int, step):
+        """Run `step` once per item, at most `concurrency` at a time"""
+        queue = list(reversed(items))
+
+        async def worker():
+            while queue:
+                await step(queue.pop())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def browse(self, recorder: Recorder):
+        words = self.manifest["search_words"]
+
+        async def step(rng: random.Random):
+            headers = rng.choice(self.browsers)
+            response = await recorder.call(self.client, "GET", "/events", headers, params={"when": "upcoming", "limit": 20})
+            events = response.json() if response is not None and response.status_code == 200 else []
+            if events:
+                event_id = rng.choice(events)["id"]
+                await recorder.call(self.client, "GET", "/events/{event_id}", headers, {"event_id": event_id})
+                await recorder.call(self.client, "GET", "/events/{event_id}/average-rating", headers, {"event_id": event_id})
+            await recorder.call(self.client, "GET", "/events/search", headers, params={"q": rng.choice(words), "limit": 20})
+            await recorder.call(self.client, "GET", "/registrations/my", headers, params={"expand": "event", "limit": 50})
+
+        await self.for_duration(step)
+
+    async def rush(self, recorder: Recorder):
+        body = {"event_id": self.manifest["opening_event_id"]}
+
+        async def step(headers: dict):
+            await recorder.call(self.client, "POST", "/registrations", headers, json=body)
+
+        await self.for_each(self.rushers, self.args.rush_concurrency, step)
+
+    async def gate(self, recorder: Recorder):
+        from qr_codes import create_attendance_token
+        event_id = self.manifest["gate_event_id"]
+        expires_at = int((datetime.now(timezone.utc) + timedelta(hours=6)).timestamp())
+        codes = [create_attendance_token(event_id, student_id, registration_id, expires_at) for registration_id, student_id in self.gate_registrations]
+        await recorder.call(self.client, "POST", "/events/{event_id}/gate", self.gate_admin, {"event_id": event_id})
+
+        async def step(code: str):
+            await recorder.call(self.client, "POST", "/attendance/qr", self.gate_admin, json={"event_id": event_id, "qr_data": code})
+
+        await self.for_each(codes, self.args.gate_concurrency, step)
+        await recorder.call(self.client, "DELETE", "/events/{event_id}/gate", self.gate_admin, {"event_id": event_id})
+
+    async def reports(self, recorder: Recorder):
+        async def step(rng: random.Random):
+            headers = rng.choice(self.admins)
+            await recorder.call(self.client, "GET", "/reports/events/top", headers,
+                                params={"by": rng.choice(["registrations", "attendance", "attendance_rate", "rating"]), "limit": 10})
+            await recorder.call(self.client, "GET", "/reports/students/top", headers, params={"limit": 10})
+            await recorder.call(self.client, "GET", "/reports/breakdown", headers, params={"by": rng.choice(["college", "type"])})
+            await recorder.call(self.client, "GET", "/registrations/all", headers, params={"limit": 500, "after_id": rng.randint(0, 700000)})
+            await recorder.call(self.client, "GET", "/attendance/all", headers, params={"limit": 500, "after_id": rng.randint(0, 280000)})
+
+        await self.for_duration(step)
+
+    async def db_query_counts(self) -> dict:
+        """Cumulative statements and requests per endpoint, from /metrics"""
+        response = await self.client.get("/metrics")
+        counts = defaultdict(lambda: [0.0, 0.0])
+        for line in response.text.splitlines():
+            match = METRIC_LINE.match(line)
+            if match:
+                name, method, route, value = match.groups()
+                counts[f"{method} {route}"][0 if name == "db_queries_total" else 1] += float(value)
+        return counts
+
+    async def run(self, scenario: str) -> dict:
+        track_queries = self.args.mode == "inprocess" or self.args.workers == 1
+        before = await self.db_query_counts() if track_queries else {}
+        recorder = Recorder()
+        started = time.perf_counter()
+        await getattr(self, scenario)(recorder)
+        seconds = time.perf_counter() - started
+        db_queries = {}
+        if track_queries:
+            after = await self.db_query_counts()
+            for endpoint, (queries, requests) in after.items():
+                previous = before.get(endpoint, (0.0, 0.0))
+                if requests > previous[1]:
+                    db_queries[endpoint] = round((queries - previous[0]) / (requests - previous[1]), 2)
+        return recorder.summary(seconds, db_queries)
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+async def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                sys.exit(f"uvicorn exited with status {process.returncode}")
+            try:
+                if (await client.get(url + "/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    sys.exit("uvicorn did not start in time")
+
+async def drive(args, database_path: str, manifest: dict) -> dict:
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.rush_concurrency, args.gate_concurrency) + 4)
+    results = {}
+    if args.mode == "inprocess":
+        from main import app
+        await app.router.startup()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://loadtest", timeout=120, limits=limits) as client:
+                load_test = LoadTest(args, client, database_path, manifest)
+                for scenario in scenarios:
+                    results[scenario] = await load_test.run(scenario)
+        finally:
+            await app.router.shutdown()
+        return results
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=os.environ.copy(),
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_until_up(base_url, process)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            load_test = LoadTest(args, client, database_path, manifest)
+            for scenario in scenarios:
+                results[scenario] = await load_test.run(scenario)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return results
+
+def compare(results: dict, baseline: dict) -> list:
+    """(scenario, endpoint, baseline p95, p95, change %, baseline rps, rps) for endpoints in both runs"""
+    rows = []
+    for scenario, summary in results["scenarios"].items():
+        before_endpoints = baseline.get("scenarios", {}).get(scenario, {}).get("endpoints", {})
+        for endpoint, stats in summary["endpoints"].items():
+            before = before_endpoints.get(endpoint)
+            if before and before["p95_ms"] > 0:
+                change = round((stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100, 1)
+                rows.append((scenario, endpoint, before["p95_ms"], stats["p95_ms"], change, before["rps"], stats["rps"]))
+    return rows
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="fraction of the doc/scale.md volumes to generate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data", help="generated database to start from; created with --scale if it doesn't exist yet, and never modified")
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=30, help="seconds each of browse and reports runs")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users for browse and reports")
+    parser.add_argument("--users", type=int, default=2000, help="distinct students browsing")
+    parser.add_argument("--rush-concurrency", type=int, default=200)
+    parser.add_argument("--gate-concurrency", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="earlier --output file to compare with")
+    parser.add_argument("--fail-over", type=float, help="exit 1 if any endpoint's p95 grew by more than this percentage over --baseline")
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        database_path = os.path.join(scratch, "loadtest.db")
+        if args.data and not os.path.exists(args.data):
+            subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "generate_data.py"), "--database", args.data,
+                            "--scale", str(args.scale), "--seed", str(args.seed)], check=True, stdout=subprocess.DEVNULL)
+        if args.data:
+            shutil.copyfile(args.data, database_path)
+            with open(args.data + ".json") as handle:
+                manifest = json.load(handle)
+        # database.py reads DATABASE_URL on import, so set it before anything imports it
+        os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+        os.environ.setdefault("ROLLUP_RECONCILE_INTERVAL_SECONDS", "0")  # no full recount mid-run
+        if not args.data:
+            manifest = generate_data.generate(os.environ["DATABASE_URL"], args.scale, args.seed)
+
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        scenarios = asyncio.run(drive(args, database_path, manifest))
+
+    results = {
+        "meta": {
+            "started_at": started_at,
+            "commit": git_commit(),
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "scale": manifest["scale"],
+            "rows": manifest["rows"],
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "rush_concurrency": args.rush_concurrency,
+            "gate_concurrency": args.gate_concurrency,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": scenarios,
+    }
+
+    for scenario, summary in scenarios.items():
+        print(f"{scenario}: {summary['requests']} requests in {summary['seconds']} s, {summary['rps']} req/s, {summary['errors']} errors")
+        for endpoint, stats in summary["endpoints"].items():
+            queries = f"   {stats['db_queries_per_request']} queries/req" if "db_queries_per_request" in stats else ""
+            print(f"  {endpoint:44} {stats['count']:>7}  {stats['rps']:>8} req/s   p50 {stats['p50_ms']:>8}   p95 {stats['p95_ms']:>8}   "
+                  f"p99 {stats['p99_ms']:>8} ms   {stats['statuses']}{queries}")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as handle:
+            comparison = compare(results, json.load(handle))
+        print("compared with", args.baseline)
+        for scenario, endpoint, before_p95, p95, change, before_rps, rps in comparison:
+            print(f"  {scenario:8} {endpoint:44} p95 {before_p95:>8} -> {p95:>8} ms ({change:+}%)   {before_rps:>8} -> {rps:>8} req/s")
+            if args.fail_over is not None and change > args.fail_over:
+                regressions.append(f"{scenario} {endpoint}")
+        results["comparison"] = [dict(zip(("scenario", "endpoint", "baseline_p95_ms", "p95_ms", "p95_change_pct", "baseline_rps", "rps"), row)) for row in comparison]
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+    print(json.dumps(results))
+    if regressions:
+        sys.exit(f"p95 grew by more than {args.fail_over}% on: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
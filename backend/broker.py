@@ -0,0 +1,270 @@
+"""Shared key/value store and pub/sub channel for state that spans workers.
+
+Each uvicorn worker is a separate process with its own in-memory caches.
+A broker gives them somewhere to share entries and to tell each other when
+something changed. `create_broker(url)` picks the implementation:
+
+- ""                    no broker; everything stays per process
+- "memory://"           LocalBroker, an in-process stand-in (single worker,
+                        development, benchmarks)
+- "redis://host:port/n" RedisBroker, speaking the Redis protocol (RESP) to
+                        Redis or anything compatible with it
+
+For trying multiple workers locally without Redis, this module is also a
+tiny server for the subset of Redis commands RedisBroker uses:
+
+    python broker.py --port 6390
+    CACHE_BROKER_URL=redis://127.0.0.1:6390/0 uvicorn main:app --workers 4
+
+Broker operations never raise: a broker that is down behaves like an empty
+one (gets miss, publishes are dropped) and reconnects on a later call.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[str, str], Awaitable[None]]  # (channel, message)
+
+class LocalBroker:
+    """In-process stand-in with the same interface as RedisBroker."""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}  # key -> (value, expires_at)
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        self._values[key] = (value, time.monotonic() + ttl_seconds if ttl_seconds else None)
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        self._values[key] = (str(value), None)
+        return value
+
+    async def publish(self, channel: str, message: str):
+        for handler in list(self._handlers.get(channel, [])):
+            await handler(channel, message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def close(self):
+        self._handlers.clear()
+
+def _encode_command(*parts) -> bytes:
+    out = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise RuntimeError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode()
+    if kind == b"*":
+        length = int(body)
+        return None if length < 0 else [await _read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"unexpected reply {line!r}")
+
+class RedisBroker:
+    """Minimal asyncio Redis client: GET/SET/INCR/PUBLISH plus one subscriber connection."""
+
+    def __init__(self, url: str, reconnect_seconds: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.reconnect_seconds = reconnect_seconds
+        self._connection: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = None
+        self._lock: Optional[asyncio.Lock] = None  # created on first use, inside the running loop
+        self._retry_at = 0.0
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.errors = 0
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(_encode_command("AUTH", self.password))
+            await _read_reply(reader)
+        if self.db:
+            writer.write(_encode_command("SELECT", self.db))
+            await _read_reply(reader)
+        return reader, writer
+
+    async def _command(self, *parts):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._connection is None:
+                if time.monotonic() < self._retry_at:
+                    return None
+                try:
+                    self._connection = await self._open()
+                except OSError:
+                    self._retry_at = time.monotonic() + self.reconnect_seconds
+                    self.errors += 1
+                    return None
+            reader, writer = self._connection
+            try:
+                writer.write(_encode_command(*parts))
+                await writer.drain()
+                return await _read_reply(reader)
+            except (OSError, ConnectionError, RuntimeError, asyncio.IncompleteReadError) as e:
+                logger.warning("Broker command %s failed: %s", parts[0], e)
+                writer.close()
+                self._connection = None
+                self._retry_at = time.monotonic() + self.reconnect_seconds
+                self.errors += 1
+                return None
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._command("GET", key)
+
+    async def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        if ttl_seconds:
+            await self._command("SET", key, value, "PX", int(ttl_seconds * 1000))
+        else:
+            await self._command("SET", key, value)
+
+    async def incr(self, key: str) -> int:
+        return await self._command("INCR", key) or 0
+
+    async def publish(self, channel: str, message: str):
+        await self._command("PUBLISH", channel, message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers.setdefault(channel, []).append(handler)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        """Hold a dedicated subscriber connection, reconnecting until closed."""
+        while True:
+            try:
+                reader, writer = await self._open()
+                writer.write(_encode_command("SUBSCRIBE", *self._handlers))
+                await writer.drain()
+                while True:
+                    reply = await _read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == "message":
+                        for handler in list(self._handlers.get(reply[1], [])):
+                            try:
+                                await handler(reply[1], reply[2])
+                            except Exception:
+                                logger.exception("Broker message handler failed")
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ConnectionError, RuntimeError, asyncio.IncompleteReadError) as e:
+                self.errors += 1
+                logger.warning("Broker subscription lost (%s); reconnecting", e)
+                await asyncio.sleep(self.reconnect_seconds)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._connection is not None:
+            self._connection[1].close()
+            self._connection = None
+
+def create_broker(url: str):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return LocalBroker()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported broker URL: {url}")
+
+class _StandInServer:
+    """Just enough of the Redis protocol for RedisBroker, for local multi-worker runs."""
+
+    def __init__(self):
+        self.store = LocalBroker()
+        self.subscribers: Dict[str, List[asyncio.StreamWriter]] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                command = await _read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    break
+                name, args = command[0].upper(), command[1:]
+                if name == "SUBSCRIBE":
+                    for count, channel in enumerate(args, start=1):
+                        self.subscribers.setdefault(channel, []).append(writer)
+                        writer.write(b"*3\r\n$9\r\nsubscribe\r\n" + b"$%d\r\n%s\r\n" % (len(channel), channel.encode()) + b":%d\r\n" % count)
+                    await writer.drain()
+                    continue
+                writer.write(await self._reply(name, args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            for writers in self.subscribers.values():
+                if writer in writers:
+                    writers.remove(writer)
+            writer.close()
+
+    async def _reply(self, name: str, args: list) -> bytes:
+        if name in ("PING", "SELECT", "AUTH"):
+            return b"+OK\r\n" if name != "PING" else b"+PONG\r\n"
+        if name == "GET":
+            value = await self.store.get(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value.encode()), value.encode())
+        if name == "SET":
+            ttl = int(args[3]) / 1000 if len(args) >= 4 and args[2].upper() == "PX" else None
+            await self.store.set(args[0], args[1], ttl)
+            return b"+OK\r\n"
+        if name == "INCR":
+            return b":%d\r\n" % await self.store.incr(args[0])
+        if name == "PUBLISH":
+            channel, message = args
+            receivers = self.subscribers.get(channel, [])
+            payload = _encode_command("message", channel, message)
+            for receiver in list(receivers):
+                receiver.write(payload)
+            return b":%d\r\n" % len(receivers)
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+async def _serve(host: str, port: int):
+    server = await asyncio.start_server(_StandInServer().handle, host, port)
+    print(f"Broker stand-in listening on redis://{host}:{port}/0")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Redis commands used by broker.RedisBroker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.host, args.port))
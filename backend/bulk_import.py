@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Bulk import of users, colleges and registrations from CSV or JSONL.
+
+Rows are streamed from the input and processed in chunks. Each chunk is
+validated with the API's pydantic schemas, de-duplicated against the
+database with one set query, and written with one multi-row INSERT in its
+own transaction, so a bad chunk doesn't undo the ones before it.
+Registrations take seats like the API does: rows for an event past its
+max_attendees fail with "Event <id> is full". User
+passwords are hashed in a process pool, which is where most of the time
+goes (bcrypt is deliberately slow).
+
+With per-college partitioning, users and their registrations are written to
+their college's shard (one transaction per chunk per shard) and colleges are
+copied from the directory to every shard.
+
+Expected columns / keys:
+    users:          email, full_name, password, role (optional), college_id (optional)
+    colleges:       name
+    registrations:  student_email, event_id
+
+Usage (from the backend directory):
+    python bulk_import.py users students.csv
+    python bulk_import.py registrations registrations.jsonl --chunk-size 2000
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+import crud
+from auth import get_password_hash
+from database import SessionLocal, shard_engines, shard_for_college
+from schemas import CollegeCreate, ImportReport, ImportRowError, RegistrationImport, UserCreate
+
+IMPORT_KINDS = ("users", "colleges", "registrations")
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Yield (line number, row) pairs. Empty CSV cells are treated as missing."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, {"__error__": f"Invalid JSON: {e.msg}"}
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+def chunks(rows: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class BulkImporter:
+    def __init__(self, kind: str, chunk_size: int = DEFAULT_CHUNK_SIZE, hash_workers: Optional[int] = None):
+        if kind not in IMPORT_KINDS:
+            raise ValueError(f"Unknown import kind: {kind}")
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.hash_workers = hash_workers or os.cpu_count() or 2
+        self.report = ImportReport(kind=kind)
+        self._hash_pool: Optional[ProcessPoolExecutor] = None
+
+    def run(self, stream: IO[str], fmt: str) -> ImportReport:
+        if self.kind == "users":
+            # spawn: forking a process that may be running server threads isn't safe
+            self._hash_pool = ProcessPoolExecutor(self.hash_workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            for chunk in chunks(read_rows(stream, fmt), self.chunk_size):
+                self.report.total += len(chunk)
+                self._import_chunk(chunk)
+        finally:
+            if self._hash_pool is not None:
+                self._hash_pool.shutdown()
+        return self.report
+
+    def _fail(self, line: int, error: str):
+        self.report.failed += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(ImportRowError(line=line, error=error))
+
+    def _validate(self, chunk: List[Tuple[int, dict]], schema) -> List[Tuple[int, object]]:
+        valid = []
+        for line, row in chunk:
+            if "__error__" in row:
+                self._fail(line, row["__error__"])
+                continue
+            try:
+                valid.append((line, schema(**row)))
+            except ValidationError as e:
+                self._fail(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+        return valid
+
+    def _import_chunk(self, chunk: List[Tuple[int, dict]]):
+        schema = {"users": UserCreate, "colleges": CollegeCreate, "registrations": RegistrationImport}[self.kind]
+        valid = self._validate(chunk, schema)
+        if not valid:
+            return
+        # One session (and transaction) per shard; unpartitioned that's just the primary
+        sessions = [SessionLocal(info={"shard": index}) for index in range(len(shard_engines))]
+        try:
+            inserted, skipped = getattr(self, f"_insert_{self.kind}")(sessions, valid)
+            for db in sessions:
+                db.commit()
+            self.report.inserted += inserted
+            self.report.skipped += skipped
+        except Exception as e:
+            for db in sessions:
+                db.rollback()
+            for line, _ in valid:
+                self._fail(line, f"Chunk failed: {e}")
+        finally:
+            for db in sessions:
+                db.close()
+
+    # Each _insert_* returns (inserted, skipped as duplicates)
+
+    def _insert_users(self, sessions, valid) -> Tuple[int, int]:
+        emails = [user.email for _, user in valid]
+        existing = set().union(*(crud.get_existing_emails(db, emails) for db in sessions))
+        new_users = []
+        for _, user in valid:
+            if user.email not in existing:
+                existing.add(user.email)  # also skips repeats within the file
+                new_users.append(user)
+        hashes = self._hash_pool.map(get_password_hash, [user.password for user in new_users], chunksize=16)
+        rows_by_shard = defaultdict(list)
+        for user, hashed_password in zip(new_users, hashes):
+            rows_by_shard[shard_for_college(user.college_id)].append({
+                "email": user.email,
+                "hashed_password": hashed_password,
+                "full_name": user.full_name,
+                "role": user.role,
+                "college_id": user.college_id,
+            })
+        inserted = sum(crud.bulk_insert_users(sessions[shard], rows) for shard, rows in rows_by_shard.items())
+        return inserted, len(valid) - inserted
+
+    def _insert_colleges(self, sessions, valid) -> Tuple[int, int]:
+        # The directory lives on shard 0; other shards get copies with the same ids
+        directory = sessions[0]
+        existing = crud.get_existing_college_names(directory, [college.name for _, college in valid])
+        rows = []
+        for _, college in valid:
+            if college.name not in existing:
+                existing.add(college.name)
+                rows.append({"name": college.name})
+        inserted = crud.bulk_insert_colleges(directory, rows)
+        if rows and len(sessions) > 1:
+            for college in crud.get_colleges_by_name(directory, [row["name"] for row in rows]):
+                for db in sessions[1:]:
+                    crud.copy_college(db, college.id, college.name)
+        return inserted, len(valid) - inserted
+
+    def _insert_registrations(self, sessions, valid) -> Tuple[int, int]:
+        emails = {registration.student_email for _, registration in valid}
+        students = {}  # email -> (shard, student_id)
+        for shard, db in enumerate(sessions):
+            for email, student_id in crud.get_user_ids_by_email(db, emails).items():
+                students.setdefault(email, (shard, student_id))
+        # Registrations live with the student, so the event must be on the same shard
+        event_ids = {}
+        for shard in {shard for shard, _ in students.values()}:
+            shard_event_ids = {r.event_id for _, r in valid if students.get(r.student_email, (None,))[0] == shard}
+            event_ids[shard] = crud.get_existing_event_ids(sessions[shard], shard_event_ids)
+        rows_by_shard, lines, failed = defaultdict(list), {}, 0
+        for line, registration in valid:
+            shard, student_id = students.get(registration.student_email, (None, None))
+            if student_id is None or registration.event_id not in event_ids[shard]:
+                if student_id is None:
+                    self._fail(line, f"No user with email {registration.student_email}")
+                else:
+                    self._fail(line, f"No event with id {registration.event_id}")
+                failed += 1
+                continue
+            key = (shard, student_id, registration.event_id)
+            if key not in lines:
+                lines[key] = line
+                rows_by_shard[shard].append({"student_id": student_id, "event_id": registration.event_id})
+        inserted = 0
+        for shard, rows in rows_by_shard.items():
+            shard_inserted, full = crud.bulk_insert_registrations(sessions[shard], rows)
+            inserted += shard_inserted
+            for row in full:
+                self._fail(lines[(shard, row["student_id"], row["event_id"])], f"Event {row['event_id']} is full")
+            failed += len(full)
+        return inserted, len(valid) - failed - inserted
+
+def import_stream(kind: str, stream: IO[str], fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE, hash_workers: Optional[int] = None) -> ImportReport:
+    return BulkImporter(kind, chunk_size, hash_workers).run(stream, fmt)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=IMPORT_KINDS)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--hash-workers", type=int, help="password hashing processes (default: CPU count)")
+    args = parser.parse_args()
+
+    from database import run_migrations
+    run_migrations()
+    with open(args.path, newline="", encoding="utf-8") as stream:
+        report = import_stream(args.kind, stream, args.format or detect_format(args.path), args.chunk_size, args.hash_workers)
+    print(report.model_dump_json(indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,106 @@ load_dotenv()
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./campus_events.db")
 
+# Per-college partitioning: extra databases, comma-separated. Colleges are
+# hashed over the primary (shard 0) plus these; empty = one database.
+SHARD_DATABASE_URLS = [url.strip() for url in os.getenv("SHARD_DATABASE_URLS", "").split(",") if url.strip()]
+
+# Read replicas for GET routes, comma-separated URLs (empty = everything on the
+# primary). A replica that fails to connect is skipped for REPLICA_RETRY_SECONDS.
+# After a user writes, their own reads stay on the primary for
+# REPLICA_READ_YOUR_WRITES_SECONDS so replication lag can't hide the change.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", "5"))
+
+# SQLite profile: pragmas applied to every new connection. WAL lets readers
+# run while a writer commits; busy_timeout makes writers wait for the lock
+# instead of failing with "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Connection pool (per engine; the API uses the async engine, migrations and
+# bulk imports the sync one). Pre-ping and recycle only apply to server
+# databases such as PostgreSQL, where idle connections can be dropped.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-this-in-production-12345")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Signed attendance QR tokens stay valid until this many hours after the event starts
+QR_TOKEN_VALID_HOURS_AFTER_EVENT = int(os.getenv("QR_TOKEN_VALID_HOURS_AFTER_EVENT", "24"))
+
+# Authenticated-user cache used by get_current_user; evictions reach the other
+# workers through CACHE_BROKER_URL when it is set
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+
+# Read-through cache for event and college lookups (lookup_cache.py). Entries
+# are fresh for the TTL, then served stale for up to STALE_SECONDS while one
+# background reload runs. CACHE_BROKER_URL adds a tier shared by all workers
+# and carries invalidations between them: redis://host:port/db, or memory://
+# for the in-process stand-in; empty keeps each worker's cache to itself.
+LOOKUP_CACHE_TTL_SECONDS = float(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "30"))
+LOOKUP_CACHE_STALE_SECONDS = float(os.getenv("LOOKUP_CACHE_STALE_SECONDS", "30"))
+LOOKUP_CACHE_MAX_SIZE = int(os.getenv("LOOKUP_CACHE_MAX_SIZE", "10000"))
+CACHE_BROKER_URL = os.getenv("CACHE_BROKER_URL", "")
+
+# Gate mode: how often in-memory check-ins are written to the database, and
+# how many may accumulate before a flush is triggered early
+GATE_FLUSH_INTERVAL_SECONDS = float(os.getenv("GATE_FLUSH_INTERVAL_SECONDS", "1.0"))
+GATE_FLUSH_BATCH_SIZE = int(os.getenv("GATE_FLUSH_BATCH_SIZE", "500"))
+
+# Registration admission: once an event is found full, a worker turns further
+# registrants away from memory for this long, without a query (0 disables)
+ADMISSION_FULL_TTL_SECONDS = float(os.getenv("ADMISSION_FULL_TTL_SECONDS", "2"))
+
+# Live event counters (GET /events/{event_id}/live): changes are coalesced into
+# at most this many updates per second, and idle streams get a keep-alive
+# comment every HEARTBEAT_SECONDS. Workers share changes through
+# CACHE_BROKER_URL; without one, a stream only sees its own worker's writes.
+LIVE_COUNTERS_MAX_TICKS_PER_SECOND = float(os.getenv("LIVE_COUNTERS_MAX_TICKS_PER_SECOND", "2"))
+LIVE_COUNTERS_HEARTBEAT_SECONDS = float(os.getenv("LIVE_COUNTERS_HEARTBEAT_SECONDS", "15"))
+
+# Password hashing configuration
+# Changing BCRYPT_ROUNDS re-hashes each user's password on their next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads that run bcrypt off the event loop, and how many more requests may wait for one
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Rows fetched, encoded and written per batch by exports.py (and per Parquet row group)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+# Large JSON list responses are gzipped for clients that accept it once the
+# body reaches this many bytes (fast_json.py); level trades CPU for size
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+
+# Activity rollups behind /reports are updated with every write; this is how
+# often they are also recounted from the raw tables to correct drift (0 = never)
+ROLLUP_RECONCILE_INTERVAL_SECONDS = float(os.getenv("ROLLUP_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+# Cache-Control max-age for the catalog endpoints (/events, /colleges, ...).
+# 0 sends no-cache: clients revalidate every time and get a 304 when unchanged.
+CATALOG_CACHE_MAX_AGE_SECONDS = int(os.getenv("CATALOG_CACHE_MAX_AGE_SECONDS", "0"))
+
+# Request metrics (metrics.py, GET /metrics). Statements slower than
+# SLOW_QUERY_MS are logged with their route. METRICS_TOKEN, if set, must be
+# sent as "Authorization: Bearer <token>" to read /metrics. DEBUG adds a
+# Server-Timing header with each response's query count and database time.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+
 # CORS configuration
 ALLOWED_ORIGINS = [
     "http://localhost:5173",  # Vite dev server
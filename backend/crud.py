@@ -1,7 +1,105 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from models import User, College, Event, Registration, Attendance, Feedback
-from schemas import UserCreate, CollegeCreate, EventCreate, EventUpdate, RegistrationCreate, AttendanceCreate, FeedbackCreate
+from sqlalchemy import Row, case, column, false, func, insert, literal, literal_column, or_, select, table, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload
+from collections import Counter, defaultdict
+import re
+from datetime import datetime
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from models import (
+    User, College, Event, Registration, Attendance, Feedback,
+    EventRatingSummary, EventActivitySummary, StudentActivitySummary, ResourceVersion, WaitlistEntry
+)
+from admission import ADMITTED, ALREADY_REGISTERED, FULL, WAITLISTED, CANCELLED, CHECKED_IN, NOT_FOUND
+from schemas import UserCreate, UserAdminUpdate, CollegeCreate, EventCreate, EventUpdate, RegistrationCreate, AttendanceCreate, FeedbackCreate
+
+STREAM_BATCH_SIZE = 1000
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# Dialect-specific INSERT constructs that support ON CONFLICT
+_CONFLICT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+def _insert_unless_duplicate(db: Session, model, **values):
+    """INSERT a row, doing nothing if (student_id, event_id) already exists.
+
+    Returns the new row (its columns as attributes), or None for a duplicate.
+    The unique index makes the decision atomically, and unlike catching
+    IntegrityError nothing is rolled back, so objects loaded earlier in the
+    session stay usable. The row is plain columns rather than an ORM entity:
+    SQLite can reuse the id of a row deleted in this session, and an entity
+    would resolve through the identity map to the deleted object.
+    """
+    conflict_insert = _CONFLICT_INSERTS[db.get_bind(model).dialect.name]
+    stmt = (
+        conflict_insert(model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["student_id", "event_id"])
+        .returning(*model.__table__.c)
+    )
+    return db.execute(stmt).first()
+
+# Pagination helpers
+def _bump_versions(db: Session, *names: str) -> None:
+    """Increment resource version counters (see models.ResourceVersion) in the
+    caller's transaction, so the new version commits with the change."""
+    conflict_insert = _CONFLICT_INSERTS[db.get_bind(ResourceVersion).dialect.name]
+    stmt = conflict_insert(ResourceVersion.__table__).on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": ResourceVersion.__table__.c.version + 1}
+    )
+    db.execute(stmt, [{"name": name, "version": 1} for name in names])
+
+def get_resource_versions(db: Session, names: Sequence[str]) -> Dict[str, int]:
+    """Current version of each named resource; 0 if it never changed."""
+    versions = dict(db.query(ResourceVersion.name, ResourceVersion.version).filter(ResourceVersion.name.in_(names)).all())
+    return {name: versions.get(name, 0) for name in names}
+
+def _paginate(query, model, skip: int = 0, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """Apply keyset (after_id) or offset paging to a query over `model`.
+
+    Keyset paging walks the primary key index, so page N costs the same as
+    page 1. OFFSET paging is kept for existing clients that still send skip.
+    """
+    query = query.order_by(model.id)
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    elif skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def _with_event(query, model, expand: bool):
+    """Load each row's event and the event's college in the same query
+    (`?expand=` on the "my" endpoints), instead of one lookup per row"""
+    if expand:
+        query = query.options(joinedload(model.event).joinedload(Event.college))
+    return query
+
+def get_rows(db: Session, model, columns: Sequence, skip: int = 0, limit: Optional[int] = None, after_id: Optional[int] = None, **filters) -> list:
+    """Plain column rows for `model`, paged like the ORM getters; no ORM
+    objects are built. Filters that are None are left out."""
+    query = db.query(*columns)
+    for name, value in filters.items():
+        if value is not None:
+            query = query.filter(getattr(model, name) == value)
+    return _paginate(query, model, skip, limit, after_id).all()
+
+def get_max_id(db: Session, model) -> int:
+    """Highest id in a table, 0 when empty"""
+    return db.query(func.max(model.id)).scalar() or 0
+
+def iter_rows(db: Session, model, batch_size: int = STREAM_BATCH_SIZE, **filters) -> Iterator:
+    """Yield plain column rows for `model` in id order from a server-side cursor.
+
+    Rows are fetched `batch_size` at a time and never enter the identity map,
+    so memory stays bounded no matter how large the table is.
+    """
+    query = db.query(*model.__table__.columns).order_by(model.id)
+    for name, value in filters.items():
+        query = query.filter(getattr(model, name) == value)
+    yield from query.execution_options(stream_results=True, yield_per=batch_size)
 
 # User CRUD operations
 def create_user(db: Session, user_data: UserCreate, hashed_password: str) -> User:
@@ -23,25 +121,76 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+def update_user(db: Session, user_id: int, user_data: UserAdminUpdate) -> Optional[User]:
+    db_user = db.query(User).filter(User.id == user_id).first()
+    if db_user:
+        update_data = user_data.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_user, field, value)
+        db.commit()
+        db.refresh(db_user)
+    return db_user
+
+def update_user_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    db.query(User).filter(User.id == user_id).update(
+        {User.hashed_password: hashed_password}, synchronize_session=False
+    )
+    db.commit()
+
+def get_existing_emails(db: Session, emails: Iterable[str]) -> set:
+    """Which of these emails already belong to a user (one query)"""
+    return {email for (email,) in db.query(User.email).filter(User.email.in_(list(emails))).all()}
+
+def get_user_ids_by_email(db: Session, emails: Iterable[str]) -> Dict[str, int]:
+    return dict(db.query(User.email, User.id).filter(User.email.in_(list(emails))).all())
+
+def bulk_insert_users(db: Session, rows: List[dict]) -> int:
+    """Insert users with one multi-row INSERT; rows carry hashed_password, not password.
+    The caller commits."""
+    if rows:
+        db.execute(insert(User.__table__), [{**row, "is_active": True} for row in rows])
+    return len(rows)
+
+def get_users(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[User]:
+    return _paginate(db.query(User), User, skip, limit, after_id).all()
 
 # College CRUD operations
 def create_college(db: Session, college_data: CollegeCreate) -> College:
     db_college = College(name=college_data.name)
     db.add(db_college)
+    _bump_versions(db, "colleges")
     db.commit()
     db.refresh(db_college)
     return db_college
 
-def get_colleges(db: Session, skip: int = 0, limit: int = 100) -> List[College]:
-    return db.query(College).offset(skip).limit(limit).all()
+def get_colleges(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[College]:
+    return _paginate(db.query(College), College, skip, limit, after_id).all()
+
+def copy_college(db: Session, college_id: int, name: str) -> None:
+    """Mirror a college from the directory (shard 0) into another shard."""
+    if db.get(College, college_id) is None:
+        db.add(College(id=college_id, name=name))
+        _bump_versions(db, "colleges")
+        db.commit()
+
+def get_existing_college_names(db: Session, names: Iterable[str]) -> set:
+    return {name for (name,) in db.query(College.name).filter(College.name.in_(list(names))).all()}
+
+def get_colleges_by_name(db: Session, names: Iterable[str]) -> List[College]:
+    return db.query(College).filter(College.name.in_(list(names))).all()
+
+def bulk_insert_colleges(db: Session, rows: List[dict]) -> int:
+    """Insert colleges with one multi-row INSERT. The caller commits."""
+    if rows:
+        db.execute(insert(College.__table__), rows)
+        _bump_versions(db, "colleges")
+    return len(rows)
 
 def get_college_by_id(db: Session, college_id: int) -> Optional[College]:
     return db.query(College).filter(College.id == college_id).first()
 
 # Event CRUD operations
-def create_event(db: Session, event_data: EventCreate, created_by: int) -> Event:
+def create_event(db: Session, event_data: EventCreate, created_by: int, created_by_college_id: Optional[int]) -> Event:
     db_event = Event(
         title=event_data.title,
         description=event_data.description,
@@ -50,15 +199,58 @@ def create_event(db: Session, event_data: EventCreate, created_by: int) -> Event
         location=event_data.location,
         max_attendees=event_data.max_attendees,
         college_id=event_data.college_id,
-        created_by=created_by
+        created_by=created_by,
+        created_by_college_id=created_by_college_id
     )
+    db_event.rating_summary = EventRatingSummary()
+    db_event.activity_summary = EventActivitySummary()
     db.add(db_event)
+    db.flush()
+    _bump_versions(db, "events", f"event:{db_event.id}")
     db.commit()
     db.refresh(db_event)
     return db_event
 
-def get_events(db: Session, skip: int = 0, limit: int = 100) -> List[Event]:
-    return db.query(Event).offset(skip).limit(limit).all()
+def get_events(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, college_id: Optional[int] = None) -> List[Event]:
+    query = db.query(Event)
+    if college_id is not None:
+        query = query.filter(Event.college_id == college_id)
+    return _paginate(query, Event, skip, limit, after_id).all()
+
+def get_events_by_date(db: Session, columns: Sequence, college_id: Optional[int] = None, event_type: Optional[str] = None,
+                       date_from: Optional[datetime] = None, date_to: Optional[datetime] = None, descending: bool = False,
+                       skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> list:
+    """Event rows in date order (then id), soonest first or, descending,
+    latest first. date_from is inclusive, date_to exclusive.
+
+    With a college the (college_id, date) index yields rows already in this
+    order, so the query reads `limit` index entries instead of sorting every
+    match; without one, the date index does the same across colleges. The
+    keyset cursor stays an event id: after_id resumes from that event's
+    (date, id) position.
+    """
+    query = db.query(*columns)
+    if college_id is not None:
+        query = query.filter(Event.college_id == college_id)
+    if event_type is not None:
+        query = query.filter(Event.type == event_type)
+    if date_from is not None:
+        query = query.filter(Event.date >= date_from)
+    if date_to is not None:
+        query = query.filter(Event.date < date_to)
+    if after_id is not None:
+        after_date = db.query(Event.date).filter(Event.id == after_id).scalar()
+        if after_date is None:
+            return []  # the cursor's event was deleted; its position is gone
+        position = tuple_(Event.date, Event.id)
+        query = query.filter(position < (after_date, after_id) if descending else position > (after_date, after_id))
+    elif skip:
+        query = query.offset(skip)
+    order = (Event.date.desc(), Event.id.desc()) if descending else (Event.date, Event.id)
+    return query.order_by(*order).limit(limit).all()
+
+def get_existing_event_ids(db: Session, event_ids: Iterable[int]) -> set:
+    return {event_id for (event_id,) in db.query(Event.id).filter(Event.id.in_(list(event_ids))).all()}
 
 def get_event_by_id(db: Session, event_id: int) -> Optional[Event]:
     return db.query(Event).filter(Event.id == event_id).first()
@@ -69,6 +261,7 @@ def update_event(db: Session, event_id: int, event_data: EventUpdate) -> Event:
         update_data = event_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_event, field, value)
+        _bump_versions(db, "events", f"event:{event_id}")
         db.commit()
         db.refresh(db_event)
     return db_event
@@ -77,41 +270,433 @@ def delete_event(db: Session, event_id: int) -> bool:
     db_event = db.query(Event).filter(Event.id == event_id).first()
     if db_event:
         db.delete(db_event)
+        _bump_versions(db, "events", f"event:{event_id}")
         db.commit()
         return True
     return False
 
+# Event search. The full-text index is maintained by the database, outside
+# the ORM (migration 0005): an FTS5 table synced by triggers on SQLite, a
+# generated tsvector column on PostgreSQL. create/update/delete_event keep it
+# current without doing anything themselves.
+SEARCH_FACETS = ("type", "college_id", "month")
+SEARCH_FACET_LIMIT = 20
+_SEARCH_TERM = re.compile(r"\w+")
+_events_fts = table("events_fts", column("rowid"))
+
+def search_terms(q: Optional[str]) -> List[str]:
+    """Words in a user's query. Punctuation is dropped and each word is matched
+    as a literal term, so FTS query syntax in the input has no effect."""
+    return _SEARCH_TERM.findall(q or "")[:16]
+
+def _search_matches(dialect: str, terms: List[str], ranked: bool = True):
+    """Subquery of the ids (and, if ranked, the rank: higher is better) of the
+    events matching all of `terms`, the last one as a prefix so results follow
+    the user's typing"""
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("english", " & ".join(terms[:-1] + [terms[-1] + ":*"]))
+        vector = literal_column("events.search_vector")
+        selected = [Event.id, func.ts_rank_cd(vector, tsquery).label("rank")] if ranked else [Event.id]
+        return select(*selected).where(vector.op("@@")(tsquery)).subquery("matches")
+    fts = literal_column("events_fts")
+    match = " ".join(f'"{term}"' for term in terms) + "*"
+    # bm25 weights per column (title, description, location); lower is better
+    selected = [_events_fts.c.rowid.label("id")] + ([(-func.bm25(fts, 10.0, 1.0, 2.0)).label("rank")] if ranked else [])
+    # LIMIT -1 (none) stops SQLite flattening the subquery into the join, so
+    # the FTS index drives the query instead of MATCH running per events row
+    return select(*selected).select_from(_events_fts).where(fts.op("MATCH")(match)).limit(-1).subquery("matches")
+
+def _month(dialect: str):
+    if dialect == "postgresql":
+        return func.to_char(Event.date, "YYYY-MM")
+    return func.strftime("%Y-%m", Event.date)
+
+def search_events(db: Session, columns: Sequence, q: Optional[str] = None, event_type: Optional[str] = None,
+                  college_id: Optional[int] = None, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                  limit: int = 20, offset: int = 0) -> dict:
+    """Ranked full-text search over event title, description and location.
+
+    Returns {"total", "results", "facets"}. Results are row dicts with a
+    "rank" (best first; by date when there is no query text). Each facet
+    counts the matches per type, college or month, applying every filter but
+    its own, so a client can show the alternatives to the current choice.
+    date_from is inclusive, date_to exclusive.
+    """
+    dialect = db.get_bind(Event).dialect.name
+    terms = search_terms(q)
+
+    def matching(*selected, matches=None, skip_filter: Optional[str] = None):
+        query = db.query(*selected)
+        if terms:
+            matches = matches if matches is not None else _search_matches(dialect, terms, ranked=False)
+            query = query.select_from(matches).join(Event, Event.id == matches.c.id)
+        else:
+            query = query.select_from(Event)
+        if event_type is not None and skip_filter != "type":
+            query = query.filter(Event.type == event_type)
+        if college_id is not None and skip_filter != "college_id":
+            query = query.filter(Event.college_id == college_id)
+        if date_from is not None and skip_filter != "month":
+            query = query.filter(Event.date >= date_from)
+        if date_to is not None and skip_filter != "month":
+            query = query.filter(Event.date < date_to)
+        return query
+
+    if terms:
+        matches = _search_matches(dialect, terms)
+        query = matching(*columns, matches.c.rank, matches=matches).order_by(matches.c.rank.desc(), Event.id)
+    else:
+        query = matching(*columns, literal(0.0).label("rank")).order_by(Event.date, Event.id)
+    results = [row._asdict() for row in query.offset(offset).limit(limit).all()]
+    total = matching(func.count(Event.id)).scalar()
+
+    facets = {}
+    for name, expression in zip(SEARCH_FACETS, (Event.type, Event.college_id, _month(dialect))):
+        count = func.count(Event.id)
+        rows = matching(expression, count, skip_filter=name).group_by(expression).order_by(count.desc(), expression).limit(SEARCH_FACET_LIMIT).all()
+        facets[name] = [{"value": str(value), "count": n} for value, n in rows]
+    return {"total": total, "results": results, "facets": facets}
+
 # Registration CRUD operations
-def create_registration(db: Session, registration_data: RegistrationCreate, student_id: int) -> Registration:
-    db_registration = Registration(
-        student_id=student_id,
-        event_id=registration_data.event_id
-    )
-    db.add(db_registration)
+def _take_seats(db: Session, event_id: int, wanted: int = 1) -> int:
+    """Count up to `wanted` more registrations against the event's
+    max_attendees and return how many seats were taken (0 if it's full).
+
+    The seat counter is the event's activity rollup: one conditional UPDATE
+    compares and increments it, so two registrants can't both take the last
+    seat (SQLite runs one writer at a time; PostgreSQL re-checks the
+    condition on the locked row). Events without max_attendees always admit.
+    A full event is answered from a plain read first, so refusals don't
+    queue for the write lock behind the registrations still getting in.
+    """
+    summaries = EventActivitySummary.__table__
+    capacity = select(Event.max_attendees).where(Event.id == event_id).scalar_subquery()
+    while wanted > 0:
+        seats = db.execute(select(summaries.c.registration_count, capacity.label("capacity")).where(summaries.c.event_id == event_id)).first()
+        if seats is None:
+            # No rollup yet (an event loaded outside the API, not reconciled yet): start it from the raw counts
+            counts = Counter(
+                registration_count=db.query(func.count(Registration.id)).filter(Registration.event_id == event_id).scalar(),
+                attendance_count=db.query(func.count(Attendance.id)).filter(Attendance.event_id == event_id).scalar(),
+            )
+            _increment_counts(db, EventActivitySummary, "event_id", EVENT_ACTIVITY_COUNTS, {event_id: counts})
+            continue
+        if seats.capacity is not None:
+            wanted = min(wanted, seats.capacity - seats.registration_count)
+            if wanted <= 0:
+                return 0
+        taken = db.execute(
+            update(summaries)
+            .where(summaries.c.event_id == event_id, or_(capacity.is_(None), summaries.c.registration_count + wanted <= capacity))
+            .values(registration_count=summaries.c.registration_count + wanted, updated_at=datetime.utcnow())
+        ).rowcount
+        if taken:
+            return wanted
+        # Someone took seats between the read and the UPDATE: look again
+    return 0
+
+def _take_seat(db: Session, event_id: int) -> bool:
+    return _take_seats(db, event_id) == 1
+
+def _give_seat_back(db: Session, event_id: int) -> None:
+    _increment_counts(db, EventActivitySummary, "event_id", EVENT_ACTIVITY_COUNTS, {event_id: Counter(registration_count=-1)})
+
+def _count_student_registration(db: Session, student_id: int, delta: int) -> None:
+    _increment_counts(db, StudentActivitySummary, "student_id", STUDENT_ACTIVITY_COUNTS, {student_id: Counter(registration_count=delta)})
+
+def admit_registration(db: Session, registration_data: RegistrationCreate, student_id: int) -> Tuple[str, Optional[Row], Optional[int]]:
+    """Register a student for an event, within its max_attendees.
+
+    An existing registration is looked up first (one unique-index probe), so
+    a student who already holds a seat is told so rather than refused or
+    queued. Otherwise the seat is taken before the registration is inserted,
+    in the same transaction, and a full event is answered without writing
+    the registrations table. Returns (outcome, registration, waitlist
+    position), where outcome is:
+
+    - "admitted": registered, and off the waitlist if they were on it
+    - "already_registered": registered before; if two requests race past the
+      lookup, the unique (student_id, event_id) index decides and the
+      loser's seat is given back
+    - "full": no seat, and registration_data.join_waitlist wasn't set
+    - "waitlisted": no seat, so the student is queued (or already was) at
+      the returned 1-based position
+    """
+    event_id = registration_data.event_id
+    if get_registration_id(db, student_id, event_id) is not None:
+        db.commit()
+        return ALREADY_REGISTERED, None, None
+    if not _take_seat(db, event_id):
+        if not registration_data.join_waitlist:
+            db.commit()  # ends the transaction the seat UPDATE opened
+            return FULL, None, None
+        position = _join_waitlist(db, event_id, student_id)
+        db.commit()
+        return WAITLISTED, None, position
+    db_registration = _insert_unless_duplicate(db, Registration, student_id=student_id, event_id=event_id)
+    if db_registration is None:
+        _give_seat_back(db, event_id)
+        db.commit()
+        return ALREADY_REGISTERED, None, None
+    _count_student_registration(db, student_id, 1)
+    _remove_from_waitlist(db, event_id, student_id)
     db.commit()
-    db.refresh(db_registration)
-    return db_registration
+    return ADMITTED, db_registration, None
 
-def get_user_registrations(db: Session, student_id: int) -> List[Registration]:
-    return db.query(Registration).filter(Registration.student_id == student_id).all()
+def _join_waitlist(db: Session, event_id: int, student_id: int) -> int:
+    """Queue a student for the event (once) and return their position"""
+    entry = _insert_unless_duplicate(db, WaitlistEntry, student_id=student_id, event_id=event_id)
+    entry_id = entry.id if entry is not None else db.query(WaitlistEntry.id).filter(
+        WaitlistEntry.student_id == student_id, WaitlistEntry.event_id == event_id
+    ).scalar()
+    return db.query(func.count(WaitlistEntry.id)).filter(WaitlistEntry.event_id == event_id, WaitlistEntry.id <= entry_id).scalar()
 
-def get_event_registrations(db: Session, event_id: int) -> List[Registration]:
-    return db.query(Registration).filter(Registration.event_id == event_id).all()
+def _fill_from_waitlist(db: Session, event_id: int) -> List[Row]:
+    """Register students from the front of the event's waitlist while it has
+    seats. Runs in the caller's transaction; returns the new registrations."""
+    promoted = []
+    while True:
+        entry = db.query(WaitlistEntry.id, WaitlistEntry.student_id).filter(
+            WaitlistEntry.event_id == event_id
+        ).order_by(WaitlistEntry.id).first()
+        if entry is None or not _take_seat(db, event_id):
+            return promoted
+        removed = db.query(WaitlistEntry).filter(WaitlistEntry.id == entry.id).delete(synchronize_session=False)
+        db_registration = _insert_unless_duplicate(db, Registration, student_id=entry.student_id, event_id=event_id) if removed else None
+        if db_registration is None:
+            # Another promotion took the entry, or the student registered some other way
+            _give_seat_back(db, event_id)
+            continue
+        _count_student_registration(db, entry.student_id, 1)
+        promoted.append(db_registration)
+
+def fill_from_waitlist(db: Session, event_id: int) -> List[Row]:
+    """Promote waitlisted students into seats that opened up (after the
+    capacity went up) and commit"""
+    promoted = _fill_from_waitlist(db, event_id)
+    db.commit()
+    return promoted
+
+def cancel_registration(db: Session, registration_id: int, student_id: int, event_id: int) -> Tuple[str, List[Row]]:
+    """Delete a registration and give its seat to the front of the event's
+    waitlist. Returns (outcome, promoted registrations), where outcome is
+    "cancelled", "checked_in" (attendance or feedback already refers to it,
+    so it stays) or "not_found"."""
+    for model in (Attendance, Feedback):
+        if db.query(model.id).filter(model.registration_id == registration_id).first() is not None:
+            return CHECKED_IN, []
+    # "fetch" also drops the deleted object from the session, so its id can't alias a promoted registration's
+    if not db.query(Registration).filter(Registration.id == registration_id).delete(synchronize_session="fetch"):
+        db.commit()
+        return NOT_FOUND, []
+    _give_seat_back(db, event_id)
+    _count_student_registration(db, student_id, -1)
+    # A seat and a place in line at once would re-register them on the next promotion
+    _remove_from_waitlist(db, event_id, student_id)
+    promoted = _fill_from_waitlist(db, event_id)
+    db.commit()
+    return CANCELLED, promoted
+
+def _remove_from_waitlist(db: Session, event_id: int, student_id: int) -> int:
+    return db.query(WaitlistEntry).filter(
+        WaitlistEntry.event_id == event_id, WaitlistEntry.student_id == student_id
+    ).delete(synchronize_session=False)
+
+def leave_waitlist(db: Session, event_id: int, student_id: int) -> bool:
+    """Take a student off an event's waitlist. False if they weren't on it."""
+    removed = _remove_from_waitlist(db, event_id, student_id)
+    db.commit()
+    return bool(removed)
+
+def bulk_insert_registrations(db: Session, rows: List[dict]) -> Tuple[int, List[dict]]:
+    """Insert registrations with one multi-row INSERT, skipping ones that already
+    exist, within their events' max_attendees.
+
+    Seats are taken per event like admit_registration takes them, so an
+    import can't overbook an event or go ahead of its waitlist; rows past
+    the last seat are left out, in order. Returns (how many were inserted,
+    the rows refused because their event was full). The caller commits.
+    """
+    if not rows:
+        return 0, []
+    existing = set()
+    pairs = list({(row["student_id"], row["event_id"]) for row in rows})
+    for start in range(0, len(pairs), IN_CLAUSE_CHUNK_SIZE):
+        existing.update(db.query(Registration.student_id, Registration.event_id).filter(
+            tuple_(Registration.student_id, Registration.event_id).in_(pairs[start:start + IN_CLAUSE_CHUNK_SIZE])
+        ).all())
+    wanted: Dict[int, List[dict]] = defaultdict(list)
+    for row in rows:
+        if (row["student_id"], row["event_id"]) not in existing:
+            existing.add((row["student_id"], row["event_id"]))
+            wanted[row["event_id"]].append(row)
+    admitted, refused = [], []
+    for event_id in sorted(wanted):
+        seats = _take_seats(db, event_id, len(wanted[event_id]))
+        admitted += wanted[event_id][:seats]
+        refused += wanted[event_id][seats:]
+    if not admitted:
+        return 0, refused
+    conflict_insert = _CONFLICT_INSERTS[db.get_bind(Registration).dialect.name]
+    stmt = (
+        conflict_insert(Registration.__table__)
+        .on_conflict_do_nothing(index_elements=["student_id", "event_id"])
+        .returning(Registration.__table__.c.student_id, Registration.__table__.c.event_id)
+    )
+    inserted = [tuple(row) for row in db.execute(stmt, admitted).all()]
+    # Registered through the API since the lookup above: their seats go back
+    unused = Counter(row["event_id"] for row in admitted) - Counter(event_id for _, event_id in inserted)
+    _increment_counts(db, EventActivitySummary, "event_id", EVENT_ACTIVITY_COUNTS,
+                      {event_id: Counter(registration_count=-count) for event_id, count in unused.items()})
+    _increment_counts(db, StudentActivitySummary, "student_id", STUDENT_ACTIVITY_COUNTS,
+                      {student_id: Counter(registration_count=count) for student_id, count in Counter(student_id for student_id, _ in inserted).items()})
+    for start in range(0, len(inserted), IN_CLAUSE_CHUNK_SIZE):
+        db.query(WaitlistEntry).filter(
+            tuple_(WaitlistEntry.student_id, WaitlistEntry.event_id).in_(inserted[start:start + IN_CLAUSE_CHUNK_SIZE])
+        ).delete(synchronize_session=False)
+    return len(inserted), refused
+
+def get_registration_by_id(db: Session, registration_id: int) -> Optional[Registration]:
+    return db.query(Registration).filter(Registration.id == registration_id).first()
+
+def get_registration_id(db: Session, student_id: int, event_id: int) -> Optional[int]:
+    """Id of the student's registration for the event, without loading it"""
+    return db.query(Registration.id).filter(
+        Registration.student_id == student_id,
+        Registration.event_id == event_id
+    ).scalar()
+
+def get_registered_student_ids(db: Session, event_id: int) -> List[int]:
+    return [student_id for (student_id,) in db.query(Registration.student_id).filter(Registration.event_id == event_id)]
+
+def get_registration(db: Session, student_id: int, event_id: int) -> Optional[Registration]:
+    return db.query(Registration).filter(
+        Registration.student_id == student_id,
+        Registration.event_id == event_id
+    ).first()
+
+def get_user_registrations(db: Session, student_id: int, limit: Optional[int] = None, after_id: Optional[int] = None, expand: bool = False) -> List[Registration]:
+    query = _with_event(db.query(Registration).filter(Registration.student_id == student_id), Registration, expand)
+    return _paginate(query, Registration, limit=limit, after_id=after_id).all()
+
+def get_event_registrations(db: Session, event_id: int, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Registration]:
+    query = db.query(Registration).filter(Registration.event_id == event_id)
+    return _paginate(query, Registration, limit=limit, after_id=after_id).all()
+
+def get_all_registrations(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Registration]:
+    return _paginate(db.query(Registration), Registration, limit=limit, after_id=after_id).all()
 
 # Attendance CRUD operations
-def create_attendance(db: Session, attendance_data: AttendanceCreate, student_id: int) -> Attendance:
-    db_attendance = Attendance(
+def create_attendance(db: Session, attendance_data: AttendanceCreate, student_id: int) -> Optional[Row]:
+    """Record a check-in. Returns None if the student already checked in to the event."""
+    db_attendance = _insert_unless_duplicate(
+        db, Attendance,
         registration_id=attendance_data.registration_id,
         student_id=student_id,
         event_id=attendance_data.event_id
     )
-    db.add(db_attendance)
+    if db_attendance is not None:
+        _record_activity(db, attendance=[(student_id, attendance_data.event_id)])
     db.commit()
-    db.refresh(db_attendance)
     return db_attendance
 
-def get_user_attendance(db: Session, student_id: int) -> List[Attendance]:
-    return db.query(Attendance).filter(Attendance.student_id == student_id).all()
+def get_attendance(db: Session, student_id: int, event_id: int) -> Optional[Attendance]:
+    return db.query(Attendance).filter(
+        Attendance.student_id == student_id,
+        Attendance.event_id == event_id
+    ).first()
+
+def bulk_create_attendance(db: Session, event_id: int, checkins: Sequence[Tuple[int, Optional[datetime]]],
+                           signed_registrations: Optional[Dict[int, int]] = None) -> List[Tuple[str, Optional[int]]]:
+    """Check in many students to one event in a single transaction.
+
+    `checkins` is a list of (student_id, check_in_time) pairs; a None time means
+    now. `signed_registrations` maps students scanned with a signed token to
+    the registration it names; if that registration was cancelled, the
+    student is "not_registered" even if they registered again. Registrations
+    and existing check-ins are looked up with one set query per chunk of
+    students, and all new rows go in with one multi-row INSERT. Returns a
+    (status, attendance_id) pair per input, where status is "marked",
+    "duplicate" (already checked in, or repeated in this batch) or
+    "not_registered".
+    """
+    student_ids = list({student_id for student_id, _ in checkins})
+    registration_ids: Dict[int, int] = {}
+    already_attended = set()
+    for start in range(0, len(student_ids), IN_CLAUSE_CHUNK_SIZE):
+        chunk = student_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+        registration_ids.update(db.query(Registration.student_id, Registration.id).filter(
+            Registration.event_id == event_id, Registration.student_id.in_(chunk)
+        ).all())
+        already_attended.update(student_id for (student_id,) in db.query(Attendance.student_id).filter(
+            Attendance.event_id == event_id, Attendance.student_id.in_(chunk)
+        ).all())
+
+    results: List[Tuple[str, Optional[int]]] = []
+    new_rows = []
+    now = datetime.utcnow()
+    signed_registrations = signed_registrations or {}
+    for student_id, check_in_time in checkins:
+        if student_id not in registration_ids or signed_registrations.get(student_id, registration_ids[student_id]) != registration_ids[student_id]:
+            results.append(("not_registered", None))
+        elif student_id in already_attended:
+            results.append(("duplicate", None))
+        else:
+            already_attended.add(student_id)
+            results.append(("marked", None))
+            new_rows.append({
+                "registration_id": registration_ids[student_id],
+                "student_id": student_id,
+                "event_id": event_id,
+                "check_in_time": check_in_time or now,
+            })
+
+    if new_rows:
+        # ON CONFLICT covers check-ins that landed between our lookup and this insert
+        inserted = insert_attendance_rows(db, new_rows)
+        for position, (status, _) in enumerate(results):
+            if status == "marked":
+                student_id = checkins[position][0]
+                if student_id in inserted:
+                    results[position] = ("marked", inserted[student_id])
+                else:
+                    results[position] = ("duplicate", None)
+    return results
+
+def insert_attendance_rows(db: Session, rows: List[dict]) -> Dict[int, int]:
+    """Insert attendance rows with one multi-row INSERT ... ON CONFLICT DO NOTHING
+    and commit. Rows must all be for the same event. Returns student_id ->
+    attendance id for the rows actually inserted; the rest were already there.
+    """
+    if not rows:
+        return {}
+    conflict_insert = _CONFLICT_INSERTS[db.get_bind(Attendance).dialect.name]
+    stmt = (
+        conflict_insert(Attendance.__table__)
+        .on_conflict_do_nothing(index_elements=["student_id", "event_id"])
+        .returning(Attendance.__table__.c.student_id, Attendance.__table__.c.id)
+    )
+    inserted = dict(db.execute(stmt, rows).all())
+    _record_activity(db, attendance=[(student_id, rows[0]["event_id"]) for student_id in inserted])
+    db.commit()
+    return inserted
+
+def get_event_roster(db: Session, event_id: int) -> Tuple[Dict[int, int], List[int]]:
+    """Registered student_id -> registration_id, and the student ids already checked in"""
+    registrations = dict(db.query(Registration.student_id, Registration.id).filter(
+        Registration.event_id == event_id
+    ).all())
+    attended = [student_id for (student_id,) in db.query(Attendance.student_id).filter(
+        Attendance.event_id == event_id
+    ).all()]
+    return registrations, attended
+
+def get_user_attendance(db: Session, student_id: int, limit: Optional[int] = None, after_id: Optional[int] = None, expand: bool = False) -> List[Attendance]:
+    query = _with_event(db.query(Attendance).filter(Attendance.student_id == student_id), Attendance, expand)
+    return _paginate(query, Attendance, limit=limit, after_id=after_id).all()
+
+def get_all_attendance(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Attendance]:
+    return _paginate(db.query(Attendance), Attendance, limit=limit, after_id=after_id).all()
 
 # Feedback CRUD operations
 def create_feedback(db: Session, feedback_data: FeedbackCreate, student_id: int) -> Feedback:
@@ -123,23 +708,341 @@ def create_feedback(db: Session, feedback_data: FeedbackCreate, student_id: int)
         comment=feedback_data.comment
     )
     db.add(db_feedback)
+    _add_to_rating_summary(db, feedback_data.event_id, feedback_data.rating)
+    _record_activity(db, feedback=[(student_id, feedback_data.event_id)])
+    # Feedback changes the event's average rating and its feedback list
+    _bump_versions(db, "events", f"event:{feedback_data.event_id}")
     db.commit()
     db.refresh(db_feedback)
     return db_feedback
 
-def get_user_feedback(db: Session, student_id: int) -> List[Feedback]:
-    return db.query(Feedback).filter(Feedback.student_id == student_id).all()
+def get_user_feedback(db: Session, student_id: int, limit: Optional[int] = None, after_id: Optional[int] = None, expand: bool = False) -> List[Feedback]:
+    query = _with_event(db.query(Feedback).filter(Feedback.student_id == student_id), Feedback, expand)
+    return _paginate(query, Feedback, limit=limit, after_id=after_id).all()
+
+def get_event_feedback(db: Session, event_id: int, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Feedback]:
+    query = db.query(Feedback).filter(Feedback.event_id == event_id)
+    return _paginate(query, Feedback, limit=limit, after_id=after_id).all()
+
+def get_all_feedback(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Feedback]:
+    return _paginate(db.query(Feedback), Feedback, limit=limit, after_id=after_id).all()
+
+# Rating summary operations
+def _add_to_rating_summary(db: Session, event_id: int, rating: int) -> None:
+    """Fold one rating into the event's summary row inside the caller's transaction.
 
-def get_event_feedback(db: Session, event_id: int) -> List[Feedback]:
-    return db.query(Feedback).filter(Feedback.event_id == event_id).all()
+    The increment is done in SQL so concurrent feedback for the same event
+    doesn't lose updates.
+    """
+    values = {
+        EventRatingSummary.rating_count: EventRatingSummary.rating_count + 1,
+        EventRatingSummary.rating_sum: EventRatingSummary.rating_sum + rating,
+    }
+    bucket = getattr(EventRatingSummary, f"rating_{rating}", None)
+    if bucket is not None:
+        values[bucket] = bucket + 1
+    updated = db.query(EventRatingSummary).filter(
+        EventRatingSummary.event_id == event_id
+    ).update(values, synchronize_session=False)
+    if not updated:
+        # Events created before summaries existed have no row yet
+        summary = EventRatingSummary(event_id=event_id, rating_count=1, rating_sum=rating)
+        if bucket is not None:
+            setattr(summary, bucket.key, 1)
+        db.add(summary)
+
+def get_event_rating_summary(db: Session, event_id: int) -> Optional[EventRatingSummary]:
+    return db.query(EventRatingSummary).filter(EventRatingSummary.event_id == event_id).first()
+
+def get_event_average_ratings(db: Session, event_ids: Iterable[int]) -> Dict[int, float]:
+    """Average rating for several events with a single summary lookup"""
+    event_ids = list(event_ids)
+    averages = {event_id: 0.0 for event_id in event_ids}
+    if not event_ids:
+        return averages
+    rows = db.query(
+        EventRatingSummary.event_id, EventRatingSummary.rating_sum, EventRatingSummary.rating_count
+    ).filter(EventRatingSummary.event_id.in_(event_ids)).all()
+    for event_id, rating_sum, rating_count in rows:
+        if rating_count:
+            averages[event_id] = round(rating_sum / rating_count, 1)
+    return averages
 
 def get_event_average_rating(db: Session, event_id: int) -> float:
-    """Calculate average rating for an event"""
-    feedbacks = db.query(Feedback).filter(Feedback.event_id == event_id).all()
-    if not feedbacks:
-        return 0.0
-    total_rating = sum(f.rating for f in feedbacks)
-    return round(total_rating / len(feedbacks), 1)
-
-def get_all_feedback(db: Session) -> List[Feedback]:
-    return db.query(Feedback).all()
+    """Average rating for an event, read from its rating summary"""
+    return get_event_average_ratings(db, [event_id])[event_id]
+
+def rebuild_event_rating_summaries(db: Session) -> int:
+    """Recompute every rating summary from the feedback table.
+
+    Used to backfill databases that have feedback from before summaries were
+    maintained. Returns the number of summary rows written.
+    """
+    rows = db.query(
+        Feedback.event_id,
+        func.count(Feedback.id),
+        func.coalesce(func.sum(Feedback.rating), 0),
+        *[func.sum(case((Feedback.rating == value, 1), else_=0)) for value in range(1, 6)]
+    ).group_by(Feedback.event_id).all()
+    db.query(EventRatingSummary).delete(synchronize_session=False)
+    for event_id, rating_count, rating_sum, *histogram in rows:
+        summary = EventRatingSummary(event_id=event_id, rating_count=rating_count, rating_sum=rating_sum)
+        for value, count in enumerate(histogram, start=1):
+            setattr(summary, f"rating_{value}", count or 0)
+        db.add(summary)
+    _bump_versions(db, "events", *(f"event:{event_id}" for event_id, *_ in rows))
+    db.commit()
+    return len(rows)
+
+def ensure_event_rating_summaries(db: Session) -> None:
+    """Backfill rating summaries once if feedback exists but no summaries do"""
+    has_summaries = db.query(EventRatingSummary.event_id).first() is not None
+    if not has_summaries and db.query(Feedback.id).first() is not None:
+        rebuild_event_rating_summaries(db)
+
+# Activity rollups
+EVENT_ACTIVITY_COUNTS = ("registration_count", "attendance_count")
+STUDENT_ACTIVITY_COUNTS = ("registration_count", "attendance_count", "feedback_count")
+
+def _increment_counts(db: Session, model, key: str, columns: Sequence[str], deltas: Dict[int, Counter]) -> None:
+    """Add per-row deltas to a rollup table with one multi-row upsert.
+
+    Missing rows are created. The increment happens in SQL, so concurrent
+    writers don't lose updates, and keys go in sorted order so they lock
+    rows in the same order.
+    """
+    if not deltas:
+        return
+    table = model.__table__
+    conflict_insert = _CONFLICT_INSERTS[db.get_bind(model).dialect.name]
+    stmt = conflict_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={**{name: table.c[name] + stmt.excluded[name] for name in columns}, "updated_at": stmt.excluded.updated_at}
+    )
+    now = datetime.utcnow()
+    db.execute(stmt, [
+        {key: row_key, **{name: deltas[row_key][name] for name in columns}, "updated_at": now}
+        for row_key in sorted(deltas)
+    ])
+
+def _record_activity(db: Session, registrations: Iterable[Tuple[int, int]] = (), attendance: Iterable[Tuple[int, int]] = (), feedback: Iterable[Tuple[int, int]] = ()) -> None:
+    """Fold newly inserted (student_id, event_id) pairs into the activity rollups
+    inside the caller's transaction."""
+    events: Dict[int, Counter] = defaultdict(Counter)
+    students: Dict[int, Counter] = defaultdict(Counter)
+    for name, pairs in (("registration_count", registrations), ("attendance_count", attendance), ("feedback_count", feedback)):
+        for student_id, event_id in pairs:
+            students[student_id][name] += 1
+            if name in EVENT_ACTIVITY_COUNTS:
+                events[event_id][name] += 1
+    _increment_counts(db, EventActivitySummary, "event_id", EVENT_ACTIVITY_COUNTS, events)
+    _increment_counts(db, StudentActivitySummary, "student_id", STUDENT_ACTIVITY_COUNTS, students)
+
+def _lock_activity_rollups(db: Session) -> None:
+    """Hold off rollup writers until the caller's transaction ends.
+
+    Every writer changes a rollup row in the same transaction as the raw row
+    it counts, so with the rollups locked a recount can't fall between the
+    two. On PostgreSQL that's SELECT ... FOR UPDATE over the summaries, events
+    before students in key order as the writers lock them; SQLite has only the
+    one database write lock, which pysqlite doesn't take until the first write.
+    """
+    if db.get_bind(EventActivitySummary).dialect.name == "sqlite":
+        summaries = EventActivitySummary.__table__
+        db.execute(update(summaries).where(false()).values(registration_count=summaries.c.registration_count))
+        return
+    db.query(EventActivitySummary.event_id).order_by(EventActivitySummary.event_id).with_for_update().all()
+    db.query(StudentActivitySummary.student_id).order_by(StudentActivitySummary.student_id).with_for_update().all()
+
+def _count_activity(db: Session, event_ids: Optional[Collection[int]] = None, student_ids: Optional[Collection[int]] = None) -> Tuple[Dict[int, Counter], Dict[int, Counter]]:
+    """Registrations, check-ins and feedback per event and per student, counted
+    from the raw tables; with ids, only for those events and students."""
+    events = db.query(Event.id)
+    if event_ids is not None:
+        events = events.filter(Event.id.in_(event_ids))
+    event_counts: Dict[int, Counter] = {event_id: Counter() for (event_id,) in events.all()}
+    student_counts: Dict[int, Counter] = defaultdict(Counter)
+    for model, name in ((Registration, "registration_count"), (Attendance, "attendance_count"), (Feedback, "feedback_count")):
+        if name in EVENT_ACTIVITY_COUNTS and (event_ids is None or event_ids):
+            query = db.query(model.event_id, func.count(model.id)).group_by(model.event_id)
+            if event_ids is not None:
+                query = query.filter(model.event_id.in_(event_ids))
+            for event_id, count in query.all():
+                if event_id in event_counts:
+                    event_counts[event_id][name] = count
+        if student_ids is None or student_ids:
+            query = db.query(model.student_id, func.count(model.id)).group_by(model.student_id)
+            if student_ids is not None:
+                query = query.filter(model.student_id.in_(student_ids))
+            for student_id, count in query.all():
+                student_counts[student_id][name] = count
+    return event_counts, student_counts
+
+def _rollup_deltas(db: Session, model, key: str, names: Sequence[str], expected: Dict[int, Counter], keys: Optional[Collection[int]] = None) -> Dict[int, Counter]:
+    """What to add to each rollup row so it matches `expected`; with keys, only those rows are read"""
+    query = db.query(getattr(model, key), *(getattr(model, name) for name in names))
+    if keys is not None:
+        query = query.filter(getattr(model, key).in_(keys))
+    current = {row[0]: row[1:] for row in query.all()}
+    deltas: Dict[int, Counter] = {}
+    for row_key in expected.keys() | current.keys():
+        have = dict(zip(names, current.get(row_key, (0,) * len(names))))
+        want = expected.get(row_key, Counter())
+        delta = Counter({name: want[name] - have[name] for name in names})
+        # An event with no summary row at all still gets one, with zeros
+        if any(delta.values()) or row_key not in current:
+            deltas[row_key] = delta
+    return deltas
+
+def reconcile_activity_rollups(db: Session) -> int:
+    """Recount the activity rollups from the raw tables and fix rows that drifted.
+
+    The full scan, which covers every registration, attendance and feedback
+    row, runs without a lock, so writers don't wait for it: run it
+    periodically, not per request. Rows it finds off are then recounted with
+    the rollups locked (see _lock_activity_rollups) and fixed from that
+    recount, so a registration, check-in or feedback landing during the scan
+    can't be mistaken for drift. Returns the number of rows corrected.
+    """
+    event_counts, student_counts = _count_activity(db)
+    suspects = (
+        set(_rollup_deltas(db, EventActivitySummary, "event_id", EVENT_ACTIVITY_COUNTS, event_counts)),
+        set(_rollup_deltas(db, StudentActivitySummary, "student_id", STUDENT_ACTIVITY_COUNTS, student_counts)),
+    )
+    if not any(suspects):
+        db.rollback()
+        return 0
+
+    # Past a chunk's worth of ids, a full recount is cheaper than the IN lists
+    suspects = tuple(None if len(keys) > IN_CLAUSE_CHUNK_SIZE else keys for keys in suspects)
+    _lock_activity_rollups(db)
+    event_counts, student_counts = _count_activity(db, *suspects)
+    corrected = 0
+    for model, key, names, expected, keys in (
+        (EventActivitySummary, "event_id", EVENT_ACTIVITY_COUNTS, event_counts, suspects[0]),
+        (StudentActivitySummary, "student_id", STUDENT_ACTIVITY_COUNTS, student_counts, suspects[1]),
+    ):
+        deltas = _rollup_deltas(db, model, key, names, expected, keys)
+        _increment_counts(db, model, key, names, deltas)
+        corrected += len(deltas)
+    db.commit()
+    return corrected
+
+def ensure_activity_rollups(db: Session) -> None:
+    """Backfill the activity rollups once if events exist but no rollups do"""
+    has_rollups = db.query(EventActivitySummary.event_id).first() is not None
+    if not has_rollups and db.query(Event.id).first() is not None:
+        reconcile_activity_rollups(db)
+
+def get_event_counters(db: Session, event_ids: Iterable[int]) -> Dict[int, dict]:
+    """Registration and check-in counts and seats left for several events, from
+    the activity rollups (one query). Events that don't exist are left out."""
+    event_ids = list(event_ids)
+    if not event_ids:
+        return {}
+    rows = db.query(
+        Event.id, Event.max_attendees,
+        func.coalesce(EventActivitySummary.registration_count, 0),
+        func.coalesce(EventActivitySummary.attendance_count, 0),
+    ).outerjoin(EventActivitySummary, EventActivitySummary.event_id == Event.id).filter(Event.id.in_(event_ids)).all()
+    return {
+        event_id: {
+            "event_id": event_id,
+            "registered": registered,
+            "checked_in": checked_in,
+            "capacity": capacity,
+            "remaining": max(0, capacity - registered) if capacity is not None else None,
+        }
+        for event_id, capacity, registered, checked_in in rows
+    }
+
+def _average(total: int, count: int) -> float:
+    return round(total / count, 1) if count else 0.0
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+def get_top_events(db: Session, by: str = "registrations", limit: int = 10, college_id: Optional[int] = None, event_type: Optional[str] = None) -> List[dict]:
+    """Top events from the rollups, ranked by "registrations", "attendance",
+    "attendance_rate" or "rating". Ranking by registrations walks the
+    registration_count index; the others sort one rollup row per event."""
+    registrations = EventActivitySummary.registration_count
+    attendance = EventActivitySummary.attendance_count
+    rating_count = func.coalesce(EventRatingSummary.rating_count, 0)
+    rating_sum = func.coalesce(EventRatingSummary.rating_sum, 0)
+    rankings = {
+        "registrations": registrations,
+        "attendance": attendance,
+        "attendance_rate": func.coalesce(attendance * 1.0 / func.nullif(registrations, 0), 0),
+        "rating": func.coalesce(rating_sum * 1.0 / func.nullif(rating_count, 0), 0),
+    }
+    query = db.query(
+        Event.id, Event.title, Event.type, Event.date, Event.college_id,
+        registrations, attendance, rating_count, rating_sum
+    ).select_from(EventActivitySummary).join(Event, Event.id == EventActivitySummary.event_id).outerjoin(
+        EventRatingSummary, EventRatingSummary.event_id == EventActivitySummary.event_id
+    )
+    if college_id is not None:
+        query = query.filter(Event.college_id == college_id)
+    if event_type is not None:
+        query = query.filter(Event.type == event_type)
+    rows = query.order_by(rankings[by].desc(), EventActivitySummary.event_id.desc()).limit(limit).all()
+    return [
+        {
+            "event_id": event_id, "title": title, "type": type_, "date": date, "college_id": event_college_id,
+            "registration_count": registration_count, "attendance_count": attendance_count,
+            "attendance_rate": _rate(attendance_count, registration_count),
+            "rating_count": event_rating_count, "average_rating": _average(event_rating_sum, event_rating_count),
+        }
+        for event_id, title, type_, date, event_college_id, registration_count, attendance_count, event_rating_count, event_rating_sum in rows
+    ]
+
+def get_top_students(db: Session, limit: int = 10, college_id: Optional[int] = None) -> List[dict]:
+    """Most active students from the rollups: events attended, then registered."""
+    query = db.query(
+        StudentActivitySummary.student_id, User.full_name, User.college_id,
+        StudentActivitySummary.registration_count, StudentActivitySummary.attendance_count, StudentActivitySummary.feedback_count
+    ).join(User, User.id == StudentActivitySummary.student_id)
+    if college_id is not None:
+        query = query.filter(User.college_id == college_id)
+    rows = query.order_by(
+        # Same column order as the activity index, so it's walked backwards rather than sorted
+        StudentActivitySummary.attendance_count.desc(),
+        StudentActivitySummary.registration_count.desc(),
+        StudentActivitySummary.student_id.desc()
+    ).limit(limit).all()
+    return [
+        {
+            "student_id": student_id, "full_name": full_name, "college_id": student_college_id,
+            "registration_count": registration_count, "attendance_count": attendance_count,
+            "feedback_count": feedback_count, "attendance_rate": _rate(attendance_count, registration_count),
+        }
+        for student_id, full_name, student_college_id, registration_count, attendance_count, feedback_count in rows
+    ]
+
+def get_activity_breakdown(db: Session, by: str = "college") -> List[dict]:
+    """Event, registration, attendance and rating totals per college or per
+    event type. Sums one rollup row per event, so the cost follows the number
+    of events, not registrations. Rates are left to the caller, which may add
+    up several shards first."""
+    group = Event.college_id if by == "college" else Event.type
+    rows = db.query(
+        group,
+        func.count(Event.id),
+        func.coalesce(func.sum(EventActivitySummary.registration_count), 0),
+        func.coalesce(func.sum(EventActivitySummary.attendance_count), 0),
+        func.coalesce(func.sum(EventRatingSummary.rating_count), 0),
+        func.coalesce(func.sum(EventRatingSummary.rating_sum), 0),
+    ).select_from(Event).outerjoin(
+        EventActivitySummary, EventActivitySummary.event_id == Event.id
+    ).outerjoin(
+        EventRatingSummary, EventRatingSummary.event_id == Event.id
+    ).group_by(group).all()
+    return [
+        {
+            "key": str(key), "event_count": event_count, "registration_count": registration_count,
+            "attendance_count": attendance_count, "rating_count": rating_count, "rating_sum": rating_sum,
+        }
+        for key, event_count, registration_count, attendance_count, rating_count, rating_sum in rows
+    ]
@@ -1,17 +1,146 @@
-from sqlalchemy import create_engine
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from contextlib import asynccontextmanager
+from typing import Hashable, Optional
+import asyncio
+import itertools
 import os
+import threading
+import time
 
-# SQLite database configuration
-SQLALCHEMY_DATABASE_URL = "sqlite:///./campus_events.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+from config import (
+    DATABASE_URL, SHARD_DATABASE_URLS, DATABASE_REPLICA_URLS, REPLICA_RETRY_SECONDS, REPLICA_READ_YOUR_WRITES_SECONDS,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS, DB_POOL_PRE_PING, DB_POOL_RECYCLE_SECONDS,
 )
+from metrics import instrument_engine
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def engine_options(url: str) -> dict:
+    """Pool and driver settings for the configured database profile."""
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # In-memory SQLite lives in a single connection; there is no pool to size
+        return {"connect_args": {"check_same_thread": False}}
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+    }
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}  # Needed for SQLite
+    else:
+        options["pool_pre_ping"] = DB_POOL_PRE_PING
+        options["pool_recycle"] = DB_POOL_RECYCLE_SECONDS
+    return options
+
+def sqlite_pragmas() -> list:
+    return [
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",  # negative = KiB rather than pages
+    ]
+
+def apply_sqlite_pragmas(sync_engine, pragmas: list) -> None:
+    """Run the pragmas on every new DBAPI connection the engine opens."""
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def create_engine_for(url: str):
+    sync_engine = create_engine(url, **engine_options(url))
+    if is_sqlite(url):
+        apply_sqlite_pragmas(sync_engine, sqlite_pragmas())
+    instrument_engine(sync_engine)
+    return sync_engine
+
+def to_async_url(url: str) -> str:
+    """Swap a sync driver URL for its asyncio driver (aiosqlite / asyncpg)."""
+    for prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+def create_async_engine_for(url: str, read_only: bool = False):
+    # aiosqlite defaults to NullPool (a new connection and thread per session); pool them
+    options = engine_options(url)
+    if read_only and not is_sqlite(url):
+        options["connect_args"] = {"server_settings": {"default_transaction_read_only": "on"}}
+    async_engine = create_async_engine(to_async_url(url), poolclass=AsyncAdaptedQueuePool, **options)
+    if is_sqlite(url):
+        apply_sqlite_pragmas(async_engine.sync_engine, sqlite_pragmas() + (["PRAGMA query_only=ON"] if read_only else []))
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+engine = create_engine_for(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async engine used by the API routes so DB round trips don't block the event loop
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine_for(SQLALCHEMY_DATABASE_URL)
+
+# Per-college partitioning. Shard 0 is the primary database, which also holds
+# the colleges directory and users without a college; SHARD_DATABASE_URLS add
+# shards 1..n. Each shard has its own engine and pool, so a college's fest-day
+# load queues on its own shard instead of everyone's.
+PARTITIONED = bool(SHARD_DATABASE_URLS)
+shard_engines = [engine] + [create_engine_for(url) for url in SHARD_DATABASE_URLS]
+async_shard_engines = [async_engine] + [create_async_engine_for(url) for url in SHARD_DATABASE_URLS]
+
+def shard_for_college(college_id: Optional[int]) -> int:
+    """Hash partitioning by college id. Changing the shard count moves colleges,
+    so their rows have to be copied to the new shards first."""
+    if college_id is None or not PARTITIONED:
+        return 0
+    return college_id % len(shard_engines)
+
+class PartitionedSession(Session):
+    """Session that sends every statement to the shard picked by scope_session()
+    (shard 0 until a scope is set), so crud.py needs no shard awareness."""
+    shard_binds: list = shard_engines
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return self.shard_binds[self.info.get("shard", 0)]
+
+class AsyncPartitionedSession(PartitionedSession):
+    shard_binds = [shard_engine.sync_engine for shard_engine in async_shard_engines]
+
+def scope_session(db, college_id: Optional[int]):
+    """Route the rest of this session's statements to the college's shard."""
+    db.info["shard"] = shard_for_college(college_id)
+    return db
+
+def session_shard(db) -> int:
+    return db.info.get("shard", 0)
+
+if PARTITIONED:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=PartitionedSession)
+    # expire_on_commit=False: objects returned from a commit stay readable without
+    # an implicit (and, under asyncio, illegal) lazy refresh
+    AsyncSessionLocal = async_sessionmaker(sync_session_class=AsyncPartitionedSession, autoflush=False, expire_on_commit=False)
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -21,3 +150,158 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+class ReplicaRouter:
+    """Hands out read-only sessions on replica engines, round-robin.
+
+    A replica whose connection fails is benched for `retry_seconds` and the
+    read falls through to the next replica, then to the primary. Callers that
+    just wrote pin themselves (`pin_to_primary`) so their next reads see it.
+    """
+
+    def __init__(self, replica_engines: list, retry_seconds: float = REPLICA_RETRY_SECONDS, read_your_writes_seconds: float = REPLICA_READ_YOUR_WRITES_SECONDS):
+        self.replica_engines = replica_engines
+        self.retry_seconds = retry_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._next = itertools.cycle(range(len(replica_engines))) if replica_engines else None
+        self._benched_until = {}  # replica index -> monotonic time
+        self._pinned_until = {}
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.failovers = 0
+
+    def pin_to_primary(self, key: Hashable):
+        if self.replica_engines:
+            now = time.monotonic()
+            with self._lock:
+                if len(self._pinned_until) >= 10000:
+                    self._pinned_until = {k: until for k, until in self._pinned_until.items() if until > now}
+                self._pinned_until[key] = now + self.read_your_writes_seconds
+
+    def is_pinned(self, key: Optional[Hashable]) -> bool:
+        if key is None or not self._pinned_until:
+            return False
+        with self._lock:
+            until = self._pinned_until.get(key)
+            if until is not None and until <= time.monotonic():
+                del self._pinned_until[key]
+                until = None
+        return until is not None
+
+    def _candidates(self) -> list:
+        """Healthy replica indexes in round-robin order starting from the next one."""
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._next)
+            order = [(start + offset) % len(self.replica_engines) for offset in range(len(self.replica_engines))]
+            return [index for index in order if self._benched_until.get(index, 0) <= now]
+
+    def _bench(self, index: int):
+        with self._lock:
+            self._benched_until[index] = time.monotonic() + self.retry_seconds
+            self.failovers += 1
+
+    @asynccontextmanager
+    async def session(self, pin_key: Optional[Hashable] = None):
+        if self.replica_engines and not self.is_pinned(pin_key):
+            for index in self._candidates():
+                db = AsyncSession(self.replica_engines[index], autoflush=False, expire_on_commit=False)
+                try:
+                    await db.connection()  # connect now so an unreachable replica fails over here
+                except (DBAPIError, OSError):
+                    await db.close()
+                    self._bench(index)
+                    continue
+                self.replica_reads += 1
+                try:
+                    yield db
+                finally:
+                    await db.close()
+                return
+        self.primary_reads += 1
+        # Tagged so lookups that must hit the primary can reuse this session
+        # instead of holding its connection while waiting for a second one
+        async with AsyncSessionLocal(info={"primary_read": True}) as db:
+            yield db
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": len(self.replica_engines),
+            "healthy_replicas": sum(1 for index in range(len(self.replica_engines)) if self._benched_until.get(index, 0) <= now),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "failovers": self.failovers,
+            "pinned_users": len(self._pinned_until),
+        }
+
+    async def dispose(self):
+        for replica_engine in self.replica_engines:
+            await replica_engine.dispose()
+
+# Replicas mirror the single primary; with partitioning on, reads go to the shards
+replica_router = ReplicaRouter([] if PARTITIONED else [create_async_engine_for(url, read_only=True) for url in DATABASE_REPLICA_URLS])
+
+async def get_async_read_db():
+    """Read-only session for GET routes: a replica when one is configured and
+    reachable, otherwise the primary. Never write through it."""
+    async with replica_router.session() as db:
+        yield db
+
+async def scatter(db, function, *args, **kwargs) -> list:
+    """Run an async_crud function on every shard concurrently; results come
+    back in shard order. Unpartitioned, it's one call on `db` (when given)."""
+    if not PARTITIONED and db is not None:
+        return [await function(db, *args, **kwargs)]
+
+    async def on_shard(index: int):
+        async with AsyncSessionLocal(info={"shard": index}) as shard_db:
+            return await function(shard_db, *args, **kwargs)
+
+    return await asyncio.gather(*(on_shard(index) for index in range(len(async_shard_engines))))
+
+async def scatter_stream(db, stream_function, *args, **kwargs):
+    """Chain an async_crud row stream over every shard, one shard at a time."""
+    if not PARTITIONED:
+        async for row in stream_function(db, *args, **kwargs):
+            yield row
+        return
+    for index in range(len(async_shard_engines)):
+        async with AsyncSessionLocal(info={"shard": index}) as shard_db:
+            async for row in stream_function(shard_db, *args, **kwargs):
+                yield row
+
+def row_id(row) -> int:
+    """The id of an ORM object, a column Row or a plain row dict"""
+    return row["id"] if isinstance(row, dict) else row.id
+
+def merge_by_id(pages: list, limit: Optional[int] = None) -> list:
+    """Merge per-shard keyset pages into one page ordered by id.
+
+    Ids are only unique within a shard. The page stops at the lowest last id
+    among the shards that returned a full page (they may have more rows past
+    it), and rows sharing the boundary id stay together, so `after_id` set to
+    the last id resumes without skipping or repeating rows.
+    """
+    full_page_ends = [row_id(page[-1]) for page in pages if limit is not None and len(page) >= limit]
+    cut = min(full_page_ends) if full_page_ends else None
+    rows = sorted((row for page in pages for row in page if cut is None or row_id(row) <= cut), key=row_id)
+    if limit is not None and len(rows) > limit:
+        last_id = row_id(rows[limit - 1])
+        rows = [row for row in rows if row_id(row) <= last_id]
+    return rows
+
+def run_migrations():
+    """Bring the database schema up to date (equivalent to `alembic upgrade head`)
+    on the primary and every shard."""
+    alembic_cfg = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    for shard_engine in shard_engines:
+        with shard_engine.begin() as connection:
+            alembic_cfg.attributes["connection"] = connection
+            command.upgrade(alembic_cfg, "head")
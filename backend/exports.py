@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Streaming export of registrations, attendance and feedback to CSV, Parquet or
+Arrow IPC (stream format), for offline analysis.
+
+Rows come off a server-side cursor EXPORT_BATCH_SIZE at a time and each batch
+is encoded and written out before the next one is fetched (one Parquet row
+group per batch), so memory stays flat however large the table is. Parquet
+and Arrow need the optional `pyarrow` package; CSV works without it.
+
+Options:
+- `--join` adds event (title, type, date, college) and student (name,
+  college) columns
+- `--college-id` keeps rows for that college's events
+- `--since` / `--until` bound the row's timestamp (created_at, or
+  check_in_time for attendance); since is inclusive, until exclusive
+- `--watermark` exports only rows added after a previous export. Every
+  export reports the watermark to pass next time: the highest row id it
+  covered, one per shard when data is partitioned ("120" or "120,98").
+
+Usage (from the backend directory):
+    python exports.py registrations --format parquet --out registrations.parquet --join
+    python exports.py attendance --format csv --out attendance.csv --since 2026-01-01 --watermark 4200
+"""
+import argparse
+import csv
+import io
+import sys
+from datetime import datetime
+from typing import IO, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, select
+from starlette.concurrency import run_in_threadpool
+
+import crud
+from config import EXPORT_BATCH_SIZE
+from database import AsyncSessionLocal, SessionLocal, shard_engines, shard_for_college, PARTITIONED
+from models import Attendance, Event, Feedback, Registration, User
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional: only the Parquet and Arrow formats need it
+    pyarrow = None
+
+EXPORT_TABLES = {"registrations": Registration, "attendance": Attendance, "feedback": Feedback}
+EXPORT_FORMATS = ("csv", "parquet", "arrow")
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+EXPORT_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+
+class ExportFormatUnavailable(Exception):
+    pass
+
+def _timestamp_column(model):
+    return model.check_in_time if model is Attendance else model.created_at
+
+def export_columns(kind: str, with_dimensions: bool = False) -> list:
+    model = EXPORT_TABLES[kind]
+    columns = list(model.__table__.columns)
+    if with_dimensions:
+        columns += [
+            Event.title.label("event_title"),
+            Event.type.label("event_type"),
+            Event.date.label("event_date"),
+            Event.college_id.label("event_college_id"),
+            User.full_name.label("student_name"),
+            User.college_id.label("student_college_id"),
+        ]
+    return columns
+
+def export_query(kind: str, after_id: int, upto_id: int, college_id: Optional[int] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None, with_dimensions: bool = False):
+    """Rows with after_id < id <= upto_id matching the filters, in id order.
+
+    Bounding by the highest id seen when the export started keeps the
+    reported watermark exact while new rows keep arriving.
+    """
+    model = EXPORT_TABLES[kind]
+    query = select(*export_columns(kind, with_dimensions)).select_from(model)
+    if with_dimensions or college_id is not None:
+        query = query.join(Event, Event.id == model.event_id)
+    if with_dimensions:
+        query = query.join(User, User.id == model.student_id)
+    query = query.where(model.id > after_id, model.id <= upto_id)
+    if college_id is not None:
+        query = query.where(Event.college_id == college_id)
+    if since is not None:
+        query = query.where(_timestamp_column(model) >= since)
+    if until is not None:
+        query = query.where(_timestamp_column(model) < until)
+    return query.order_by(model.id)
+
+def export_shards(college_id: Optional[int]) -> List[int]:
+    """Shards holding the rows to export; one college lives on one shard."""
+    if PARTITIONED and college_id is not None:
+        return [shard_for_college(college_id)]
+    return list(range(len(shard_engines)))
+
+def parse_watermark(watermark: Optional[str], shard_count: int) -> List[int]:
+    if not watermark:
+        return [0] * shard_count
+    ids = [int(part) for part in watermark.split(",")]
+    if len(ids) != shard_count:
+        raise ValueError(f"Watermark must have {shard_count} comma-separated ids, one per shard")
+    return ids
+
+def format_watermark(ids: Sequence[int]) -> str:
+    return ",".join(str(i) for i in ids)
+
+def next_watermark(after: Sequence[int], upto: Sequence[int], shards: Iterable[int]) -> List[int]:
+    """Exported shards move up to where this export stopped; the rest keep their place."""
+    shards = set(shards)
+    return [upto[shard] if shard in shards else after[shard] for shard in range(len(after))]
+
+class _CsvEncoder:
+    def __init__(self, columns: list):
+        self.names = [column.name for column in columns]
+
+    def _write(self, rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def begin(self) -> bytes:
+        return self._write([self.names])
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        return self._write([[value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows])
+
+    def end(self) -> bytes:
+        return b""
+
+class _ByteSink:
+    """Writable file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_type(column_type):
+    if isinstance(column_type, Integer):
+        return pyarrow.int64()
+    if isinstance(column_type, Float):
+        return pyarrow.float64()
+    if isinstance(column_type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column_type, DateTime):
+        return pyarrow.timestamp("us")
+    return pyarrow.string()
+
+class _ArrowEncoder:
+    def __init__(self, columns: list, parquet: bool):
+        self.schema = pyarrow.schema([(column.name, _arrow_type(column.type)) for column in columns])
+        self.sink = _ByteSink()
+        if parquet:
+            self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+
+    def begin(self) -> bytes:
+        return self.sink.drain()
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        values = list(zip(*rows)) if rows else [()] * len(self.schema)
+        arrays = [pyarrow.array(column_values, type=field.type) for column_values, field in zip(values, self.schema)]
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def end(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+def make_encoder(fmt: str, columns: list):
+    if fmt == "csv":
+        return _CsvEncoder(columns)
+    if fmt in ("parquet", "arrow"):
+        if pyarrow is None:
+            raise ExportFormatUnavailable(f"{fmt} export requires the pyarrow package")
+        return _ArrowEncoder(columns, parquet=fmt == "parquet")
+    raise ValueError(f"Unsupported format: {fmt}")
+
+async def stream_export(encoder, queries: Dict[int, object], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Encoded export bytes for per-shard queries, one chunk per batch.
+    Encoding runs in a worker thread so Parquet compression doesn't stall the event loop."""
+    yield encoder.begin()
+    for shard, query in queries.items():
+        async with AsyncSessionLocal(info={"shard": shard}) as db:
+            result = await db.stream(query.execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                yield await run_in_threadpool(encoder.encode, rows)
+    yield encoder.end()
+
+def export_to_file(kind: str, fmt: str, out: IO[bytes], college_id: Optional[int] = None,
+                   since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   watermark: Optional[str] = None, with_dimensions: bool = False,
+                   batch_size: int = EXPORT_BATCH_SIZE) -> Tuple[int, str]:
+    """Write an export to a binary file object. Returns (rows written, next watermark)."""
+    model = EXPORT_TABLES[kind]
+    after = parse_watermark(watermark, len(shard_engines))
+    shards = export_shards(college_id)
+    encoder = make_encoder(fmt, export_columns(kind, with_dimensions))
+    upto = list(after)
+    written = 0
+    out.write(encoder.begin())
+    for shard in shards:
+        with SessionLocal(info={"shard": shard}) as db:
+            upto[shard] = crud.get_max_id(db, model)
+            query = export_query(kind, after[shard], upto[shard], college_id, since, until, with_dimensions)
+            result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+            for rows in result.partitions():
+                out.write(encoder.encode(rows))
+                written += len(rows)
+    out.write(encoder.end())
+    return written, format_watermark(next_watermark(after, upto, shards))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=tuple(EXPORT_TABLES))
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    parser.add_argument("--join", action="store_true", help="add event and student columns")
+    parser.add_argument("--college-id", type=int)
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--watermark", help="watermark printed by the previous export")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        written, watermark = export_to_file(
+            args.kind, args.format, out, args.college_id, args.since, args.until,
+            args.watermark, args.join, args.batch_size
+        )
+    except (ExportFormatUnavailable, ValueError) as e:
+        parser.error(str(e))
+    finally:
+        if args.out:
+            out.close()
+    print(f"exported {written} rows; next watermark: {watermark}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
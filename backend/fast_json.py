@@ -0,0 +1,65 @@
+"""Fast path for large JSON list responses.
+
+Returning ORM objects through `response_model=List[...]` makes FastAPI
+validate each one with from_attributes, build a dict per row with
+jsonable_encoder and encode the result with the stdlib json module. For the
+list endpoints that per-row work costs more than the query. The fast path:
+
+- selects only the columns the response schema has, as plain row tuples
+  (`schema_columns`), so no ORM objects are built
+- skips re-validation: rows straight from our own tables already match
+  the schema
+- encodes with orjson (falling back to the stdlib json module if it isn't
+  installed), producing the same JSON as the pydantic path
+- gzips bodies of at least RESPONSE_GZIP_MIN_BYTES for clients sending
+  Accept-Encoding: gzip
+
+Endpoints keep their response_model, so the OpenAPI schema is unchanged.
+"""
+import gzip
+import json
+from datetime import datetime
+from typing import Iterable, List
+
+from fastapi import Request, Response
+
+from config import RESPONSE_GZIP_MIN_BYTES, RESPONSE_GZIP_LEVEL
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is slower but equivalent
+    orjson = None
+
+def schema_columns(schema, model) -> list:
+    """The model's table columns that `schema` returns, in the schema's field order"""
+    table_columns = model.__table__.columns
+    return [table_columns[name] for name in schema.model_fields if name in table_columns]
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def row_dicts(rows: Iterable) -> List[dict]:
+    return [row._asdict() for row in rows]
+
+def json_response(request: Request, response: Response, content) -> Response:
+    """Encode `content` (plain dicts/lists of trusted values) into a Response,
+    gzipped when large and accepted. Headers already set on the endpoint's
+    injected `response` (ETag, X-Next-Cursor, ...) are carried over; a gzipped
+    body's ETag is weakened, as its bytes differ from the identity body's."""
+    body = dumps(content)
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    if len(body) >= RESPONSE_GZIP_MIN_BYTES:
+        headers["vary"] = ", ".join(filter(None, (headers.get("vary"), "Accept-Encoding")))
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            body = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+            headers["content-encoding"] = "gzip"
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                headers["etag"] = "W/" + headers["etag"]
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,225 @@
+"""Gate mode: in-memory check-in rosters for high-throughput event entry.
+
+When an admin opens the gate for an event, its registered students and
+existing check-ins are loaded into memory. QR scans for that event are then
+validated and de-duplicated without touching the database, and the new
+attendance rows are written behind in batches by a background task.
+
+Trade-offs:
+- Check-ins accepted in the last flush interval are lost if the process
+  crashes; shutdown (and closing the gate) flushes them.
+- Rosters are per worker process. A student missing from the roster (e.g.
+  registered through another worker) is looked up in the database before
+  being rejected, and the unique (student_id, event_id) index keeps the table
+  free of duplicates if two workers admit the same student.
+- Attendance ids aren't known at scan time.
+- A signed QR token only checks in the registration it was issued for.
+  Cancellations are removed from every worker's roster: directly in the
+  worker that handled them, and over the broker (CACHE_BROKER_URL) in the
+  others. Without a broker, another worker's roster keeps a cancelled
+  registration until its gate is reopened.
+
+With per-college partitioning, event ids repeat across shards, so rosters
+are keyed by (shard, event id) and flushed to the shard they came from.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import async_crud
+from broker import create_broker
+from config import CACHE_BROKER_URL, GATE_FLUSH_INTERVAL_SECONDS, GATE_FLUSH_BATCH_SIZE
+from database import AsyncSessionLocal, session_shard
+from live_counters import live_counters
+
+logger = logging.getLogger(__name__)
+
+CANCELLATIONS_CHANNEL = "gate:cancelled"
+
+# check_in outcomes
+MARKED = "marked"
+DUPLICATE = "duplicate"
+NOT_REGISTERED = "not_registered"
+
+class EventRoster:
+    """Registered students and check-ins for one event, plus unflushed rows."""
+
+    def __init__(self, event_id: int, event_title: str, registrations: Dict[int, int], attended, shard: int = 0):
+        self.event_id = event_id
+        self.shard = shard
+        self.event_title = event_title
+        self._registrations = registrations  # student_id -> registration_id
+        self._attended = set(attended)
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.flushed = 0
+
+    def check_in(self, student_id: int, check_in_time: Optional[datetime] = None, token_registration_id: Optional[int] = None) -> str:
+        """`token_registration_id` is the registration a signed QR token was
+        issued for; it has to be the student's current one"""
+        with self._lock:
+            self.scans += 1
+            registration_id = self._registrations.get(student_id)
+            if registration_id is None or token_registration_id not in (None, registration_id):
+                return NOT_REGISTERED
+            if student_id in self._attended:
+                return DUPLICATE
+            self._attended.add(student_id)
+            self._pending.append({
+                "registration_id": registration_id,
+                "student_id": student_id,
+                "event_id": self.event_id,
+                "check_in_time": check_in_time or datetime.utcnow(),
+            })
+            return MARKED
+
+    def add_registration(self, student_id: int, registration_id: int):
+        with self._lock:
+            self._registrations[student_id] = registration_id
+
+    def remove_registration(self, student_id: int):
+        with self._lock:
+            self._registrations.pop(student_id, None)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def drain(self) -> List[dict]:
+        with self._lock:
+            rows, self._pending = self._pending, []
+            return rows
+
+    def restore(self, rows: List[dict]):
+        """Put rows back after a failed flush so the next flush retries them."""
+        with self._lock:
+            self._pending[:0] = rows
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "event_id": self.event_id,
+                "registered": len(self._registrations),
+                "attended": len(self._attended),
+                "pending": len(self._pending),
+                "scans": self.scans,
+                "flushed": self.flushed,
+            }
+
+class GateRegistry:
+    def __init__(self, flush_interval: float = GATE_FLUSH_INTERVAL_SECONDS, flush_batch_size: int = GATE_FLUSH_BATCH_SIZE, broker=None):
+        self.broker = broker
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self._rosters: Dict[Tuple[int, int], EventRoster] = {}  # (shard, event_id) -> roster
+        self._flush_lock: Optional[asyncio.Lock] = None  # created on first flush, inside the running loop
+        self._flusher: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()  # batch-size flushes started by check_in
+
+    def get(self, event_id: int, shard: int = 0) -> Optional[EventRoster]:
+        return self._rosters.get((shard, event_id))
+
+    async def start(self):
+        """Listen for other workers' cancellations; called on application startup"""
+        if self.broker is not None:
+            await self.broker.subscribe(CANCELLATIONS_CHANNEL, self._on_cancellation)
+
+    async def registration_cancelled(self, shard: int, event_id: int, student_id: int):
+        """Drop a cancelled registration from this worker's roster and tell the others"""
+        self._remove(shard, event_id, student_id)
+        if self.broker is not None:
+            await self.broker.publish(CANCELLATIONS_CHANNEL, f"{shard}:{event_id}:{student_id}")
+
+    async def _on_cancellation(self, channel: str, message: str):
+        shard, event_id, student_id = (int(part) for part in message.split(":"))
+        self._remove(shard, event_id, student_id)
+
+    def _remove(self, shard: int, event_id: int, student_id: int):
+        roster = self._rosters.get((shard, event_id))
+        if roster is not None:
+            roster.remove_registration(student_id)
+
+    async def open(self, db, event) -> EventRoster:
+        """Load the roster for an event (two queries) and start routing its scans from memory."""
+        key = (session_shard(db), event.id)
+        roster = self._rosters.get(key)
+        if roster is None:
+            registrations, attended = await async_crud.get_event_roster(db, event.id)
+            roster = EventRoster(event.id, event.title, registrations, attended, shard=key[0])
+            self._rosters[key] = roster
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+        return roster
+
+    async def close(self, event_id: int, shard: int = 0) -> Optional[EventRoster]:
+        roster = self._rosters.get((shard, event_id))
+        if roster is not None:
+            await self.flush(roster)
+            del self._rosters[(shard, event_id)]
+        return roster
+
+    async def check_in(self, db, roster: EventRoster, student_id: int, check_in_time: Optional[datetime] = None,
+                       registration_id: Optional[int] = None) -> str:
+        outcome = roster.check_in(student_id, check_in_time, registration_id)
+        if outcome == NOT_REGISTERED:
+            # The roster may predate a registration (or cancellation) made through another worker
+            current_id = await async_crud.get_registration_id(db, student_id, roster.event_id)
+            if current_id is not None:
+                roster.add_registration(student_id, current_id)
+                outcome = roster.check_in(student_id, check_in_time, registration_id)
+            else:
+                roster.remove_registration(student_id)
+        if roster.pending_count() >= self.flush_batch_size:
+            task = asyncio.create_task(self.flush(roster))
+            self._flushes.add(task)
+            task.add_done_callback(self._flush_done)
+        return outcome
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Gate mode flush failed: %s; rows stay pending for the next flush", task.exception())
+
+    async def flush(self, roster: EventRoster):
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            rows = roster.drain()
+            if not rows:
+                return
+            try:
+                async with AsyncSessionLocal(info={"shard": roster.shard}) as db:
+                    await async_crud.insert_attendance_rows(db, rows)
+            except Exception:
+                roster.restore(rows)
+                logger.exception("Gate mode flush failed for event %s; %d rows kept for retry", roster.event_id, len(rows))
+                raise
+            roster.flushed += len(rows)
+            live_counters.changed(roster.shard, roster.event_id)
+
+    async def _try_flush(self, roster: EventRoster):
+        try:
+            await self.flush(roster)
+        except Exception:
+            pass  # already logged; rows stay pending for the next attempt
+
+    async def _flush_periodically(self):
+        while self._rosters:
+            await asyncio.sleep(self.flush_interval)
+            for roster in list(self._rosters.values()):
+                await self._try_flush(roster)
+
+    async def shutdown(self):
+        """Flush every open roster; called on application shutdown."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        for roster in list(self._rosters.values()):
+            await self.flush(roster)
+        self._rosters.clear()
+        if self.broker is not None:
+            await self.broker.close()
+
+gate_registry = GateRegistry(broker=create_broker(CACHE_BROKER_URL))
@@ -0,0 +1,175 @@
+"""Live registration and check-in counters per event, pushed to subscribers.
+
+Write endpoints call `live_counters.changed(shard, event_id)` after they
+commit; that only marks the event. A ticker runs at most
+LIVE_COUNTERS_MAX_TICKS_PER_SECOND times a second, reads the current counts
+of every marked event that has subscribers (one rollup query per shard, not
+one per subscriber or per write), and hands each subscriber the new
+snapshot. A burst of 500 check-ins in one tick costs one query and one
+update per subscriber. Subscribers that fall behind only ever hold the
+latest snapshot, so a slow client can't make the worker buffer updates.
+
+Each worker has its own publisher. With a broker (CACHE_BROKER_URL), every
+tick also publishes the events this worker changed, and the other workers
+refresh their subscribers for them on their next tick. Without one, a
+stream only sees writes made through its own worker.
+
+Counts come from the activity rollups, so gate-mode check-ins show up once
+they're flushed (GATE_FLUSH_INTERVAL_SECONDS).
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional, Set, Tuple
+
+import async_crud
+from broker import create_broker
+from config import CACHE_BROKER_URL, LIVE_COUNTERS_MAX_TICKS_PER_SECOND, LIVE_COUNTERS_HEARTBEAT_SECONDS
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+CHANGES_CHANNEL = "live-counters:changed"
+
+EventKey = Tuple[int, int]  # (shard, event_id)
+
+class Subscriber:
+    """One open stream. Holds the last snapshot sent and, at most, one newer one."""
+    __slots__ = ("sent", "pending", "wakeup")
+
+    def __init__(self, snapshot: dict):
+        self.sent = snapshot
+        self.pending: Optional[dict] = None
+        self.wakeup = asyncio.Event()
+
+    def offer(self, snapshot: dict):
+        if snapshot != self.sent:
+            self.pending = snapshot
+            self.wakeup.set()
+
+    def take(self) -> Optional[dict]:
+        self.wakeup.clear()
+        snapshot, self.pending = self.pending, None
+        if snapshot is not None:
+            self.sent = snapshot
+        return snapshot
+
+def _sse(snapshot: dict) -> str:
+    return f"event: counters\ndata: {json.dumps(snapshot)}\n\n"
+
+class LiveCounters:
+    def __init__(self, broker=None, max_ticks_per_second: float = LIVE_COUNTERS_MAX_TICKS_PER_SECOND,
+                 heartbeat_seconds: float = LIVE_COUNTERS_HEARTBEAT_SECONDS):
+        self.broker = broker
+        self.tick_seconds = 1 / max_ticks_per_second
+        self.heartbeat_seconds = heartbeat_seconds
+        self.origin = uuid.uuid4().hex  # tells this worker's broker messages from the others'
+        self._subscribers: Dict[EventKey, Set[Subscriber]] = {}
+        self._changed: Set[EventKey] = set()  # written through this worker since the last tick
+        self._stale: Set[EventKey] = set()  # to re-read for other reasons (another worker, a new subscriber)
+        self._ticker: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.queries = 0
+        self.updates_sent = 0
+        self.remote_changes = 0
+
+    async def start(self):
+        """Start ticking and listen for other workers' changes; called on
+        application startup, outside any request."""
+        if self.broker is not None:
+            await self.broker.subscribe(CHANGES_CHANNEL, self._on_remote_change)
+        self._ticker = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._ticker is not None:
+            self._ticker.cancel()
+        if self.broker is not None:
+            await self.broker.close()
+
+    def changed(self, shard: int, event_id: int):
+        """Note that an event's registrations or check-ins changed"""
+        self._changed.add((shard, event_id))
+
+    async def snapshot(self, db, event_id: int) -> Optional[dict]:
+        """Current counters for one event, or None if it doesn't exist"""
+        return (await async_crud.get_event_counters(db, [event_id])).get(event_id)
+
+    async def stream(self, shard: int, initial: dict):
+        """Server-Sent Events for one subscriber: the initial snapshot, then
+        one `counters` event per change, with keep-alive comments between"""
+        key = (shard, initial["event_id"])
+        subscriber = Subscriber(initial)
+        self._subscribers.setdefault(key, set()).add(subscriber)
+        # A change may have landed between reading `initial` and subscribing
+        self._stale.add(key)
+        try:
+            yield "retry: 3000\n" + _sse(initial)
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                snapshot = subscriber.take()
+                if snapshot is not None:
+                    self.updates_sent += 1
+                    yield _sse(snapshot)
+        finally:
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[key]
+
+    async def _on_remote_change(self, channel: str, message: str):
+        origin, _, keys = message.partition(" ")
+        if origin == self.origin or not keys:
+            return
+        for key in keys.split(","):
+            shard, event_id = key.split(":")
+            self._stale.add((int(shard), int(event_id)))
+            self.remote_changes += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Live counters tick failed")
+
+    async def tick(self):
+        changed, self._changed = self._changed, set()
+        stale, self._stale = self._stale, set()
+        if changed and self.broker is not None:
+            await self.broker.publish(CHANGES_CHANNEL, f"{self.origin} " + ",".join(f"{shard}:{event_id}" for shard, event_id in sorted(changed)))
+        due = (changed | stale) & self._subscribers.keys()
+        if not due:
+            return
+        self.ticks += 1
+        by_shard = defaultdict(list)
+        for shard, event_id in due:
+            by_shard[shard].append(event_id)
+        for shard, event_ids in by_shard.items():
+            async with AsyncSessionLocal(info={"shard": shard}) as db:
+                counters = await async_crud.get_event_counters(db, event_ids)
+            self.queries += 1
+            for event_id, snapshot in counters.items():
+                for subscriber in self._subscribers.get((shard, event_id), ()):
+                    subscriber.offer(snapshot)
+
+    def stats(self) -> dict:
+        return {
+            "events": len(self._subscribers),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "max_ticks_per_second": 1 / self.tick_seconds,
+            "broker": type(self.broker).__name__ if self.broker is not None else None,
+            "ticks": self.ticks,
+            "queries": self.queries,
+            "updates_sent": self.updates_sent,
+            "remote_changes": self.remote_changes,
+        }
+
+live_counters = LiveCounters(create_broker(CACHE_BROKER_URL))
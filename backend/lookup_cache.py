@@ -0,0 +1,207 @@
+"""Read-through cache for event and college lookups, shared across workers.
+
+Two tiers sit in front of the database:
+
+- a per-process LRU, checked first and costing no I/O
+- an optional shared tier in the broker (see broker.py, CACHE_BROKER_URL),
+  so a row one worker loaded is a hit for the others
+
+Entries are fresh for LOOKUP_CACHE_TTL_SECONDS, then stale for another
+LOOKUP_CACHE_STALE_SECONDS: a stale hit is served as-is while one background
+task reloads it (stale-while-revalidate). Concurrent misses for the same key
+share a single load, so an expired hot event costs one query, not one per
+request.
+
+Invalidation is by tag ("event:<shard>:<id>", "colleges:<shard>", ...). Every
+tag has a generation number that is part of each cache key; invalidating a
+tag bumps the generation in the broker and publishes it, and every worker
+drops its entries for that tag. Entries under an old generation can't be read
+again, including ones a load that raced with the write stores afterwards.
+Writes that bypass the API (the bulk_import CLI) aren't published; those
+show up once the TTL runs out.
+
+Values must be JSON-serializable so they can live in the shared tier; the
+async_crud wrappers cache column dicts and rebuild model instances per hit.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from broker import create_broker
+from config import CACHE_BROKER_URL, LOOKUP_CACHE_TTL_SECONDS, LOOKUP_CACHE_STALE_SECONDS, LOOKUP_CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "lookup-cache:invalidate"
+SHARED_KEY_PREFIX = "lookup-cache:"
+
+class LookupCache:
+    def __init__(self, broker=None, ttl_seconds: float = LOOKUP_CACHE_TTL_SECONDS,
+                 stale_seconds: float = LOOKUP_CACHE_STALE_SECONDS, max_size: int = LOOKUP_CACHE_MAX_SIZE):
+        self.broker = broker
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (tag, value, fresh_until, stale_until)
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._generations: Dict[str, int] = {}
+        self._loads: Dict[str, asyncio.Task] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.shared_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def start(self):
+        """Listen for other workers' invalidations; called on application startup."""
+        if self.broker is not None:
+            await self.broker.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    async def close(self):
+        for task in list(self._refreshes):
+            task.cancel()
+        if self.broker is not None:
+            await self.broker.close()
+
+    async def get(self, tag: str, params: str, load: Callable[[], Awaitable]):
+        """Return the cached value for (tag, params), calling `load` on a miss.
+
+        None results are not cached, so a lookup for a row that doesn't exist
+        yet can't hide it once it's created.
+        """
+        key = f"{tag}#{await self._generation(tag)}|{params}"
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self.broker is not None:
+            entry = await self._get_shared(tag, key)
+        now = time.time()
+        if entry is not None:
+            _, value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self.hits += 1
+                return value
+            if now < stale_until:
+                self.stale_hits += 1
+                self._refresh_in_background(tag, key, load)
+                return value
+        self.misses += 1
+        return await self._load_once(tag, key, load)
+
+    async def invalidate(self, *tags: str):
+        """Make every cached entry for these tags unreachable, in all workers."""
+        for tag in tags:
+            generation = 0
+            if self.broker is not None:
+                generation = await self.broker.incr(SHARED_KEY_PREFIX + "generation:" + tag)
+                await self.broker.publish(INVALIDATION_CHANNEL, f"{generation} {tag}")
+            self._advance(tag, generation or self._generations.get(tag, 0) + 1)
+            self.invalidations += 1
+
+    async def _generation(self, tag: str) -> int:
+        generation = self._generations.get(tag)
+        if generation is None:
+            generation = 0
+            if self.broker is not None:
+                generation = int(await self.broker.get(SHARED_KEY_PREFIX + "generation:" + tag) or 0)
+            # An invalidation may have arrived while the broker was answering
+            generation = max(generation, self._generations.get(tag, 0))
+            self._generations[tag] = generation
+        return generation
+
+    def _advance(self, tag: str, generation: int):
+        if generation > self._generations.get(tag, 0):
+            self._generations[tag] = generation
+        for key in list(self._keys_by_tag.get(tag, ())):
+            self._remove(key)
+
+    async def _on_invalidation(self, channel: str, message: str):
+        generation, tag = message.split(" ", 1)
+        self._advance(tag, int(generation))
+
+    async def _get_shared(self, tag: str, key: str) -> Optional[tuple]:
+        payload = await self.broker.get(SHARED_KEY_PREFIX + key)
+        if payload is None:
+            return None
+        value, fresh_until, stale_until = json.loads(payload)
+        self.shared_hits += 1
+        entry = (tag, value, fresh_until, stale_until)
+        self._store(key, entry)
+        return entry
+
+    def _refresh_in_background(self, tag: str, key: str, load: Callable[[], Awaitable]):
+        if key in self._loads:
+            return
+        task = asyncio.create_task(self._load_once(tag, key, load))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Lookup cache refresh failed: %s", task.exception())
+
+    async def _load_once(self, tag: str, key: str, load: Callable[[], Awaitable]):
+        task = self._loads.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_and_store(tag, key, load))
+            self._loads[key] = task
+            task.add_done_callback(lambda _: self._loads.pop(key, None))
+        # Shielded: one caller going away mustn't cancel the load the others wait on
+        return await asyncio.shield(task)
+
+    async def _load_and_store(self, tag: str, key: str, load: Callable[[], Awaitable]):
+        value = await load()
+        if value is not None:
+            now = time.time()
+            entry = (tag, value, now + self.ttl_seconds, now + self.ttl_seconds + self.stale_seconds)
+            self._store(key, entry)
+            if self.broker is not None:
+                await self.broker.set(SHARED_KEY_PREFIX + key, json.dumps(entry[1:]), self.ttl_seconds + self.stale_seconds)
+        return value
+
+    def _store(self, key: str, entry: tuple):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._keys_by_tag.setdefault(entry[0], set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        tag = self._entries.pop(key)[0]
+        keys = self._keys_by_tag.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[tag]
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "shared_tier": type(self.broker).__name__ if self.broker is not None else None,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "refreshing": len(self._refreshes),
+        }
+
+lookup_cache = LookupCache(create_broker(CACHE_BROKER_URL))
@@ -1,36 +1,66 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+import hmac
+import io
 import uvicorn
-from datetime import datetime, timedelta
-from typing import List, Optional
-import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Union
 
-from database import get_db, engine, Base
-from models import User, College, Event, Registration, Attendance, Feedback
+from database import (
+    get_async_db, get_async_read_db, replica_router, async_shard_engines, run_migrations,
+    PARTITIONED, scope_session, session_shard, shard_for_college, scatter, scatter_stream, merge_by_id, row_id
+)
+from models import User, Event, Registration, Attendance, Feedback
 from schemas import (
-    UserCreate, UserLogin, UserResponse, Token,
+    UserCreate, UserLogin, UserResponse, UserAdminUpdate, Token,
     CollegeCreate, CollegeResponse,
-    EventCreate, EventUpdate, EventResponse,
-    RegistrationCreate, RegistrationResponse,
-    AttendanceCreate, AttendanceResponse,
-    QRAttendanceCreate, QRAttendanceResponse,
-    FeedbackCreate, FeedbackResponse
+    EventCreate, EventUpdate, EventResponse, EventSearchResponse,
+    RegistrationCreate, RegistrationResponse, RegistrationExpandedResponse, WaitlistResponse,
+    AttendanceCreate, AttendanceResponse, AttendanceExpandedResponse,
+    QRAttendanceCreate, QRAttendanceResponse, QRTokenResponse,
+    BulkQRAttendanceCreate, BulkQRAttendanceItem, BulkQRAttendanceResponse,
+    FeedbackCreate, FeedbackResponse, FeedbackExpandedResponse, EventRatingResponse, ImportReport,
+    EventActivityReport, StudentActivityReport, ActivityBreakdownReport
+)
+from auth import create_access_token
+from password_hashing import password_hashing_pool, PasswordHashingPoolSaturated
+from principal_cache import principal_cache
+from lookup_cache import lookup_cache
+from fast_json import json_response, row_dicts, schema_columns
+from tenant import CollegeContextMiddleware, college_context, token_principal
+from metrics import RequestMetricsMiddleware, request_metrics
+from qr_codes import parse_attendance_qr, create_attendance_token, InvalidQRCode
+from gate_mode import gate_registry, MARKED, NOT_REGISTERED
+from live_counters import live_counters
+from admission import full_events, admission_queues, ALREADY_REGISTERED, FULL, WAITLISTED, CANCELLED, CHECKED_IN
+from reports import rollup_reconciler, merge_top, merge_breakdowns, EVENT_RANKINGS
+from bulk_import import import_stream, detect_format, IMPORT_KINDS, DEFAULT_CHUNK_SIZE
+from exports import (
+    EXPORT_TABLES, EXPORT_MEDIA_TYPES, EXPORT_EXTENSIONS, ExportFormatUnavailable,
+    export_columns, export_query, export_shards, make_encoder, parse_watermark, format_watermark, next_watermark, stream_export
 )
-from auth import create_access_token, verify_token, get_password_hash, verify_password
-from crud import (
-    create_user, get_user_by_email, get_user_by_id, get_users,
-    create_college, get_colleges, get_college_by_id,
-    create_event, get_events, get_event_by_id, update_event, delete_event,
-    create_registration, get_user_registrations, get_event_registrations,
-    create_attendance, get_user_attendance,
-    create_feedback, get_user_feedback, get_event_feedback, get_event_average_rating, get_all_feedback
+from crud import search_terms, SEARCH_FACETS
+from async_crud import (
+    create_user, get_user_by_email, get_user_by_id, update_user, update_user_password_hash,
+    create_college, get_colleges, copy_college,
+    create_event, get_event_by_id, get_events_by_date, update_event, delete_event, search_events,
+    admit_registration, cancel_registration, fill_from_waitlist, leave_waitlist,
+    get_registration, get_registration_id, get_registered_student_ids, get_registration_by_id, get_user_registrations,
+    create_attendance, bulk_create_attendance, get_user_attendance,
+    create_feedback, get_user_feedback, get_event_feedback,
+    stream_rows, STREAM_BATCH_SIZE, get_rows, get_max_id, get_resource_versions,
+    get_event_average_rating, get_event_average_ratings, get_event_rating_summary, ensure_event_rating_summaries,
+    ensure_activity_rollups, get_top_events, get_top_students, get_activity_breakdown
 )
-from config import ALLOWED_ORIGINS
+from config import ALLOWED_ORIGINS, QR_TOKEN_VALID_HOURS_AFTER_EVENT, CATALOG_CACHE_MAX_AGE_SECONDS, METRICS_TOKEN
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or upgrade database tables
+run_migrations()
 
 app = FastAPI(
     title="Campus Event Management API",
@@ -47,12 +77,171 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Default reads and writes to the signed-in student's college (see tenant.py)
+app.add_middleware(CollegeContextMiddleware)
+
+# Per-route latency, status and query counts for /metrics; added last so it
+# is outermost and its timings include the other middleware
+app.add_middleware(RequestMetricsMiddleware)
+
+@app.on_event("startup")
+async def backfill_rating_summaries():
+    await scatter(None, ensure_event_rating_summaries)
+
+@app.on_event("startup")
+async def start_activity_rollups():
+    await scatter(None, ensure_activity_rollups)
+    rollup_reconciler.start()
+
+@app.on_event("shutdown")
+async def stop_activity_rollups():
+    await rollup_reconciler.stop()
+
+@app.on_event("startup")
+async def start_lookup_cache():
+    await lookup_cache.start()
+
+@app.on_event("shutdown")
+async def stop_lookup_cache():
+    await lookup_cache.close()
+
+@app.on_event("startup")
+async def start_principal_cache():
+    await principal_cache.start()
+
+@app.on_event("shutdown")
+async def stop_principal_cache():
+    await principal_cache.close()
+
+@app.on_event("startup")
+async def start_live_counters():
+    await live_counters.start()
+
+@app.on_event("shutdown")
+async def stop_live_counters():
+    await live_counters.close()
+
+@app.on_event("startup")
+async def start_gate_mode():
+    await gate_registry.start()
+
+@app.on_event("shutdown")
+async def flush_gate_mode_check_ins():
+    # Must run before the engine is disposed
+    await gate_registry.shutdown()
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    for shard_engine in async_shard_engines:
+        await shard_engine.dispose()
+    await replica_router.dispose()
+
+@app.on_event("shutdown")
+def stop_password_hashing_pool():
+    password_hashing_pool.shutdown()
+
+@app.exception_handler(PasswordHashingPoolSaturated)
+async def password_hashing_saturated_handler(request, exc):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 security = HTTPBearer()
 
+# Pagination helpers
+PAGE_LIMIT = Query(None, ge=1, le=1000, description="Page size; omit to return every row")
+AFTER_ID = Query(None, description="Keyset cursor: return rows with id greater than this (see X-Next-Cursor)")
+OUTPUT_FORMAT = Query("json", alias="format", pattern="^(json|ndjson)$", description="ndjson streams rows in batches")
+COLLEGE_ID = Query(None, description="Read this college's data; required for single-event reads when data is partitioned by college")
+EVENT_COLLEGE_ID = Query(None, description="The event's college, when data is partitioned and it differs from yours")
+EXPAND = Query(None, pattern="^(event|college)(,(event|college))*$", description="event: nest each row's event; college: nest the event with its college")
+
+# Columns the list endpoints' fast path selects (see fast_json.py)
+USER_COLUMNS = schema_columns(UserResponse, User)
+EVENT_COLUMNS = schema_columns(EventResponse, Event)
+REGISTRATION_COLUMNS = schema_columns(RegistrationResponse, Registration)
+ATTENDANCE_COLUMNS = schema_columns(AttendanceResponse, Attendance)
+FEEDBACK_COLUMNS = schema_columns(FeedbackResponse, Feedback)
+
+def expanded_response(request: Request, response: Response, rows: list, schema, expand: str) -> Response:
+    """Serialize rows loaded with their event (and its college) into `schema`,
+    leaving out the college unless it was asked for"""
+    exclude = None if "college" in expand.split(",") else {"event": {"college"}}
+    return json_response(request, response, [schema.model_validate(row).model_dump(mode="json", exclude=exclude) for row in rows])
+
+async def check_event_in_context(request: Request, db: AsyncSession, event_id: int):
+    """404 for an event outside the caller's college context, as if it didn't exist"""
+    college_id = college_context(request)
+    if college_id is None:
+        return
+    event = await get_event_by_id(db, event_id)
+    if event is None or event.college_id != college_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+def set_next_cursor(response: Response, rows: list, limit: Optional[int]):
+    """Advertise the keyset cursor for the next page when this page is full
+    (merged pages from several shards can run past `limit` on a tied id)"""
+    if limit is not None and len(rows) >= limit:
+        response.headers["X-Next-Cursor"] = str(row_id(rows[-1]))
+
+# Conditional GET for the catalog endpoints. ETags come from the resource
+# version counters that crud bumps on every change, so checking one costs a
+# primary-key lookup instead of the full query and serialization.
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_CACHE_MAX_AGE_SECONDS}, must-revalidate" if CATALOG_CACHE_MAX_AGE_SECONDS > 0 else "no-cache"
+
+async def resource_etag(db: Optional[AsyncSession], *names: str) -> str:
+    """Strong ETag for the named resources; `db=None` combines every shard"""
+    shard_versions = await scatter(db, get_resource_versions, list(names))
+    versions = ".".join(str(versions[name]) for versions in shard_versions for name in names)
+    return f'"{app.version}-{versions}"'
+
+def etag_variant(etag: str, *parts) -> str:
+    """Extend an ETag with the other inputs a response depends on (the
+    caller's college, a date window), so they can't share a cached copy"""
+    return etag[:-1] + "".join("-" + (part.strftime("%Y%m%dT%H%M%S") if isinstance(part, datetime) else str(part or "")) for part in parts) + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 if the client has this version; otherwise tag the response"""
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def ndjson_response(rows, schema) -> StreamingResponse:
+    """Stream rows (an async iterator) as newline-delimited JSON, one chunk per batch"""
+    async def generate():
+        batch = []
+        async for row in rows:
+            batch.append(schema.model_validate(row).model_dump_json())
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 # Dependency to get current user
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)):
     token = credentials.credentials
-    payload = verify_token(token)
+    # Tokens seen recently were already verified; skip the decode and the user
+    # query. CollegeContextMiddleware already looked the token up (or decoded it)
+    cached_user, payload = token_principal(request, token)
+    if cached_user is not None:
+        scope_session(db, cached_user.college_id)
+        return cached_user
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,15 +249,51 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     user_id = payload.get("sub")
-    user = get_user_by_id(db, user_id)
+    generation = principal_cache.generation
+    # The rest of the request runs on the user's college shard
+    scope_session(db, payload.get("college_id"))
+    user = await get_user_by_id(db, user_id)
+    # Give the connection back: the endpoint may open a read session of its
+    # own, and holding one connection while waiting for another lets a burst
+    # of requests exhaust the pool with every request stuck on its second
+    await db.commit()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User is deactivated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    principal_cache.put(token, user, payload.get("exp"), generation)
     return user
 
+async def get_user_read_db(current_user: User = Depends(get_current_user)):
+    """Replica session for a user's own data, unless they wrote recently
+    (then the primary, so they see their own registration/feedback)."""
+    async with replica_router.session(pin_key=current_user.id) as db:
+        yield scope_session(db, current_user.college_id)
+
+def scope_public_read(request: Request, db: AsyncSession, college_id: Optional[int]) -> AsyncSession:
+    """Scope an unauthenticated read by the `college_id` query parameter,
+    or else the caller's college context."""
+    if college_id is None:
+        college_id = college_context(request)
+    if college_id is None and PARTITIONED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="college_id is required"
+        )
+    return scope_session(db, college_id)
+
+async def find_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """Look a user up on every shard, since the email doesn't say which college"""
+    return next((user for user in await scatter(db, get_user_by_email, email) if user is not None), None)
+
 # Health check
 @app.get("/")
 async def root():
@@ -76,262 +301,785 @@ async def root():
 
 # Authentication endpoints
 @app.post("/auth/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    existing_user = get_user_by_email(db, user_data.email)
+    existing_user = await find_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    # Hash password off the event loop
+    hashed_password = await password_hashing_pool.hash(user_data.password)
     
     # Create user
-    user = create_user(db, user_data, hashed_password)
+    scope_session(db, user_data.college_id)
+    user = await create_user(db, user_data, hashed_password)
     return user
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = get_user_by_email(db, user_credentials.email)
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await find_user_by_email(db, user_credentials.email)
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await password_hashing_pool.verify_and_update(user_credentials.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # The stored hash was made with a different cost factor; replace it
+    if new_hash is not None:
+        scope_session(db, user.college_id)
+        await update_user_password_hash(db, user.id, new_hash)
     
-    access_token = create_access_token(data={"sub": str(user.id)})
+    # college_id tells later requests which shard holds this user
+    access_token = create_access_token(data={"sub": str(user.id), "college_id": user.college_id, "role": user.role})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/auth/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
+@app.get("/auth/hashing-stats")
+async def get_password_hashing_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view hashing stats"
+        )
+    return password_hashing_pool.stats()
+
+@app.get("/auth/principal-cache-stats")
+async def get_principal_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view principal cache stats"
+        )
+    return principal_cache.stats()
+
+@app.get("/cache/lookup-stats")
+async def get_lookup_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view lookup cache stats"
+        )
+    return lookup_cache.stats()
+
+@app.get("/db/replica-stats")
+async def get_replica_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view replica stats"
+        )
+    return replica_router.stats()
+
+@app.get("/registrations/admission-stats")
+async def get_admission_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view admission stats"
+        )
+    return full_events.stats()
+
+@app.get("/live/counter-stats")
+async def get_live_counter_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view live counter stats"
+        )
+    return live_counters.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(request: Request):
+    """Prometheus scrape endpoint (see metrics.py)"""
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/users", response_model=List[UserResponse])
-async def get_users_endpoint(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_users_endpoint(request: Request, response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000), after_id: Optional[int] = AFTER_ID, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can view all users"
         )
-    return get_users(db)
+    if PARTITIONED:
+        users = merge_by_id(await scatter(None, get_rows, User, USER_COLUMNS, skip=0, limit=skip + limit, after_id=after_id), skip + limit)[skip:]
+    else:
+        users = await get_rows(db, User, USER_COLUMNS, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, users, limit)
+    return json_response(request, response, row_dicts(users))
+
+@app.put("/users/{user_id}", response_model=UserResponse)
+async def update_user_endpoint(user_id: int, user_data: UserAdminUpdate, college_id: Optional[int] = Query(None, description="The user's college, when data is partitioned and it differs from yours"), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Change a user's role or deactivate them (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can update users"
+        )
+    if college_id is not None:
+        scope_session(db, college_id)
+    user = await update_user(db, user_id, user_data)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    # Cached principals carry the old role/active flag
+    await principal_cache.invalidate_user(session_shard(db), user_id)
+    return user
+
+@app.post("/admin/import/{kind}", response_model=ImportReport)
+async def bulk_import_endpoint(kind: str, file: UploadFile = File(...), format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"), chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10000), current_user: User = Depends(get_current_user)):
+    """Import users, colleges or registrations from a CSV/JSONL upload (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can import data"
+        )
+    if kind not in IMPORT_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown import kind, expected one of: {', '.join(IMPORT_KINDS)}"
+        )
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    # The import does blocking DB work and waits on the hashing processes
+    report = await run_in_threadpool(import_stream, kind, stream, format or detect_format(file.filename or ""), chunk_size)
+    if kind == "colleges":
+        # The sync import can't reach the event loop's cache; invalidate once it's done
+        await lookup_cache.invalidate(*(f"colleges:{shard}" for shard in range(len(async_shard_engines))))
+    return report
+
+@app.get("/admin/export/{kind}")
+async def export_endpoint(
+    kind: str,
+    output_format: str = Query("csv", alias="format", pattern="^(csv|parquet|arrow)$"),
+    include_dimensions: bool = Query(False, alias="join", description="Add event and student columns"),
+    college_id: Optional[int] = Query(None, description="Only rows for this college's events"),
+    since: Optional[datetime] = Query(None, description="Row timestamp at or after this"),
+    until: Optional[datetime] = Query(None, description="Row timestamp before this"),
+    watermark: Optional[str] = Query(None, description="X-Export-Watermark from a previous export; only newer rows are exported"),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream registrations, attendance or feedback as CSV, Parquet or Arrow IPC (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can export data"
+        )
+    if kind not in EXPORT_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export kind, expected one of: {', '.join(EXPORT_TABLES)}"
+        )
+    try:
+        after = parse_watermark(watermark, len(async_shard_engines))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid watermark: {e}")
+    try:
+        encoder = make_encoder(output_format, export_columns(kind, include_dimensions))
+    except ExportFormatUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    # Fix the upper bound now, so the watermark can go in a header before the body streams
+    upto = await scatter(None, get_max_id, EXPORT_TABLES[kind])
+    shards = export_shards(college_id)
+    queries = {shard: export_query(kind, after[shard], upto[shard], college_id, since, until, include_dimensions) for shard in shards}
+    return StreamingResponse(
+        stream_export(encoder, queries),
+        media_type=EXPORT_MEDIA_TYPES[output_format],
+        headers={
+            "X-Export-Watermark": format_watermark(next_watermark(after, upto, shards)),
+            "Content-Disposition": f'attachment; filename="{kind}.{EXPORT_EXTENSIONS[output_format]}"',
+        },
+    )
 
 # College endpoints
 @app.post("/colleges", response_model=CollegeResponse)
-async def create_college_endpoint(college_data: CollegeCreate, db: Session = Depends(get_db)):
-    return create_college(db, college_data)
+async def create_college_endpoint(college_data: CollegeCreate, db: AsyncSession = Depends(get_async_db)):
+    college = await create_college(db, college_data)
+    if PARTITIONED:
+        # Shards keep a copy of the directory row for their events and users to reference
+        await scatter(None, copy_college, college.id, college.name)
+    return college
 
 @app.get("/colleges", response_model=List[CollegeResponse])
-async def get_colleges_endpoint(db: Session = Depends(get_db)):
-    return get_colleges(db)
+async def get_colleges_endpoint(request: Request, response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000), after_id: Optional[int] = AFTER_ID, db: AsyncSession = Depends(get_async_read_db)):
+    cached = not_modified(request, response, await resource_etag(db, "colleges"))
+    if cached:
+        return cached
+    colleges = await get_colleges(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, colleges, limit)
+    return colleges
 
 # Event endpoints
 @app.post("/events", response_model=EventResponse)
-async def create_event_endpoint(event_data: EventCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_event_endpoint(event_data: EventCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can create events"
         )
-    return create_event(db, event_data, current_user.id)
+    scope_session(db, event_data.college_id)
+    return await create_event(db, event_data, current_user.id, current_user.college_id)
+
+async def load_events_page(db: AsyncSession, skip: int, limit: int, after_id: Optional[int], college_id: Optional[int],
+                           event_type: Optional[str] = None, date_window: Optional[tuple] = None) -> List[dict]:
+    """One page of events with their average ratings: in id order, or in date
+    order when `date_window` is (date_from, date_to, descending)"""
+    if date_window is None:
+        filters = {"type": event_type} if event_type is not None else {}
+        rows = await get_rows(db, Event, EVENT_COLUMNS, skip=skip, limit=limit, after_id=after_id, college_id=college_id, **filters)
+    else:
+        date_from, date_to, descending = date_window
+        rows = await get_events_by_date(db, EVENT_COLUMNS, college_id, event_type, date_from, date_to, descending,
+                                        skip=skip, limit=limit, after_id=after_id)
+    # Add average rating to each event with one summary lookup for the page
+    averages = await get_event_average_ratings(db, [row.id for row in rows])
+    return [dict(row._asdict(), average_rating=averages[row.id]) for row in rows]
+
+def event_list_window(when: Optional[str], date_from: Optional[datetime], date_to: Optional[datetime]) -> Optional[tuple]:
+    """(date_from, date_to, descending) for a date-ordered /events listing, or
+    None for the id-ordered one. "Now" is truncated to the minute so that it
+    can go into the ETag: a cached upcoming/past list stays valid for at most
+    a minute after an event starts."""
+    if when is None and date_from is None and date_to is None:
+        return None
+    # Event dates are stored as naive UTC
+    date_from, date_to = (value.astimezone(timezone.utc).replace(tzinfo=None) if value and value.tzinfo else value for value in (date_from, date_to))
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    if when == "upcoming":
+        date_from = now if date_from is None else max(date_from, now)
+    elif when == "past":
+        date_to = now if date_to is None else min(date_to, now)
+    return date_from, date_to, when == "past"
 
 @app.get("/events", response_model=List[EventResponse])
-async def get_events_endpoint(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    events = get_events(db, skip=skip, limit=limit)
-    # Add average rating to each event
-    for event in events:
-        event.average_rating = get_event_average_rating(db, event.id)
-    return events
+async def get_events_endpoint(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = AFTER_ID,
+    college_id: Optional[int] = Query(None, description="Only this college's events; defaults to a student's own college"),
+    when: Optional[str] = Query(None, pattern="^(upcoming|past)$", description="upcoming: soonest first; past: most recent first"),
+    date_from: Optional[datetime] = Query(None, description="Events on or after this"),
+    date_to: Optional[datetime] = Query(None, description="Events before this"),
+    event_type: Optional[str] = Query(None, alias="type"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Events in id order, or in date order (then id) when `when`, `date_from`
+    or `date_to` is given. Students see their own college unless they ask
+    for another one."""
+    if college_id is None:
+        college_id = college_context(request)
+    date_window = event_list_window(when, date_from, date_to)
+    scatter_read = PARTITIONED and college_id is None
+    if scatter_read and date_window is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="college_id is required"
+        )
+    # The response depends on the caller's college and, for upcoming/past, the minute
+    response.headers["Vary"] = "Authorization"
+    etag = await resource_etag(None if scatter_read else scope_session(db, college_id), "events")
+    if college_id is not None or date_window is not None:
+        etag = etag_variant(etag, college_id, *(date_window or ()))
+    cached = not_modified(request, response, etag)
+    if cached:
+        cached.headers["Vary"] = "Authorization"
+        return cached
+    if scatter_read:
+        pages = await scatter(None, load_events_page, 0, skip + limit, after_id, None, event_type)
+        events = merge_by_id(pages, skip + limit)[skip:]
+    else:
+        events = await load_events_page(db, skip, limit, after_id, college_id, event_type, date_window)
+    set_next_cursor(response, events, limit)
+    return json_response(request, response, events)
+
+async def search_events_page(db: AsyncSession, q: Optional[str], event_type: Optional[str], college_id: Optional[int],
+                             date_from: Optional[datetime], date_to: Optional[datetime], limit: int, offset: int) -> dict:
+    page = await search_events(db, EVENT_COLUMNS, q, event_type, college_id, date_from, date_to, limit, offset)
+    averages = await get_event_average_ratings(db, [row["id"] for row in page["results"]])
+    for row in page["results"]:
+        row["average_rating"] = averages[row["id"]]
+    return page
+
+def merge_search_pages(pages: List[dict], q: Optional[str], limit: int, offset: int) -> dict:
+    """Combine per-shard searches: best rank first (or soonest without query
+    text), totals and facet counts added up. Each shard ranks with its own
+    index statistics, so the order across shards is approximate."""
+    if search_terms(q):
+        order = lambda row: (-row["rank"], row["id"])
+    else:
+        order = lambda row: (row["date"], row["id"])
+    results = sorted((row for page in pages for row in page["results"]), key=order)
+    facets = {}
+    for name in SEARCH_FACETS:
+        counts = Counter()
+        for page in pages:
+            counts.update({facet["value"]: facet["count"] for facet in page["facets"][name]})
+        facets[name] = [{"value": value, "count": count} for value, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+    return {"total": sum(page["total"] for page in pages), "results": results[offset:offset + limit], "facets": facets}
+
+@app.get("/events/search", response_model=EventSearchResponse)
+async def search_events_endpoint(
+    request: Request,
+    response: Response,
+    q: Optional[str] = Query(None, max_length=200, description="Words to find in the title, description or location"),
+    event_type: Optional[str] = Query(None, alias="type"),
+    college_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, description="Events on or after this"),
+    date_to: Optional[datetime] = Query(None, description="Events before this"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if college_id is None:
+        college_id = college_context(request)
+    scatter_read = PARTITIONED and college_id is None
+    response.headers["Vary"] = "Authorization"
+    etag = await resource_etag(None if scatter_read else scope_session(db, college_id), "events")
+    if college_id is not None:
+        etag = etag_variant(etag, college_id)
+    cached = not_modified(request, response, etag)
+    if cached:
+        cached.headers["Vary"] = "Authorization"
+        return cached
+    if scatter_read:
+        pages = await scatter(None, search_events_page, q, event_type, None, date_from, date_to, offset + limit, 0)
+        return merge_search_pages(pages, q, limit, offset)
+    return await search_events_page(db, q, event_type, college_id, date_from, date_to, limit, offset)
 
 @app.get("/events/{event_id}", response_model=EventResponse)
-async def get_event_endpoint(event_id: int, db: Session = Depends(get_db)):
-    event = get_event_by_id(db, event_id)
+async def get_event_endpoint(event_id: int, request: Request, response: Response, college_id: Optional[int] = COLLEGE_ID, db: AsyncSession = Depends(get_async_read_db)):
+    scope_public_read(request, db, college_id)
+    cached = not_modified(request, response, await resource_etag(db, f"event:{event_id}"))
+    if cached:
+        return cached
+    event = await get_event_by_id(db, event_id)
     if not event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
     # Add average rating to the event
-    event.average_rating = get_event_average_rating(db, event.id)
+    event.average_rating = await get_event_average_rating(db, event.id)
     return event
 
+@app.get("/events/{event_id}/live")
+async def stream_event_counters(event_id: int, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_read_db)):
+    """Server-Sent Events: the event's registration and check-in counts and
+    seats left, again whenever they change (see live_counters.py) - for admin
+    dashboards"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can follow live counters"
+        )
+    scope_session(db, college_id if college_id is not None else current_user.college_id)
+    snapshot = await live_counters.snapshot(db, event_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+    shard = session_shard(db)
+    # The stream can stay open for hours; don't hold a connection for it
+    await db.close()
+    return StreamingResponse(
+        live_counters.stream(shard, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.put("/events/{event_id}", response_model=EventResponse)
-async def update_event_endpoint(event_id: int, event_data: EventUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_event_endpoint(event_id: int, event_data: EventUpdate, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can update events"
         )
+    if college_id is not None:
+        scope_session(db, college_id)
     
-    event = get_event_by_id(db, event_id)
+    event = await get_event_by_id(db, event_id)
     if not event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
     
-    return update_event(db, event_id, event_data)
+    updated = await update_event(db, event_id, event_data)
+    if updated is None:
+        # The cached lookup can briefly predate a delete from another worker
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+    if "max_attendees" in event_data.model_fields_set:
+        # More seats (or none to enforce) move waitlisted students in
+        shard = session_shard(db)
+        full_events.clear(shard, event_id)
+        promoted = await fill_from_waitlist(db, event_id)
+        registrations_changed(shard, event_id, promoted)
+    return updated
 
 @app.delete("/events/{event_id}")
-async def delete_event_endpoint(event_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_event_endpoint(event_id: int, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can delete events"
         )
+    if college_id is not None:
+        scope_session(db, college_id)
     
-    event = get_event_by_id(db, event_id)
+    event = await get_event_by_id(db, event_id)
     if not event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
     
-    delete_event(db, event_id)
+    if not await delete_event(db, event_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
     return {"message": "Event deleted successfully"}
 
 # Registration endpoints
 @app.post("/registrations", response_model=RegistrationResponse)
-async def create_registration_endpoint(registration_data: RegistrationCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_registration_endpoint(registration_data: RegistrationCreate, request: Request, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only students can register for events"
         )
-    
-    # Check if already registered
-    existing_registration = db.query(Registration).filter(
-        Registration.student_id == current_user.id,
-        Registration.event_id == registration_data.event_id
-    ).first()
-    
-    if existing_registration:
+    await check_event_in_context(request, db, registration_data.event_id)
+    shard = session_shard(db)
+    # One registration per event at a time goes to the database; once the
+    # event is full, the herd behind the last seat is turned away from memory
+    async with admission_queues.turn(shard, registration_data.event_id):
+        outcome = None if registration_data.join_waitlist else full_events.refusal(shard, registration_data.event_id, current_user.id)
+        if outcome is None:
+            outcome, registration, position = await admit_registration(db, registration_data, current_user.id)
+            if outcome in (FULL, WAITLISTED) and full_events.enabled:
+                # Read once who holds the seats, so their repeat requests are told apart from memory too
+                full_events.mark_full(shard, registration_data.event_id,
+                                      await get_registered_student_ids(db, registration_data.event_id))
+    if outcome == ALREADY_REGISTERED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Already registered for this event"
         )
-    
-    return create_registration(db, registration_data, current_user.id)
+    if outcome == FULL:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Event is full"
+        )
+    if outcome == WAITLISTED:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=WaitlistResponse(event_id=registration_data.event_id, position=position).model_dump(),
+        )
+    replica_router.pin_to_primary(current_user.id)
+    registrations_changed(shard, registration.event_id, [registration])
+    return registration
+
+def registrations_changed(shard: int, event_id: int, added: list):
+    """Tell live counters and an open gate roster about new (or promoted) registrations"""
+    live_counters.changed(shard, event_id)
+    roster = gate_registry.get(event_id, shard)
+    if roster is not None:
+        for registration in added:
+            roster.add_registration(registration.student_id, registration.id)
+
+@app.delete("/registrations/{registration_id}")
+async def cancel_registration_endpoint(registration_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Cancel a registration; its seat goes to the first student on the waitlist"""
+    registration = await get_registration_by_id(db, registration_id)
+    if registration is None or (registration.student_id != current_user.id and current_user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Registration not found"
+        )
+    student_id, event_id = registration.student_id, registration.event_id
+    outcome, promoted = await cancel_registration(db, registration_id, student_id, event_id)
+    if outcome == CHECKED_IN:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot cancel after checking in"
+        )
+    if outcome != CANCELLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Registration not found"
+        )
+    shard = session_shard(db)
+    full_events.clear(shard, event_id)
+    replica_router.pin_to_primary(student_id)
+    for promoted_registration in promoted:
+        replica_router.pin_to_primary(promoted_registration.student_id)
+    # Its QR code stops working at the gate, in every worker
+    await gate_registry.registration_cancelled(shard, event_id, student_id)
+    registrations_changed(shard, event_id, promoted)
+    return {"message": "Registration cancelled", "promoted_student_ids": [r.student_id for r in promoted]}
 
-@app.get("/registrations/my", response_model=List[RegistrationResponse])
-async def get_my_registrations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return get_user_registrations(db, current_user.id)
+@app.delete("/events/{event_id}/waitlist")
+async def leave_waitlist_endpoint(event_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    if not await leave_waitlist(db, event_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not on the waitlist for this event"
+        )
+    return {"message": "Left the waitlist"}
+
+@app.get("/registrations/my", response_model=Union[List[RegistrationResponse], List[RegistrationExpandedResponse]])
+async def get_my_registrations(request: Request, response: Response, limit: Optional[int] = PAGE_LIMIT, after_id: Optional[int] = AFTER_ID, expand: Optional[str] = EXPAND, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_user_read_db)):
+    registrations = await get_user_registrations(db, current_user.id, limit=limit, after_id=after_id, expand=bool(expand))
+    set_next_cursor(response, registrations, limit)
+    if expand:
+        return expanded_response(request, response, registrations, RegistrationExpandedResponse, expand)
+    return registrations
 
 @app.get("/registrations/all", response_model=List[RegistrationResponse])
-async def get_all_registrations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_all_registrations_endpoint(request: Request, response: Response, limit: Optional[int] = PAGE_LIMIT, after_id: Optional[int] = AFTER_ID, output_format: str = OUTPUT_FORMAT, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can view all registrations"
         )
-    return db.query(Registration).all()
+    if output_format == "ndjson":
+        return ndjson_response(scatter_stream(db, stream_rows, Registration), RegistrationResponse)
+    registrations = merge_by_id(await scatter(db, get_rows, Registration, REGISTRATION_COLUMNS, limit=limit, after_id=after_id), limit)
+    set_next_cursor(response, registrations, limit)
+    return json_response(request, response, row_dicts(registrations))
+
+@app.get("/registrations/{registration_id}/qr-token", response_model=QRTokenResponse)
+async def get_registration_qr_token(registration_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Signed attendance QR code for a registration, valid until a while after the event"""
+    registration = await get_registration_by_id(db, registration_id)
+    if registration is None or (registration.student_id != current_user.id and current_user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Registration not found"
+        )
+    event = await get_event_by_id(db, registration.event_id)
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+    expires_at = event.date + timedelta(hours=QR_TOKEN_VALID_HOURS_AFTER_EVENT)
+    token = create_attendance_token(
+        event.id, registration.student_id, registration.id,
+        int(expires_at.replace(tzinfo=timezone.utc).timestamp())
+    )
+    return QRTokenResponse(registration_id=registration.id, event_id=event.id, qr_token=token, expires_at=expires_at)
 
 # Attendance endpoints
 @app.post("/attendance", response_model=AttendanceResponse)
-async def create_attendance_endpoint(attendance_data: AttendanceCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return create_attendance(db, attendance_data, current_user.id)
+async def create_attendance_endpoint(attendance_data: AttendanceCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    attendance = await create_attendance(db, attendance_data, current_user.id)
+    if attendance is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Attendance already marked for this event"
+        )
+    replica_router.pin_to_primary(current_user.id)
+    live_counters.changed(session_shard(db), attendance.event_id)
+    return attendance
 
-@app.get("/attendance/my", response_model=List[AttendanceResponse])
-async def get_my_attendance(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return get_user_attendance(db, current_user.id)
+@app.get("/attendance/my", response_model=Union[List[AttendanceResponse], List[AttendanceExpandedResponse]])
+async def get_my_attendance(request: Request, response: Response, limit: Optional[int] = PAGE_LIMIT, after_id: Optional[int] = AFTER_ID, expand: Optional[str] = EXPAND, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_user_read_db)):
+    attendance = await get_user_attendance(db, current_user.id, limit=limit, after_id=after_id, expand=bool(expand))
+    set_next_cursor(response, attendance, limit)
+    if expand:
+        return expanded_response(request, response, attendance, AttendanceExpandedResponse, expand)
+    return attendance
 
 @app.get("/attendance/all", response_model=List[AttendanceResponse])
-async def get_all_attendance(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_all_attendance_endpoint(request: Request, response: Response, limit: Optional[int] = PAGE_LIMIT, after_id: Optional[int] = AFTER_ID, output_format: str = OUTPUT_FORMAT, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can view all attendance"
         )
-    return db.query(Attendance).all()
+    if output_format == "ndjson":
+        return ndjson_response(scatter_stream(db, stream_rows, Attendance), AttendanceResponse)
+    attendance = merge_by_id(await scatter(db, get_rows, Attendance, ATTENDANCE_COLUMNS, limit=limit, after_id=after_id), limit)
+    set_next_cursor(response, attendance, limit)
+    return json_response(request, response, row_dicts(attendance))
 
 # Feedback endpoints
 @app.post("/feedback", response_model=FeedbackResponse)
-async def create_feedback_endpoint(feedback_data: FeedbackCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return create_feedback(db, feedback_data, current_user.id)
+async def create_feedback_endpoint(feedback_data: FeedbackCreate, request: Request, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    await check_event_in_context(request, db, feedback_data.event_id)
+    feedback = await create_feedback(db, feedback_data, current_user.id)
+    replica_router.pin_to_primary(current_user.id)
+    return feedback
 
-@app.get("/feedback/my", response_model=List[FeedbackResponse])
-async def get_my_feedback(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return get_user_feedback(db, current_user.id)
+@app.get("/feedback/my", response_model=Union[List[FeedbackResponse], List[FeedbackExpandedResponse]])
+async def get_my_feedback(request: Request, response: Response, limit: Optional[int] = PAGE_LIMIT, after_id: Optional[int] = AFTER_ID, expand: Optional[str] = EXPAND, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_user_read_db)):
+    feedback = await get_user_feedback(db, current_user.id, limit=limit, after_id=after_id, expand=bool(expand))
+    set_next_cursor(response, feedback, limit)
+    if expand:
+        return expanded_response(request, response, feedback, FeedbackExpandedResponse, expand)
+    return feedback
 
 @app.get("/feedback/all", response_model=List[FeedbackResponse])
-async def get_all_feedback_endpoint(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_all_feedback_endpoint(request: Request, response: Response, limit: Optional[int] = PAGE_LIMIT, after_id: Optional[int] = AFTER_ID, output_format: str = OUTPUT_FORMAT, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can view all feedback"
         )
-    return get_all_feedback(db)
+    if output_format == "ndjson":
+        return ndjson_response(scatter_stream(db, stream_rows, Feedback), FeedbackResponse)
+    feedback = merge_by_id(await scatter(db, get_rows, Feedback, FEEDBACK_COLUMNS, limit=limit, after_id=after_id), limit)
+    set_next_cursor(response, feedback, limit)
+    return json_response(request, response, row_dicts(feedback))
 
 @app.get("/events/{event_id}/feedback", response_model=List[FeedbackResponse])
-async def get_event_feedback_endpoint(event_id: int, db: Session = Depends(get_db)):
-    return get_event_feedback(db, event_id)
+async def get_event_feedback_endpoint(event_id: int, request: Request, response: Response, limit: Optional[int] = PAGE_LIMIT, after_id: Optional[int] = AFTER_ID, college_id: Optional[int] = COLLEGE_ID, db: AsyncSession = Depends(get_async_read_db)):
+    scope_public_read(request, db, college_id)
+    cached = not_modified(request, response, await resource_etag(db, f"event:{event_id}"))
+    if cached:
+        return cached
+    feedback = await get_event_feedback(db, event_id, limit=limit, after_id=after_id)
+    set_next_cursor(response, feedback, limit)
+    return feedback
 
-@app.get("/events/{event_id}/average-rating")
-async def get_event_average_rating_endpoint(event_id: int, db: Session = Depends(get_db)):
-    average_rating = get_event_average_rating(db, event_id)
-    return {"event_id": event_id, "average_rating": average_rating}
+@app.get("/events/{event_id}/average-rating", response_model=EventRatingResponse)
+async def get_event_average_rating_endpoint(event_id: int, request: Request, response: Response, college_id: Optional[int] = COLLEGE_ID, db: AsyncSession = Depends(get_async_read_db)):
+    scope_public_read(request, db, college_id)
+    cached = not_modified(request, response, await resource_etag(db, f"event:{event_id}"))
+    if cached:
+        return cached
+    summary = await get_event_rating_summary(db, event_id)
+    if summary is None or not summary.rating_count:
+        return EventRatingResponse(event_id=event_id, average_rating=0.0)
+    return EventRatingResponse(
+        event_id=event_id,
+        average_rating=round(summary.rating_sum / summary.rating_count, 1),
+        rating_count=summary.rating_count,
+        histogram={value: getattr(summary, f"rating_{value}") for value in range(1, 6)}
+    )
+
+# Report endpoints (admin only), answered from the activity rollups
+REPORT_LIMIT = Query(10, ge=1, le=100)
+
+@app.get("/reports/events/top", response_model=List[EventActivityReport])
+async def get_top_events_report(by: str = Query("registrations", pattern="^(registrations|attendance|attendance_rate|rating)$"), limit: int = REPORT_LIMIT, college_id: Optional[int] = None, event_type: Optional[str] = Query(None, alias="type"), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_read_db)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view reports"
+        )
+    pages = await scatter(db, get_top_events, by=by, limit=limit, college_id=college_id, event_type=event_type)
+    return merge_top(pages, limit, EVENT_RANKINGS[by], "event_id")
+
+@app.get("/reports/students/top", response_model=List[StudentActivityReport])
+async def get_top_students_report(limit: int = REPORT_LIMIT, college_id: Optional[int] = None, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_read_db)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view reports"
+        )
+    pages = await scatter(db, get_top_students, limit=limit, college_id=college_id)
+    return merge_top(pages, limit, "attendance_count", "registration_count", "student_id")
+
+@app.get("/reports/breakdown", response_model=List[ActivityBreakdownReport])
+async def get_activity_breakdown_report(by: str = Query("college", pattern="^(college|type)$"), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_read_db)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view reports"
+        )
+    return merge_breakdowns(await scatter(db, get_activity_breakdown, by=by))
+
+@app.post("/reports/reconcile")
+async def reconcile_reports(current_user: User = Depends(get_current_user)):
+    """Recount the rollups from the raw tables now instead of waiting for the next periodic run"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can reconcile reports"
+        )
+    corrected = await rollup_reconciler.reconcile()
+    return {"rows_corrected": corrected, **rollup_reconciler.stats()}
 
 # QR Code Attendance endpoints
 @app.post("/attendance/qr", response_model=QRAttendanceResponse)
-async def mark_qr_attendance(qr_data: QRAttendanceCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mark_qr_attendance(qr_data: QRAttendanceCreate, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Mark attendance using QR code data - for admin use"""
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can scan QR codes for attendance"
         )
+    if college_id is not None:
+        scope_session(db, college_id)
     
     try:
         # Parse QR code data
-        qr_info = json.loads(qr_data.qr_data)
-        
-        if qr_info.get("type") != "attendance":
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid QR code type"
-            )
-        
-        event_id = qr_info.get("eventId")
-        if not event_id or str(event_id) != str(qr_data.event_id):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="QR code event ID mismatch"
-            )
+        qr_code = parse_attendance_qr(qr_data.qr_data, qr_data.event_id)
+        event_id = qr_code.event_id
+
+        # Events in gate mode are validated from memory and written behind
+        roster = gate_registry.get(event_id, session_shard(db))
+        if roster is not None:
+            return await mark_gate_attendance(db, roster, qr_code.student_id or current_user.id, current_user, qr_code.registration_id)
         
         # Get event details
-        event = get_event_by_id(db, event_id)
+        event = await get_event_by_id(db, event_id)
         if not event:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Event not found"
             )
         # Determine target student: prefer studentId from QR, otherwise fallback to current user
-        target_student_id = qr_info.get("studentId")
+        target_student_id = qr_code.student_id
         if target_student_id is None:
             # Backward compatibility: if no studentId present, use current user (previous behavior)
             target_student_id = current_user.id
 
         # Validate registration for the target student
-        registration = db.query(Registration).filter(
-            Registration.student_id == target_student_id,
-            Registration.event_id == event_id
-        ).first()
-
-        if not registration:
+        registration_id = await get_registration_id(db, target_student_id, event_id)
+        if registration_id is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Target user is not registered for this event"
             )
+        if qr_code.signed and registration_id != qr_code.registration_id:
+            # Issued for a registration that was cancelled since (the student registered again)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="QR code is for a cancelled registration"
+            )
 
-        # Check if already marked attendance for the target student
-        existing_attendance = db.query(Attendance).filter(
-            Attendance.student_id == target_student_id,
-            Attendance.event_id == event_id
-        ).first()
+        # Create attendance record for the target student; None means already checked in
+        attendance_data = AttendanceCreate(
+            registration_id=registration_id,
+            event_id=event_id
+        )
+        attendance = await create_attendance(db, attendance_data, target_student_id)
 
-        if existing_attendance:
+        if attendance is None:
             return QRAttendanceResponse(
                 success=False,
                 message="Attendance already marked for this event",
@@ -339,13 +1087,7 @@ async def mark_qr_attendance(qr_data: QRAttendanceCreate, current_user: User = D
                 event_title=event.title
             )
 
-        # Create attendance record for the target student
-        attendance_data = AttendanceCreate(
-            registration_id=registration.id,
-            event_id=event_id
-        )
-        attendance = create_attendance(db, attendance_data, target_student_id)
-
+        live_counters.changed(session_shard(db), event_id)
         return QRAttendanceResponse(
             success=True,
             message="Attendance marked successfully",
@@ -354,10 +1096,10 @@ async def mark_qr_attendance(qr_data: QRAttendanceCreate, current_user: User = D
             event_title=event.title
         )
         
-    except json.JSONDecodeError:
+    except InvalidQRCode as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid QR code format"
+            detail=str(e)
         )
     except HTTPException as e:
         # Re-raise HTTPExceptions so they preserve their intended status codes
@@ -368,8 +1110,127 @@ async def mark_qr_attendance(qr_data: QRAttendanceCreate, current_user: User = D
             detail=f"Error processing QR code: {str(e)}"
         )
 
+async def mark_gate_attendance(db: AsyncSession, roster, target_student_id: int, current_user: User, registration_id: Optional[int] = None) -> QRAttendanceResponse:
+    outcome = await gate_registry.check_in(db, roster, target_student_id, registration_id=registration_id)
+    if outcome == NOT_REGISTERED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Target user is not registered for this event"
+        )
+    return QRAttendanceResponse(
+        success=outcome == MARKED,
+        message="Attendance marked successfully" if outcome == MARKED else "Attendance already marked for this event",
+        student_name=current_user.full_name if target_student_id == current_user.id else None,
+        event_title=roster.event_title
+    )
+
+# Gate mode endpoints
+@app.post("/events/{event_id}/gate")
+async def open_gate_endpoint(event_id: int, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Load the event's check-in roster into memory so QR scans skip the database"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can manage gate mode"
+        )
+    if college_id is not None:
+        scope_session(db, college_id)
+    event = await get_event_by_id(db, event_id)
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+    roster = await gate_registry.open(db, event)
+    return roster.stats()
+
+@app.get("/events/{event_id}/gate")
+async def get_gate_endpoint(event_id: int, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can manage gate mode"
+        )
+    roster = gate_registry.get(event_id, shard_for_college(college_id if college_id is not None else current_user.college_id))
+    if roster is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gate mode is not open for this event"
+        )
+    return roster.stats()
+
+@app.delete("/events/{event_id}/gate")
+async def close_gate_endpoint(event_id: int, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user)):
+    """Flush pending check-ins and go back to database-backed scanning"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can manage gate mode"
+        )
+    roster = await gate_registry.close(event_id, shard_for_college(college_id if college_id is not None else current_user.college_id))
+    if roster is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gate mode is not open for this event"
+        )
+    return roster.stats()
+
+@app.post("/attendance/qr/batch", response_model=BulkQRAttendanceResponse)
+async def mark_qr_attendance_batch(batch: BulkQRAttendanceCreate, college_id: Optional[int] = EVENT_COLLEGE_ID, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Replay scans collected by an offline door scanner - for admin use.
+
+    Each scan gets its own result; one bad code doesn't fail the batch.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can scan QR codes for attendance"
+        )
+    if college_id is not None:
+        scope_session(db, college_id)
+
+    event = await get_event_by_id(db, batch.event_id)
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    results: List[Optional[BulkQRAttendanceItem]] = [None] * len(batch.scans)
+    checkins = []
+    checkin_positions = []
+    signed_registrations = {}
+    for index, scan in enumerate(batch.scans):
+        try:
+            qr_code = parse_attendance_qr(scan.qr_data, batch.event_id)
+            if qr_code.student_id is None:
+                raise InvalidQRCode("QR code has no student ID")
+        except InvalidQRCode as e:
+            results[index] = BulkQRAttendanceItem(index=index, status="invalid", message=str(e))
+            continue
+        scanned_at = scan.scanned_at
+        if scanned_at is not None and scanned_at.tzinfo is not None:
+            scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+        checkins.append((qr_code.student_id, scanned_at))
+        checkin_positions.append(index)
+        if qr_code.signed:
+            signed_registrations[qr_code.student_id] = qr_code.registration_id
+
+    outcomes = await bulk_create_attendance(db, batch.event_id, checkins, signed_registrations) if checkins else []
+    if any(outcome == MARKED for outcome, _ in outcomes):
+        live_counters.changed(session_shard(db), batch.event_id)
+    for index, (student_id, _), (outcome, attendance_id) in zip(checkin_positions, checkins, outcomes):
+        results[index] = BulkQRAttendanceItem(
+            index=index, status=outcome, student_id=student_id, attendance_id=attendance_id
+        )
+
+    response = BulkQRAttendanceResponse(event_id=batch.event_id, results=results)
+    for item in results:
+        setattr(response, item.status, getattr(response, item.status) + 1)
+    return response
+
 @app.post("/attendance/qr/student", response_model=QRAttendanceResponse)
-async def mark_student_qr_attendance(event_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mark_student_qr_attendance(event_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Mark attendance for student by scanning QR code"""
     if current_user.role != "student":
         raise HTTPException(
@@ -378,7 +1239,7 @@ async def mark_student_qr_attendance(event_id: int, current_user: User = Depends
         )
     
     # Get event details
-    event = get_event_by_id(db, event_id)
+    event = await get_event_by_id(db, event_id)
     if not event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -386,10 +1247,7 @@ async def mark_student_qr_attendance(event_id: int, current_user: User = Depends
         )
     
     # Check if user is registered for the event
-    registration = db.query(Registration).filter(
-        Registration.student_id == current_user.id,
-        Registration.event_id == event_id
-    ).first()
+    registration = await get_registration(db, current_user.id, event_id)
     
     if not registration:
         raise HTTPException(
@@ -397,13 +1255,14 @@ async def mark_student_qr_attendance(event_id: int, current_user: User = Depends
             detail="You are not registered for this event"
         )
     
-    # Check if already marked attendance
-    existing_attendance = db.query(Attendance).filter(
-        Attendance.student_id == current_user.id,
-        Attendance.event_id == event_id
-    ).first()
+    # Create attendance record; None means already checked in
+    attendance_data = AttendanceCreate(
+        registration_id=registration.id,
+        event_id=event_id
+    )
+    attendance = await create_attendance(db, attendance_data, current_user.id)
     
-    if existing_attendance:
+    if attendance is None:
         return QRAttendanceResponse(
             success=False,
             message="You have already marked attendance for this event",
@@ -411,13 +1270,7 @@ async def mark_student_qr_attendance(event_id: int, current_user: User = Depends
             event_title=event.title
         )
     
-    # Create attendance record
-    attendance_data = AttendanceCreate(
-        registration_id=registration.id,
-        event_id=event_id
-    )
-    attendance = create_attendance(db, attendance_data, current_user.id)
-    
+    live_counters.changed(session_shard(db), event_id)
     return QRAttendanceResponse(
         success=True,
         message="Attendance marked successfully",
@@ -0,0 +1,213 @@
+"""Request and database metrics in Prometheus text format (GET /metrics).
+
+RequestMetricsMiddleware times every request under its route template
+("/events/{event_id}", not the raw path) and counts status codes and
+requests in flight (by method, since the route is only known once the
+router has matched it). instrument_engine hooks an engine's cursor events to
+count statements and their time, charged to the request that ran them
+through a context variable; statements outside a request (background
+flushes, reconciliation) are charged to "<background>". Statements slower
+than SLOW_QUERY_MS are logged with their route.
+
+Metrics are kept per process. With several workers, scrape each one (or
+run one worker per port) and add them up in Prometheus.
+
+With DEBUG on, every response also carries
+`Server-Timing: db;dur=<ms>;desc="<n> queries"`, the time and statement
+count of its own database work, which browser dev tools show next to the
+request. Streaming responses send their headers first, so they only report
+the queries run before the first byte.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+from config import DEBUG, SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+UNMATCHED_ROUTE = "<unmatched>"
+BACKGROUND_ROUTE = "<background>"
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestStats:
+    """Database work done on behalf of one request"""
+    __slots__ = ("method", "scope", "queries", "db_seconds")
+
+    def __init__(self, method: str, scope):
+        self.method = method
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        """The matched route's path template. The router stores the route in
+        the scope once it has matched, so this is only final after routing;
+        paths no route matches share one label so scanners can't create a
+        series per URL."""
+        route = self.scope.get("route")
+        return route.path if route is not None else UNMATCHED_ROUTE
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+class MetricsRegistry:
+    """Counters and histograms for requests and the queries they run. Updated
+    from the event loop and from threadpool threads (sync sessions), hence
+    the lock."""
+
+    def __init__(self, slow_query_seconds: float = SLOW_QUERY_MS / 1000):
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()  # (method, route, status) -> count
+        self.in_progress: Counter = Counter()  # method -> count (the route isn't known until routing)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.queries_per_request: Dict[Tuple[str, str], Histogram] = {}
+        self.db_queries: Counter = Counter()  # (method, route) -> statements
+        self.db_seconds: Counter = Counter()  # (method, route) -> seconds
+        self.slow_queries: Counter = Counter()  # (method, route) -> statements
+
+    def request_started(self, method: str):
+        with self._lock:
+            self.in_progress[method] += 1
+
+    def request_finished(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            self.in_progress[method] -= 1
+            self.requests[(method, route, status_code)] += 1
+            self.latency.setdefault((method, route), Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries_per_request.setdefault((method, route), Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+
+    def query_finished(self, statement: str, seconds: float):
+        stats = _current_request.get()
+        key = (stats.method, stats.route) if stats is not None else ("", BACKGROUND_ROUTE)
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+        slow = seconds >= self.slow_query_seconds
+        with self._lock:
+            self.db_queries[key] += 1
+            self.db_seconds[key] += seconds
+            if slow:
+                self.slow_queries[key] += 1
+        if slow:
+            logger.warning("Slow query (%.1f ms) on %s: %s", seconds * 1000, " ".join(filter(None, key)), " ".join(statement.split())[:1000])
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, histogram: Histogram, **labels):
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+        with self._lock:
+            header("http_requests_total", "counter", "Requests handled, by route template and status code.")
+            for (method, route, status_code), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+            header("http_requests_in_progress", "gauge", "Requests being handled right now.")
+            for method, count in sorted(self.in_progress.items()):
+                lines.append(f"http_requests_in_progress{_labels(method=method)} {count}")
+            header("http_request_duration_seconds", "histogram", "Time from receiving a request to finishing its response.")
+            for (method, route), observed in sorted(self.latency.items()):
+                histogram("http_request_duration_seconds", observed, method=method, route=route)
+            header("http_request_db_queries", "histogram", "Database statements each request ran.")
+            for (method, route), observed in sorted(self.queries_per_request.items()):
+                histogram("http_request_db_queries", observed, method=method, route=route)
+            header("db_queries_total", "counter", "Database statements run, by the route that ran them.")
+            for (method, route), count in sorted(self.db_queries.items()):
+                lines.append(f"db_queries_total{_labels(method=method, route=route)} {count}")
+            header("db_query_seconds_total", "counter", "Time spent in database statements, by route.")
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"db_query_seconds_total{_labels(method=method, route=route)} {seconds}")
+            header("db_slow_queries_total", "counter", f"Statements that took at least {self.slow_query_seconds * 1000:g} ms, by route.")
+            for (method, route), count in sorted(self.slow_queries.items()):
+                lines.append(f"db_slow_queries_total{_labels(method=method, route=route)} {count}")
+        return "\n".join(lines) + "\n"
+
+request_metrics = MetricsRegistry()
+
+def instrument_engine(sync_engine, registry: MetricsRegistry = request_metrics):
+    """Count and time every statement the engine runs (for an AsyncEngine,
+    pass its .sync_engine)"""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        registry.query_finished(statement, time.perf_counter() - conn.info["metrics_query_started"].pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(exception_context):
+        started = exception_context.connection.info.get("metrics_query_started") if exception_context.connection is not None else None
+        if started:
+            registry.query_finished(exception_context.statement or "", time.perf_counter() - started.pop())
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware, so streaming responses pass through untouched.
+    Add it last, so that it is outermost and times the other middleware too."""
+
+    def __init__(self, app, registry: MetricsRegistry = request_metrics, server_timing: bool = DEBUG):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        stats = RequestStats(method, scope)
+        status_code = 500  # if the app fails before responding
+        token = _current_request.set(stats)
+        self.registry.request_started(method)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    timing = f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries"'
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.registry.request_finished(method, stats.route, status_code, time.perf_counter() - started, stats)
+            _current_request.reset(token)
@@ -0,0 +1,123 @@
+"""initial schema
+
+Creates the tables that main.py used to build with Base.metadata.create_all.
+Databases created that way already have them, so each table is only created
+when missing; running `upgrade` on such a database just stamps it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _missing(table_name: str) -> bool:
+    return not sa.inspect(op.get_bind()).has_table(table_name)
+
+
+def upgrade() -> None:
+    if _missing('colleges'):
+        op.create_table(
+            'colleges',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('created_at', sa.DateTime()),
+        )
+        op.create_index('ix_colleges_id', 'colleges', ['id'])
+
+    if _missing('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('email', sa.String(), nullable=False),
+            sa.Column('hashed_password', sa.String(), nullable=False),
+            sa.Column('full_name', sa.String(), nullable=False),
+            sa.Column('role', sa.String()),
+            sa.Column('college_id', sa.Integer(), sa.ForeignKey('colleges.id')),
+            sa.Column('is_active', sa.Boolean()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    if _missing('events'):
+        op.create_table(
+            'events',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('title', sa.String(), nullable=False),
+            sa.Column('description', sa.Text()),
+            sa.Column('type', sa.String(), nullable=False),
+            sa.Column('date', sa.DateTime(), nullable=False),
+            sa.Column('location', sa.String()),
+            sa.Column('max_attendees', sa.Integer()),
+            sa.Column('college_id', sa.Integer(), sa.ForeignKey('colleges.id'), nullable=False),
+            sa.Column('created_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+        op.create_index('ix_events_id', 'events', ['id'])
+
+    if _missing('registrations'):
+        op.create_table(
+            'registrations',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('student_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), nullable=False),
+            sa.Column('created_at', sa.DateTime()),
+        )
+        op.create_index('ix_registrations_id', 'registrations', ['id'])
+
+    if _missing('attendance'):
+        op.create_table(
+            'attendance',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('registration_id', sa.Integer(), sa.ForeignKey('registrations.id'), nullable=False),
+            sa.Column('student_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), nullable=False),
+            sa.Column('check_in_time', sa.DateTime()),
+        )
+        op.create_index('ix_attendance_id', 'attendance', ['id'])
+
+    if _missing('feedback'):
+        op.create_table(
+            'feedback',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('registration_id', sa.Integer(), sa.ForeignKey('registrations.id'), nullable=False),
+            sa.Column('student_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), nullable=False),
+            sa.Column('rating', sa.Integer(), nullable=False),
+            sa.Column('comment', sa.Text()),
+            sa.Column('created_at', sa.DateTime()),
+        )
+        op.create_index('ix_feedback_id', 'feedback', ['id'])
+
+    if _missing('event_rating_summaries'):
+        op.create_table(
+            'event_rating_summaries',
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), primary_key=True),
+            sa.Column('rating_count', sa.Integer(), nullable=False),
+            sa.Column('rating_sum', sa.Integer(), nullable=False),
+            sa.Column('rating_1', sa.Integer(), nullable=False),
+            sa.Column('rating_2', sa.Integer(), nullable=False),
+            sa.Column('rating_3', sa.Integer(), nullable=False),
+            sa.Column('rating_4', sa.Integer(), nullable=False),
+            sa.Column('rating_5', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+
+
+def downgrade() -> None:
+    for table_name in ('event_rating_summaries', 'feedback', 'attendance', 'registrations', 'events', 'users', 'colleges'):
+        op.drop_table(table_name)
@@ -0,0 +1,73 @@
+"""hot path indexes and duplicate guards
+
+Adds unique (student_id, event_id) indexes on registrations and attendance so
+duplicate registrations/check-ins are rejected by the database, plus foreign
+key indexes and an events (college_id, date) index.
+
+Rows that raced past the old check-then-insert guards are collapsed first,
+keeping the oldest registration/attendance for each student and event.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ('uq_registrations_student_event', 'registrations', ['student_id', 'event_id'], True),
+    ('ix_registrations_event_id', 'registrations', ['event_id'], False),
+    ('uq_attendance_student_event', 'attendance', ['student_id', 'event_id'], True),
+    ('ix_attendance_event_id', 'attendance', ['event_id'], False),
+    ('ix_attendance_registration_id', 'attendance', ['registration_id'], False),
+    ('ix_feedback_event_id', 'feedback', ['event_id'], False),
+    ('ix_feedback_student_id', 'feedback', ['student_id'], False),
+    ('ix_feedback_registration_id', 'feedback', ['registration_id'], False),
+    ('ix_events_college_id_date', 'events', ['college_id', 'date'], False),
+    ('ix_events_created_by', 'events', ['created_by'], False),
+    ('ix_users_college_id', 'users', ['college_id'], False),
+]
+
+# Maps a registration id to the oldest registration for the same student/event
+_KEEPER_REGISTRATION = """
+    (SELECT MIN(keeper.id) FROM registrations keeper
+     JOIN registrations dup ON dup.student_id = keeper.student_id AND dup.event_id = keeper.event_id
+     WHERE dup.id = {table}.registration_id)
+"""
+
+
+def _remove_duplicates() -> None:
+    for table in ('attendance', 'feedback'):
+        op.execute(
+            f"UPDATE {table} SET registration_id = {_KEEPER_REGISTRATION.format(table=table)} "
+            f"WHERE registration_id IN (SELECT id FROM registrations)"
+        )
+    op.execute(
+        "DELETE FROM registrations WHERE id NOT IN "
+        "(SELECT MIN(id) FROM registrations GROUP BY student_id, event_id)"
+    )
+    op.execute(
+        "DELETE FROM attendance WHERE id NOT IN "
+        "(SELECT MIN(id) FROM attendance GROUP BY student_id, event_id)"
+    )
+
+
+def upgrade() -> None:
+    _remove_duplicates()
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
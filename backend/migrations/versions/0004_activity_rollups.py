@@ -0,0 +1,49 @@
+"""activity rollups
+
+Adds event_activity_summaries and student_activity_summaries: running
+registration, attendance and feedback counts behind the /reports endpoints.
+They start empty; the API backfills them from the raw tables on startup.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'event_activity_summaries',
+        sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), primary_key=True),
+        sa.Column('registration_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attendance_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_event_activity_summaries_registration_count', 'event_activity_summaries', ['registration_count'])
+    op.create_table(
+        'student_activity_summaries',
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('registration_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attendance_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('feedback_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_student_activity_summaries_activity', 'student_activity_summaries', ['attendance_count', 'registration_count'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_student_activity_summaries_activity', table_name='student_activity_summaries')
+    op.drop_table('student_activity_summaries')
+    op.drop_index('ix_event_activity_summaries_registration_count', table_name='event_activity_summaries')
+    op.drop_table('event_activity_summaries')
@@ -0,0 +1,78 @@
+"""event full-text search
+
+Indexes events.title, description and location for GET /events/search:
+
+- SQLite: an external-content FTS5 table, events_fts (rowid = events.id),
+  kept in sync by insert/update/delete triggers on events and backfilled
+  with FTS5's 'rebuild' command
+- PostgreSQL: a stored generated tsvector column, events.search_vector
+  (title weighted A, location B, description C), with a GIN index
+
+Both stem English words (porter / the 'english' configuration). Also adds an
+events (type, date) index for the type facet and filter.
+
+A later SQLite batch migration that rebuilds the events table drops the
+triggers; it has to recreate them and rebuild events_fts.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_FTS_INSERT = "INSERT INTO events_fts(rowid, title, description, location) VALUES (new.id, new.title, new.description, new.location);"
+_FTS_DELETE = "INSERT INTO events_fts(events_fts, rowid, title, description, location) VALUES ('delete', old.id, old.title, old.description, old.location);"
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE events_fts USING fts5("
+    "title, description, location, content='events', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN {_FTS_INSERT} END",
+    f"CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN {_FTS_DELETE} END",
+    f"CREATE TRIGGER events_fts_update AFTER UPDATE OF title, description, location ON events BEGIN {_FTS_DELETE} {_FTS_INSERT} END",
+    "INSERT INTO events_fts(events_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER events_fts_update",
+    "DROP TRIGGER events_fts_delete",
+    "DROP TRIGGER events_fts_insert",
+    "DROP TABLE events_fts",
+]
+
+POSTGRESQL_UPGRADE = [
+    "ALTER TABLE events ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX ix_events_search_vector ON events USING gin (search_vector)",
+]
+
+POSTGRESQL_DOWNGRADE = [
+    "DROP INDEX ix_events_search_vector",
+    "ALTER TABLE events DROP COLUMN search_vector",
+]
+
+
+def upgrade() -> None:
+    statements = POSTGRESQL_UPGRADE if op.get_bind().dialect.name == 'postgresql' else SQLITE_UPGRADE
+    for statement in statements:
+        op.execute(statement)
+    op.create_index('ix_events_type_date', 'events', ['type', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_type_date', table_name='events')
+    statements = POSTGRESQL_DOWNGRADE if op.get_bind().dialect.name == 'postgresql' else SQLITE_DOWNGRADE
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,29 @@
+"""events date index
+
+Adds an events (date) index so upcoming/past listings across all colleges
+read events in date order from the index instead of sorting the table.
+College-scoped listings use the existing (college_id, date) index.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_events_date', 'events', ['date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_date', table_name='events')
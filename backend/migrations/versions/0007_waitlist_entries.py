@@ -0,0 +1,41 @@
+"""waitlist entries
+
+Adds waitlist_entries: students queued for a seat at a full event, promoted
+in id order when a registration is cancelled or the capacity goes up.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'waitlist_entries',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_waitlist_entries_id', 'waitlist_entries', ['id'])
+    op.create_index('uq_waitlist_entries_student_event', 'waitlist_entries', ['student_id', 'event_id'], unique=True)
+    op.create_index('ix_waitlist_entries_event_id_id', 'waitlist_entries', ['event_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_waitlist_entries_event_id_id', table_name='waitlist_entries')
+    op.drop_index('uq_waitlist_entries_student_event', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_id', table_name='waitlist_entries')
+    op.drop_table('waitlist_entries')
@@ -0,0 +1,44 @@
+"""event creator college
+
+Events record the creating admin's college next to their id, since the
+admin can live on another shard than the event. The events.created_by
+foreign key to users is dropped on PostgreSQL for the same reason: it
+rejected events created by admins of colleges on other shards. SQLite
+doesn't enforce foreign keys here, so its table isn't rebuilt for it.
+
+Existing events get the college of the user with their created_by id on
+the same shard.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('created_by_college_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE events SET created_by_college_id = "
+        "(SELECT users.college_id FROM users WHERE users.id = events.created_by)"
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('events_created_by_fkey', 'events', type_='foreignkey')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_foreign_key('events_created_by_fkey', 'events', 'users', ['created_by'], ['id'])
+    # Not batch_alter_table: rebuilding events would drop the search triggers (0005)
+    op.drop_column('events', 'created_by_college_id')
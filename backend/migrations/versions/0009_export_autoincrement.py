@@ -0,0 +1,43 @@
+"""export tables autoincrement
+
+Rebuilds registrations, attendance and feedback with AUTOINCREMENT on
+SQLite. Without it SQLite hands the largest id out again once that row is
+deleted, which cancellations now do; a row inserted under a reused id is at
+or below an incremental export's watermark and was never exported.
+PostgreSQL ids come from sequences and are never reused, so nothing changes
+there.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('registrations', 'attendance', 'feedback')
+
+
+def _rebuild(autoincrement: bool) -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # Copying the rows in with their ids starts each sequence at the current highest id
+    for table in TABLES:
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+
+
+def upgrade() -> None:
+    _rebuild(True)
+
+
+def downgrade() -> None:
+    _rebuild(False)
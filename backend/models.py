@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -11,14 +11,13 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
     role = Column(String, default="student")  # "student" or "admin"
-    college_id = Column(Integer, ForeignKey("colleges.id"), nullable=True)
+    college_id = Column(Integer, ForeignKey("colleges.id"), nullable=True, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     college = relationship("College", back_populates="users")
-    events_created = relationship("Event", back_populates="creator")
     registrations = relationship("Registration", back_populates="student")
     attendance = relationship("Attendance", back_populates="student")
     feedback = relationship("Feedback", back_populates="student")
@@ -45,40 +44,84 @@ class Event(Base):
     location = Column(String)
     max_attendees = Column(Integer)
     college_id = Column(Integer, ForeignKey("colleges.id"), nullable=False)
-    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # The creating admin can live on another shard (see database.py), so these
+    # locate them as (college, id) instead of referencing users.id
+    created_by = Column(Integer, nullable=False, index=True)
+    created_by_college_id = Column(Integer, nullable=True)  # None: a user without a college, on shard 0
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        Index("ix_events_college_id_date", "college_id", "date"),
+        Index("ix_events_type_date", "type", "date"),
+        Index("ix_events_date", "date"),
+    )
+    
     # Relationships
     college = relationship("College", back_populates="events")
-    creator = relationship("User", back_populates="events_created")
     registrations = relationship("Registration", back_populates="event")
     attendance = relationship("Attendance", back_populates="event")
     feedback = relationship("Feedback", back_populates="event")
+    rating_summary = relationship("EventRatingSummary", back_populates="event", uselist=False, cascade="all, delete-orphan")
+    activity_summary = relationship("EventActivitySummary", back_populates="event", uselist=False, cascade="all, delete-orphan")
+    waitlist = relationship("WaitlistEntry", back_populates="event", cascade="all, delete-orphan")
 
 class Registration(Base):
     __tablename__ = "registrations"
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # One registration per student per event; also serves student_id lookups
+        Index("uq_registrations_student_event", "student_id", "event_id", unique=True),
+        # Ids never come back after a delete, so export watermarks (exports.py) don't skip rows
+        {"sqlite_autoincrement": True},
+    )
+    
     # Relationships
     student = relationship("User", back_populates="registrations")
     event = relationship("Event", back_populates="registrations")
     attendance = relationship("Attendance", back_populates="registration")
     feedback = relationship("Feedback", back_populates="registration")
 
+class WaitlistEntry(Base):
+    """A student waiting for a seat at a full event. Ids give the FIFO order:
+    cancellations promote the lowest id first (see crud.cancel_registration)."""
+    __tablename__ = "waitlist_entries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Once per student per event; also serves student_id lookups
+        Index("uq_waitlist_entries_student_event", "student_id", "event_id", unique=True),
+        # The front of an event's queue, and positions in it
+        Index("ix_waitlist_entries_event_id_id", "event_id", "id"),
+    )
+    
+    # Relationships
+    event = relationship("Event", back_populates="waitlist")
+
 class Attendance(Base):
     __tablename__ = "attendance"
     
     id = Column(Integer, primary_key=True, index=True)
-    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False)
+    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
     check_in_time = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # One check-in per student per event; also serves student_id lookups
+        Index("uq_attendance_student_event", "student_id", "event_id", unique=True),
+        {"sqlite_autoincrement": True},
+    )
+    
     # Relationships
     registration = relationship("Registration", back_populates="attendance")
     student = relationship("User", back_populates="attendance")
@@ -88,14 +131,78 @@ class Feedback(Base):
     __tablename__ = "feedback"
     
     id = Column(Integer, primary_key=True, index=True)
-    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False)
-    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
     rating = Column(Integer, nullable=False)  # 1-5 scale
     comment = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = {"sqlite_autoincrement": True}
+    
     # Relationships
     registration = relationship("Registration", back_populates="feedback")
     student = relationship("User", back_populates="feedback")
     event = relationship("Event", back_populates="feedback")
+
+class EventRatingSummary(Base):
+    """Running feedback totals per event, maintained by crud.create_feedback."""
+    __tablename__ = "event_rating_summaries"
+    
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    rating_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    # Histogram of ratings on the 1-5 scale
+    rating_1 = Column(Integer, default=0, nullable=False)
+    rating_2 = Column(Integer, default=0, nullable=False)
+    rating_3 = Column(Integer, default=0, nullable=False)
+    rating_4 = Column(Integer, default=0, nullable=False)
+    rating_5 = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    event = relationship("Event", back_populates="rating_summary")
+
+class ResourceVersion(Base):
+    """Change counter for a cacheable resource ("events", "event:<id>",
+    "colleges"), bumped by the crud functions that modify it. ETags on the
+    catalog endpoints are built from these."""
+    __tablename__ = "resource_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False, server_default="0")
+
+class EventActivitySummary(Base):
+    """Running registration and attendance counts per event, maintained by the
+    crud functions that insert them and reconciled periodically. Feedback
+    totals live in EventRatingSummary."""
+    __tablename__ = "event_activity_summaries"
+    
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    registration_count = Column(Integer, default=0, nullable=False)
+    attendance_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Top-N events by popularity without sorting every row
+        Index("ix_event_activity_summaries_registration_count", "registration_count"),
+    )
+    
+    # Relationships
+    event = relationship("Event", back_populates="activity_summary")
+
+class StudentActivitySummary(Base):
+    """Running participation counts per student, maintained alongside
+    EventActivitySummary."""
+    __tablename__ = "student_activity_summaries"
+    
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    registration_count = Column(Integer, default=0, nullable=False)
+    attendance_count = Column(Integer, default=0, nullable=False)
+    feedback_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Most active students: ranked by events attended, then registered
+        Index("ix_student_activity_summaries_activity", "attendance_count", "registration_count"),
+    )
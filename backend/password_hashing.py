@@ -0,0 +1,105 @@
+"""Bounded worker pool for bcrypt.
+
+bcrypt costs ~250ms of CPU per call by design. Run inline in an `async def`
+route it stalls every other request on the worker, so /auth/login and
+/auth/register hand it to a small thread pool instead (bcrypt releases the
+GIL while hashing). The pool admits at most `max_workers + max_queue`
+requests; past that, callers get PasswordHashingPoolSaturated immediately
+and the API answers 503 rather than letting a login storm queue unboundedly.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from auth import get_password_hash, verify_and_update_password
+from config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+
+class PasswordHashingPoolSaturated(Exception):
+    """Raised when every hashing worker is busy and the wait queue is full."""
+
+class _Timing:
+    """Count, total and max of one duration metric, in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 6),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+class PasswordHashingPool:
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_wait = _Timing()
+        self.hash_time = _Timing()
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; the second item is a replacement hash when the
+        stored one was made with a different cost factor."""
+        valid, new_hash = await self._submit(verify_and_update_password, password, hashed_password)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    async def _submit(self, function: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHashingPoolSaturated()
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._run, function, time.perf_counter(), *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _run(self, function: Callable, submitted_at: float, *args):
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.queue_wait.observe(started - submitted_at)
+                self.hash_time.observe(finished - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "queue_wait": self.queue_wait.as_dict(),
+                "hash_time": self.hash_time.as_dict(),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+password_hashing_pool = PasswordHashingPool()
@@ -0,0 +1,143 @@
+"""In-process cache of authenticated users, keyed by bearer token.
+
+get_current_user runs on every protected request. On a hit it skips both the
+JWT decode and the user lookup, so the auth dependency costs no queries.
+Entries expire after a TTL (never later than the token itself) and the least
+recently used entry is evicted once the cache is full. Anything that changes
+who a user is allowed to be (role, deactivation) must call invalidate_user.
+
+Each worker has its own cache, so invalidate_user also publishes the user on
+the broker (see broker.py, CACHE_BROKER_URL) and every worker evicts the
+user's tokens. Users are named by shard and id, as ids repeat across shards
+when data is partitioned by college. A user loaded while an invalidation arrives isn't cached (see
+`generation`), so a lookup that raced with the change can't store the old
+role. Without a broker, or if a message is lost while it is down, other
+workers drop the entry once the TTL runs out.
+
+Cached users are transient copies detached from any session, so they can be
+shared between requests safely; treat them as read-only.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from broker import create_broker
+from config import CACHE_BROKER_URL, PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE
+from database import shard_for_college
+from models import User
+
+INVALIDATION_CHANNEL = "principal-cache:invalidate"
+
+def snapshot_user(user: User) -> User:
+    """Copy a user's column values into a new, session-less User instance."""
+    return User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+
+def _user_key(user: User) -> Tuple[int, int]:
+    return shard_for_college(user.college_id), user.id
+
+class PrincipalCache:
+    def __init__(self, broker=None, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS, max_size: int = PRINCIPAL_CACHE_MAX_SIZE):
+        self.broker = broker
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (user, expires_at)
+        self._tokens_by_user: Dict[Tuple[int, int], Set[str]] = {}  # (shard, user id) -> tokens
+        self._lock = threading.Lock()
+        self.generation = 0  # bumped by every invalidation, local or from another worker
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def start(self):
+        """Listen for other workers' invalidations; called on application startup."""
+        if self.broker is not None:
+            await self.broker.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    async def close(self):
+        if self.broker is not None:
+            await self.broker.close()
+
+    def get(self, token: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: User, token_expires_at: Optional[float] = None, generation: Optional[int] = None):
+        """Cache a verified user. Pass the `generation` read before loading the
+        user: if an invalidation came in since, the user may be out of date and
+        isn't cached."""
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (snapshot_user(user), expires_at)
+            self._tokens_by_user.setdefault(_user_key(user), set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    async def invalidate_user(self, shard: int, user_id: int):
+        """Drop every cached token for the user with this id on this shard, in
+        all workers, e.g. after a role change or deactivation."""
+        self._evict_user(shard, user_id)
+        self.invalidations += 1
+        if self.broker is not None:
+            await self.broker.publish(INVALIDATION_CHANNEL, f"{shard}:{user_id}")
+
+    async def _on_invalidation(self, channel: str, message: str):
+        shard, user_id = (int(part) for part in message.split(":"))
+        self._evict_user(shard, user_id)
+
+    def _evict_user(self, shard: int, user_id: int):
+        with self._lock:
+            self.generation += 1
+            for token in list(self._tokens_by_user.get((shard, user_id), ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        user, _ = self._entries.pop(token)
+        key = _user_key(user)
+        tokens = self._tokens_by_user.get(key)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "broker": type(self.broker).__name__ if self.broker is not None else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+principal_cache = PrincipalCache(create_broker(CACHE_BROKER_URL))
@@ -0,0 +1,106 @@
+"""Attendance QR codes.
+
+Two formats are accepted when scanning:
+
+- Signed tokens (preferred), issued by GET /registrations/{id}/qr-token: a
+  17-byte binary record (version, event id, student id, registration id,
+  expiry) followed by a truncated HMAC-SHA256, base32-encoded without
+  padding. The result is 44 characters from the QR alphanumeric set, so it
+  encodes densely and scans quickly, and a forged, expired or wrong-event
+  code is rejected with pure CPU work before any database access.
+- Legacy JSON like {"type": "attendance", "eventId": 3, "studentId": 42},
+  as generated by the current web and mobile apps. It isn't signed, so the
+  scan endpoints still check it against the database.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import struct
+import time
+from typing import Optional
+
+from config import SECRET_KEY
+
+TOKEN_VERSION = 1
+# version, event_id, student_id, registration_id, expires_at (unix seconds)
+_TOKEN_PAYLOAD = struct.Struct(">BIIII")
+_SIGNATURE_BYTES = 10  # 80-bit truncated HMAC-SHA256
+_TOKEN_LENGTH = len(base64.b32encode(b"\0" * (_TOKEN_PAYLOAD.size + _SIGNATURE_BYTES)).rstrip(b"="))
+
+# Separate key for QR signing so a QR signature can never double as anything else
+_SIGNING_KEY = hmac.new(SECRET_KEY.encode(), b"attendance-qr-token", hashlib.sha256).digest()
+
+class InvalidQRCode(ValueError):
+    """The scanned payload isn't a usable attendance code; str(exc) says why."""
+
+class AttendanceQR:
+    def __init__(self, event_id: int, student_id: Optional[int], registration_id: Optional[int] = None):
+        self.event_id = event_id
+        self.student_id = student_id
+        # Only set for signed tokens, whose registration was checked when issued
+        self.registration_id = registration_id
+
+    @property
+    def signed(self) -> bool:
+        return self.registration_id is not None
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(_SIGNING_KEY, payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+def create_attendance_token(event_id: int, student_id: int, registration_id: int, expires_at: int) -> str:
+    payload = _TOKEN_PAYLOAD.pack(TOKEN_VERSION, event_id, student_id, registration_id, expires_at)
+    return base64.b32encode(payload + _sign(payload)).decode().rstrip("=")
+
+def verify_attendance_token(token: str, expected_event_id: int, now: Optional[float] = None) -> AttendanceQR:
+    token = token.strip().upper()
+    if len(token) != _TOKEN_LENGTH:
+        raise InvalidQRCode("Invalid QR code format")
+    try:
+        raw = base64.b32decode(token + "=" * (-len(token) % 8))
+    except ValueError:
+        raise InvalidQRCode("Invalid QR code format")
+
+    payload, signature = raw[:_TOKEN_PAYLOAD.size], raw[_TOKEN_PAYLOAD.size:]
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidQRCode("Invalid QR code signature")
+    version, event_id, student_id, registration_id, expires_at = _TOKEN_PAYLOAD.unpack(payload)
+    if version != TOKEN_VERSION:
+        raise InvalidQRCode("Unsupported QR code version")
+    if expires_at <= (time.time() if now is None else now):
+        raise InvalidQRCode("QR code has expired")
+    if event_id != expected_event_id:
+        raise InvalidQRCode("QR code event ID mismatch")
+    return AttendanceQR(event_id, student_id, registration_id)
+
+def _parse_legacy_json(qr_data: str, expected_event_id: int) -> AttendanceQR:
+    try:
+        qr_info = json.loads(qr_data)
+    except json.JSONDecodeError:
+        raise InvalidQRCode("Invalid QR code format")
+    if not isinstance(qr_info, dict):
+        raise InvalidQRCode("Invalid QR code format")
+
+    if qr_info.get("type") != "attendance":
+        raise InvalidQRCode("Invalid QR code type")
+
+    event_id = qr_info.get("eventId")
+    if not event_id or str(event_id) != str(expected_event_id):
+        raise InvalidQRCode("QR code event ID mismatch")
+
+    student_id = qr_info.get("studentId")
+    if student_id is not None:
+        try:
+            student_id = int(student_id)
+        except (TypeError, ValueError):
+            raise InvalidQRCode("Invalid student ID in QR code")
+    return AttendanceQR(int(expected_event_id), student_id)
+
+def parse_attendance_qr(qr_data: str, expected_event_id: int) -> AttendanceQR:
+    """Parse and check an attendance QR payload for the event being scanned.
+
+    student_id is None for older JSON codes that don't carry one.
+    """
+    if qr_data.lstrip().startswith("{"):
+        return _parse_legacy_json(qr_data, expected_event_id)
+    return verify_attendance_token(qr_data, expected_event_id)
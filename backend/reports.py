@@ -0,0 +1,101 @@
+"""Admin reports served from the activity rollups.
+
+crud keeps EventActivitySummary and StudentActivitySummary current as
+registrations, attendance and feedback are written (EventRatingSummary
+already covers ratings), so a report reads a bounded number of rollup rows
+however many raw rows exist. This module combines per-shard results and
+runs the periodic reconciliation that corrects any drift in the rollups.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from async_crud import reconcile_activity_rollups
+from config import ROLLUP_RECONCILE_INTERVAL_SECONDS
+from database import scatter
+
+logger = logging.getLogger(__name__)
+
+# /reports/events/top?by=... -> the row field it ranks on
+EVENT_RANKINGS = {
+    "registrations": "registration_count",
+    "attendance": "attendance_count",
+    "attendance_rate": "attendance_rate",
+    "rating": "average_rating",
+}
+
+def merge_top(pages: List[List[dict]], limit: int, *fields: str) -> List[dict]:
+    """Merge per-shard top-N lists, each already ranked by `fields`, descending."""
+    if len(pages) == 1:
+        # Keep the database's order, which ranks on unrounded values
+        return pages[0][:limit]
+    rows = [row for page in pages for row in page]
+    rows.sort(key=lambda row: tuple(row[field] for field in fields), reverse=True)
+    return rows[:limit]
+
+def merge_breakdowns(pages: List[List[dict]]) -> List[dict]:
+    """Add up per-shard breakdown totals by key and derive the rates."""
+    totals: Dict[str, dict] = {}
+    for page in pages:
+        for row in page:
+            total = totals.setdefault(row["key"], dict.fromkeys(row, 0))
+            for field, value in row.items():
+                if field != "key":
+                    total[field] += value
+            total["key"] = row["key"]
+    report = []
+    for total in sorted(totals.values(), key=lambda total: (-total["registration_count"], total["key"])):
+        rating_sum = total.pop("rating_sum")
+        total["attendance_rate"] = round(total["attendance_count"] / total["registration_count"], 4) if total["registration_count"] else 0.0
+        total["average_rating"] = round(rating_sum / total["rating_count"], 1) if total["rating_count"] else 0.0
+        report.append(total)
+    return report
+
+class RollupReconciler:
+    """Re-runs crud.reconcile_activity_rollups on every shard every
+    ROLLUP_RECONCILE_INTERVAL_SECONDS (0 disables it)."""
+
+    def __init__(self, interval_seconds: float = ROLLUP_RECONCILE_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.rows_corrected = 0
+        self.failures = 0
+
+    def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def reconcile(self) -> int:
+        corrected = sum(await scatter(None, reconcile_activity_rollups))
+        self.runs += 1
+        self.rows_corrected += corrected
+        if corrected:
+            logger.info("Activity rollups: corrected %d drifted rows", corrected)
+        return corrected
+
+    async def _run_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.reconcile()
+            except Exception:
+                # e.g. SQLite refusing the write because a registration committed
+                # after the recount began; the next run picks it up
+                self.failures += 1
+                logger.exception("Activity rollup reconciliation failed")
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "rows_corrected": self.rows_corrected,
+            "failures": self.failures,
+        }
+
+rollup_reconciler = RollupReconciler()
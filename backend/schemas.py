@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Dict
 from datetime import datetime
 
 # User schemas
@@ -16,6 +16,10 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class UserAdminUpdate(BaseModel):
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+
 class UserResponse(UserBase):
     id: int
     is_active: bool
@@ -69,6 +73,7 @@ class EventUpdate(BaseModel):
 class EventResponse(EventBase):
     id: int
     created_by: int
+    created_by_college_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     average_rating: Optional[float] = None
@@ -76,12 +81,34 @@ class EventResponse(EventBase):
     class Config:
         from_attributes = True
 
+# Event search schemas
+class EventSearchHit(EventResponse):
+    rank: float  # relevance, higher is better; 0 without query text
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class EventSearchResponse(BaseModel):
+    total: int
+    results: List[EventSearchHit]
+    facets: Dict[str, List[FacetCount]]  # type, college_id, month (YYYY-MM)
+
+# Nested in "my" responses requested with ?expand=
+class ExpandedEvent(EventBase):
+    id: int
+    college: Optional[CollegeResponse] = None
+
+    class Config:
+        from_attributes = True
+
 # Registration schemas
 class RegistrationBase(BaseModel):
     event_id: int
 
 class RegistrationCreate(RegistrationBase):
-    pass
+    # When the event is full, join its waitlist instead of being turned away
+    join_waitlist: bool = False
 
 class RegistrationResponse(RegistrationBase):
     id: int
@@ -91,6 +118,32 @@ class RegistrationResponse(RegistrationBase):
     class Config:
         from_attributes = True
 
+class RegistrationExpandedResponse(RegistrationResponse):
+    event: ExpandedEvent
+
+class WaitlistResponse(BaseModel):
+    """Answer to a registration that found the event full and joined its waitlist"""
+    event_id: int
+    status: str = "waitlisted"
+    position: int
+
+class RegistrationImport(RegistrationBase):
+    """One row of a registrations bulk import; the student is identified by email."""
+    student_email: EmailStr
+
+# Bulk import schemas
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    kind: str
+    total: int = 0
+    inserted: int = 0
+    skipped: int = 0  # already present, or repeated within the file
+    failed: int = 0
+    errors: List[ImportRowError] = []  # first 100 failures
+
 # Attendance schemas
 class AttendanceBase(BaseModel):
     registration_id: int
@@ -107,6 +160,9 @@ class AttendanceResponse(AttendanceBase):
     class Config:
         from_attributes = True
 
+class AttendanceExpandedResponse(AttendanceResponse):
+    event: ExpandedEvent
+
 # QR Code Attendance schemas
 class QRAttendanceCreate(BaseModel):
     event_id: int
@@ -119,6 +175,36 @@ class QRAttendanceResponse(BaseModel):
     student_name: Optional[str] = None
     event_title: Optional[str] = None
 
+class QRTokenResponse(BaseModel):
+    registration_id: int
+    event_id: int
+    qr_token: str
+    expires_at: datetime
+
+# Bulk QR check-in schemas (offline scanner sync)
+class QRScan(BaseModel):
+    qr_data: str
+    scanned_at: Optional[datetime] = None  # when the scanner read the code; defaults to upload time
+
+class BulkQRAttendanceCreate(BaseModel):
+    event_id: int
+    scans: List[QRScan] = Field(..., max_length=5000)
+
+class BulkQRAttendanceItem(BaseModel):
+    index: int
+    status: str  # "marked", "duplicate", "not_registered" or "invalid"
+    student_id: Optional[int] = None
+    attendance_id: Optional[int] = None
+    message: Optional[str] = None
+
+class BulkQRAttendanceResponse(BaseModel):
+    event_id: int
+    marked: int = 0
+    duplicate: int = 0
+    not_registered: int = 0
+    invalid: int = 0
+    results: List[BulkQRAttendanceItem]
+
 # Feedback schemas
 class FeedbackBase(BaseModel):
     registration_id: int
@@ -127,7 +213,7 @@ class FeedbackBase(BaseModel):
     comment: Optional[str] = None
 
 class FeedbackCreate(FeedbackBase):
-    pass
+    rating: int = Field(..., ge=1, le=5)
 
 class FeedbackResponse(FeedbackBase):
     id: int
@@ -136,3 +222,42 @@ class FeedbackResponse(FeedbackBase):
     
     class Config:
         from_attributes = True
+
+class FeedbackExpandedResponse(FeedbackResponse):
+    event: ExpandedEvent
+
+class EventActivityReport(BaseModel):
+    event_id: int
+    title: str
+    type: str
+    date: datetime
+    college_id: int
+    registration_count: int
+    attendance_count: int
+    attendance_rate: float
+    rating_count: int
+    average_rating: float
+
+class StudentActivityReport(BaseModel):
+    student_id: int
+    full_name: str
+    college_id: Optional[int] = None
+    registration_count: int
+    attendance_count: int
+    feedback_count: int
+    attendance_rate: float
+
+class ActivityBreakdownReport(BaseModel):
+    key: str  # college id or event type
+    event_count: int
+    registration_count: int
+    attendance_count: int
+    attendance_rate: float
+    rating_count: int
+    average_rating: float
+
+class EventRatingResponse(BaseModel):
+    event_id: int
+    average_rating: float
+    rating_count: int = 0
+    histogram: Dict[int, int] = {}
@@ -0,0 +1,66 @@
+"""College (tenant) context for each request.
+
+Students work within their own college, so requests they make default to
+it: /events and /events/search list that college's events, single-event
+reads find the right shard without a `college_id` parameter, and
+registrations and feedback can only be created for its events.
+
+CollegeContextMiddleware reads the college from the bearer token (no
+database query) and stores it on `request.state.college_id`; endpoints read
+it with `college_context`. Admins, anonymous requests and invalid tokens get
+no context, and authentication itself is still enforced by get_current_user.
+An explicit `college_id` query parameter always wins.
+
+The middleware looks the token up in the principal cache and decodes it
+only on a miss. It leaves what it found on the request state for
+get_current_user (see `read_token`), so a request decodes its token at most
+once, and not at all while the token is cached.
+"""
+from typing import Optional, Tuple
+
+from fastapi import Request
+
+from auth import verify_token
+from models import User
+from principal_cache import principal_cache
+
+def college_for(role: Optional[str], college_id: Optional[int]) -> Optional[int]:
+    """The college a user's requests default to; admins work across colleges."""
+    return None if role in (None, "admin") else college_id
+
+def read_token(state: dict, token: str) -> Tuple[Optional[User], Optional[dict]]:
+    """The cached user for a token, or else its verified claims (None if
+    invalid), remembered in `state` so the request looks the token up once"""
+    if state.get("token") != token:
+        principal = principal_cache.get(token)
+        state.update(token=token, principal=principal, claims=None if principal is not None else verify_token(token))
+    return state["principal"], state["claims"]
+
+class CollegeContextMiddleware:
+    """Plain ASGI middleware, so streaming responses pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            state = scope.setdefault("state", {})
+            college_id = None
+            authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                # Tokens carry the user's college and role (see /auth/login)
+                principal, claims = read_token(state, token)
+                if principal is not None:
+                    college_id = college_for(principal.role, principal.college_id)
+                elif claims is not None:
+                    college_id = college_for(claims.get("role"), claims.get("college_id"))
+            state["college_id"] = college_id
+        await self.app(scope, receive, send)
+
+def college_context(request: Request) -> Optional[int]:
+    return request.state.college_id if hasattr(request.state, "college_id") else None
+
+def token_principal(request: Request, token: str) -> Tuple[Optional[User], Optional[dict]]:
+    """read_token for the request's token, reusing the middleware's lookup"""
+    return read_token(request.scope.setdefault("state", {}), token)
@@ -0,0 +1,70 @@
+"""Shared fixtures: the app on a scratch SQLite database, and helpers to
+set up an event with its college, an admin and students.
+
+DATABASE_URL must be set before anything imports database.py, so it is set
+here at import time, before the tests import the app.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="campus-events-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'test.db')}"
+os.environ.setdefault("ROLLUP_RECONCILE_INTERVAL_SECONDS", "0")
+
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from database import SessionLocal
+from main import app
+from models import College, Event, User
+
+_emails = count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def auth_headers(user: User) -> dict:
+    token = create_access_token(
+        data={"sub": str(user.id), "college_id": user.college_id, "role": user.role},
+        expires_delta=timedelta(hours=1),
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def make_event(db):
+    """make_event(max_attendees, students=3) -> (event, admin, [students]), each in a new college"""
+    def make(max_attendees, students: int = 3, date: datetime = None):
+        college = College(name=f"Test College {next(_emails)}")
+        db.add(college)
+        db.flush()
+        users = [
+            User(email=f"user{next(_emails)}@example.com", hashed_password="-", full_name=f"Test {role}",
+                 role=role, college_id=college.id)
+            for role in ["admin"] + ["student"] * students
+        ]
+        db.add_all(users)
+        db.flush()
+        event = Event(title="Capacity Test", type="Workshop", date=date or datetime.utcnow() + timedelta(days=7),
+                      location="Hall", max_attendees=max_attendees, college_id=college.id, created_by=users[0].id)
+        db.add(event)
+        db.commit()
+        return event, users[0], users[1:]
+    return make
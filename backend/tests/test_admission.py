@@ -0,0 +1,95 @@
+"""Registration admission: seats, the waitlist, cancellation and promotion."""
+from conftest import auth_headers
+
+from models import EventActivitySummary, Registration, WaitlistEntry
+
+def register(client, student, event, join_waitlist=False):
+    return client.post("/registrations", json={"event_id": event.id, "join_waitlist": join_waitlist}, headers=auth_headers(student))
+
+def registered_students(db, event):
+    db.expire_all()
+    return {student_id for (student_id,) in db.query(Registration.student_id).filter(Registration.event_id == event.id)}
+
+def waitlist(db, event):
+    return [student_id for (student_id,) in db.query(WaitlistEntry.student_id).filter(WaitlistEntry.event_id == event.id).order_by(WaitlistEntry.id)]
+
+def seats_taken(db, event):
+    return db.query(EventActivitySummary.registration_count).filter(EventActivitySummary.event_id == event.id).scalar()
+
+def test_full_event_waitlists_and_cancellation_promotes_the_head(client, db, make_event):
+    event, _, (first, second, third) = make_event(max_attendees=1)
+
+    admitted = register(client, first, event)
+    assert admitted.status_code == 200
+    assert register(client, second, event).status_code == 409
+
+    queued = register(client, second, event, join_waitlist=True)
+    assert queued.status_code == 202
+    assert queued.json() == {"event_id": event.id, "status": "waitlisted", "position": 1}
+    assert register(client, third, event, join_waitlist=True).json()["position"] == 2
+    assert register(client, second, event, join_waitlist=True).json()["position"] == 1
+
+    cancelled = client.delete(f"/registrations/{admitted.json()['id']}", headers=auth_headers(first))
+    assert cancelled.status_code == 200
+    assert cancelled.json()["promoted_student_ids"] == [second.id]
+    assert registered_students(db, event) == {second.id}
+    assert waitlist(db, event) == [third.id]
+    assert seats_taken(db, event) == 1
+
+def test_registering_again_while_full_is_a_duplicate_not_a_waitlisting(client, db, make_event):
+    event, _, (first, second, _) = make_event(max_attendees=1)
+    assert register(client, first, event).status_code == 200
+    assert register(client, second, event).status_code == 409  # the worker now knows the event is full
+
+    for join_waitlist in (False, True):
+        response = register(client, first, event, join_waitlist=join_waitlist)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Already registered for this event"
+    assert waitlist(db, event) == []
+    assert seats_taken(db, event) == 1
+
+def test_cancelling_drops_the_students_own_waitlist_entry(client, db, make_event):
+    event, _, (first, second, third) = make_event(max_attendees=1)
+    admitted = register(client, first, event).json()
+    assert register(client, second, event, join_waitlist=True).status_code == 202
+    # An entry left over from before registrations were checked first
+    db.add(WaitlistEntry(student_id=first.id, event_id=event.id))
+    db.commit()
+
+    client.delete(f"/registrations/{admitted['id']}", headers=auth_headers(first))
+    assert waitlist(db, event) == []
+    promoted = db.query(Registration.id).filter(Registration.event_id == event.id, Registration.student_id == second.id).scalar()
+    client.delete(f"/registrations/{promoted}", headers=auth_headers(second))
+    assert registered_students(db, event) == set()
+
+def test_cancelling_while_waitlisted_gives_up_the_place_in_line(client, db, make_event):
+    event, _, (first, second, third) = make_event(max_attendees=1)
+    admitted = register(client, first, event).json()
+    register(client, second, event, join_waitlist=True)
+    register(client, third, event, join_waitlist=True)
+
+    assert client.delete(f"/events/{event.id}/waitlist", headers=auth_headers(second)).status_code == 200
+    assert client.delete(f"/events/{event.id}/waitlist", headers=auth_headers(second)).status_code == 404
+    assert waitlist(db, event) == [third.id]
+    assert register(client, third, event, join_waitlist=True).json()["position"] == 1
+
+    cancelled = client.delete(f"/registrations/{admitted['id']}", headers=auth_headers(first))
+    assert cancelled.json()["promoted_student_ids"] == [third.id]
+    assert registered_students(db, event) == {third.id}
+
+def test_raising_capacity_promotes_from_the_waitlist(client, db, make_event):
+    event, admin, (first, second, third) = make_event(max_attendees=1)
+    register(client, first, event)
+    register(client, second, event, join_waitlist=True)
+    register(client, third, event, join_waitlist=True)
+
+    response = client.put(f"/events/{event.id}", json={"max_attendees": 2}, headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert registered_students(db, event) == {first.id, second.id}
+    assert waitlist(db, event) == [third.id]
+    assert register(client, third, event).status_code == 409
+
+def test_cannot_cancel_another_students_registration(client, make_event):
+    event, _, (first, second, _) = make_event(max_attendees=None)
+    admitted = register(client, first, event).json()
+    assert client.delete(f"/registrations/{admitted['id']}", headers=auth_headers(second)).status_code == 404
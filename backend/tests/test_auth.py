@@ -0,0 +1,71 @@
+"""Bearer tokens: decoded at most once per request, cached, and evicted in every worker."""
+import asyncio
+
+import pytest
+
+import principal_cache as principal_cache_module
+import tenant
+from broker import LocalBroker
+from conftest import auth_headers
+from models import User
+from principal_cache import PrincipalCache, principal_cache
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    def counting_verify(token):
+        calls.append(token)
+        return verify(token)
+    verify = tenant.verify_token
+    monkeypatch.setattr(tenant, "verify_token", counting_verify)
+    return calls
+
+def test_token_is_decoded_once_then_served_from_the_cache(client, make_event, decodes):
+    event, _, (student, *_) = make_event(max_attendees=None)
+    headers = auth_headers(student)
+    principal_cache.clear()
+
+    assert client.get("/auth/me", headers=headers).json()["id"] == student.id
+    assert len(decodes) == 1
+    # The cached principal still gives students their college context
+    listed = client.get("/events", headers=headers).json()
+    assert [row["id"] for row in listed] == [event.id]
+    assert len(decodes) == 1
+
+def test_invalid_token_is_rejected_after_one_decode(client, decodes):
+    response = client.get("/auth/me", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+    assert decodes == ["not-a-token"]
+
+def test_invalidation_reaches_every_worker_through_the_broker():
+    async def scenario():
+        broker = LocalBroker()
+        workers = [PrincipalCache(broker), PrincipalCache(broker)]
+        for cache in workers:
+            await cache.start()
+            cache.put("token", User(id=7, email="a@example.com", role="admin", college_id=1))
+        await workers[0].invalidate_user(0, 7)
+        return [cache.get("token") for cache in workers]
+
+    assert asyncio.run(scenario()) == [None, None]
+
+def test_user_loaded_across_an_invalidation_is_not_cached():
+    cache = PrincipalCache()
+    generation = cache.generation
+    asyncio.run(cache.invalidate_user(0, 7))
+    cache.put("token", User(id=7, email="a@example.com", role="admin", college_id=1), generation=generation)
+    assert cache.get("token") is None
+
+def test_invalidation_spares_the_same_user_id_on_another_shard(monkeypatch):
+    monkeypatch.setattr(principal_cache_module, "shard_for_college", lambda college_id: college_id % 2)
+    async def scenario():
+        broker = LocalBroker()
+        workers = [PrincipalCache(broker), PrincipalCache(broker)]
+        for cache in workers:
+            await cache.start()
+            cache.put("shard-0", User(id=7, email="a@example.com", role="admin", college_id=2))
+            cache.put("shard-1", User(id=7, email="b@example.com", role="admin", college_id=1))
+        await workers[0].invalidate_user(1, 7)
+        return [(cache.get("shard-0") is not None, cache.get("shard-1") is not None) for cache in workers]
+
+    assert asyncio.run(scenario()) == [(True, False), (True, False)]
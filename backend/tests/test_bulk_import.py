@@ -0,0 +1,40 @@
+"""Imported registrations take seats like the API does."""
+import io
+import json
+
+from bulk_import import import_stream
+from conftest import auth_headers
+from models import EventActivitySummary, Registration, WaitlistEntry
+
+def registrations_file(students, event):
+    return io.StringIO("".join(json.dumps({"student_email": student.email, "event_id": event.id}) + "\n" for student in students))
+
+def test_import_refuses_rows_past_the_last_seat(client, db, make_event):
+    event, _, students = make_event(max_attendees=2, students=4)
+    assert client.post("/registrations", json={"event_id": event.id}, headers=auth_headers(students[0])).status_code == 200
+
+    report = import_stream("registrations", registrations_file(students, event), "jsonl")
+    assert (report.inserted, report.skipped, report.failed) == (1, 1, 2)
+    assert [error.error for error in report.errors] == [f"Event {event.id} is full"] * 2
+    assert [error.line for error in report.errors] == [3, 4]
+
+    db.expire_all()
+    registered = {student_id for (student_id,) in db.query(Registration.student_id).filter(Registration.event_id == event.id)}
+    assert registered == {students[0].id, students[1].id}
+    assert db.query(EventActivitySummary.registration_count).filter(EventActivitySummary.event_id == event.id).scalar() == 2
+
+def test_import_does_not_jump_the_waitlist(client, db, make_event):
+    event, _, (first, waiting, imported) = make_event(max_attendees=1)
+    client.post("/registrations", json={"event_id": event.id}, headers=auth_headers(first))
+    assert client.post("/registrations", json={"event_id": event.id, "join_waitlist": True}, headers=auth_headers(waiting)).status_code == 202
+
+    report = import_stream("registrations", registrations_file([imported], event), "jsonl")
+    assert (report.inserted, report.failed) == (0, 1)
+    db.expire_all()
+    assert [student_id for (student_id,) in db.query(WaitlistEntry.student_id).filter(WaitlistEntry.event_id == event.id)] == [waiting.id]
+
+def test_import_without_a_capacity_takes_everyone(db, make_event):
+    event, _, students = make_event(max_attendees=None)
+    report = import_stream("registrations", registrations_file(students + students[:1], event), "jsonl")
+    assert (report.inserted, report.skipped, report.failed) == (3, 1, 0)
+    assert db.query(EventActivitySummary.registration_count).filter(EventActivitySummary.event_id == event.id).scalar() == 3
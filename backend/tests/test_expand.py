@@ -0,0 +1,31 @@
+"""The "my" lists: plain rows by default, each row's event (and its college) nested with ?expand=."""
+import pytest
+
+from conftest import auth_headers
+
+@pytest.fixture
+def history(client, make_event):
+    event, _, (student, *_) = make_event(max_attendees=None)
+    headers = auth_headers(student)
+    registration_id = client.post("/registrations", json={"event_id": event.id}, headers=headers).json()["id"]
+    row = {"registration_id": registration_id, "event_id": event.id}
+    assert client.post("/attendance", json=row, headers=headers).status_code == 200
+    assert client.post("/feedback", json={**row, "rating": 4}, headers=headers).status_code == 200
+    return event, headers
+
+@pytest.mark.parametrize("path", ["/registrations/my", "/attendance/my", "/feedback/my"])
+def test_expand_nests_the_event_and_only_then_its_college(client, history, path):
+    event, headers = history
+    plain, = client.get(path, headers=headers).json()
+    with_event, = client.get(path, params={"expand": "event"}, headers=headers).json()
+    with_college, = client.get(path, params={"expand": "event,college"}, headers=headers).json()
+
+    assert "event" not in plain and plain["event_id"] == event.id
+    assert with_event["event"]["id"] == event.id and "college" not in with_event["event"]
+    assert with_college["event"]["college"]["id"] == event.college_id
+
+def test_my_lists_document_both_shapes(client):
+    paths = client.get("/openapi.json").json()["paths"]
+    for path, schema in [("/registrations/my", "Registration"), ("/attendance/my", "Attendance"), ("/feedback/my", "Feedback")]:
+        shapes = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["anyOf"]
+        assert [shape["items"]["$ref"].rsplit("/", 1)[1] for shape in shapes] == [f"{schema}Response", f"{schema}ExpandedResponse"]
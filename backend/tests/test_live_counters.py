@@ -0,0 +1,11 @@
+"""The live counters stream is for admins only."""
+from conftest import auth_headers
+
+def test_stream_needs_a_token_and_an_admin(client, make_event):
+    event, admin, (student, *_) = make_event(max_attendees=10)
+    assert client.get(f"/events/{event.id}/live").status_code in (401, 403)
+    response = client.get(f"/events/{event.id}/live", headers=auth_headers(student))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Only admins can follow live counters"
+    # Admins get past the check; an unknown event is still a 404 (the stream itself never ends)
+    assert client.get("/events/999999/live", headers=auth_headers(admin)).status_code == 404
@@ -0,0 +1,101 @@
+"""Partitioned mode: two SQLite shards, colleges split between them by id.
+
+The shard URLs are read when database.py is imported, and the other tests
+have already imported the app on a single database, so the scenario runs
+this file again in a fresh interpreter with SHARD_DATABASE_URLS set.
+"""
+import csv
+import io
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_two_shards(tmp_path):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'shard0.db'}",
+        "SHARD_DATABASE_URLS": f"sqlite:///{tmp_path / 'shard1.db'}",
+        "ROLLUP_RECONCILE_INTERVAL_SECONDS": "0",
+        "BCRYPT_ROUNDS": "4",
+    }
+    result = subprocess.run([sys.executable, __file__], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+def run_scenario():
+    sys.path.insert(0, BACKEND_DIR)
+    from fastapi.testclient import TestClient
+
+    from auth import create_access_token
+    from main import app
+
+    def headers(user: dict) -> dict:
+        token = create_access_token({"sub": str(user["id"]), "college_id": user["college_id"], "role": user["role"]})
+        return {"Authorization": f"Bearer {token}"}
+
+    def export(client, admin, watermark=None):
+        params = {"watermark": watermark} if watermark else {}
+        response = client.get("/admin/export/registrations", params=params, headers=headers(admin))
+        assert response.status_code == 200, response.text
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        return response.headers["X-Export-Watermark"], sorted(int(row["student_id"]) for row in rows)
+
+    with TestClient(app) as client:
+        # College 1 lives on shard 1, college 2 on shard 0
+        north, south = (client.post("/colleges", json={"name": name}).json()["id"] for name in ("North", "South"))
+        assert (north, south) == (1, 2)
+
+        def register_user(email, role, college_id):
+            response = client.post("/auth/register", json={"email": email, "password": "secret", "full_name": email,
+                                                           "role": role, "college_id": college_id})
+            assert response.status_code == 200, response.text
+            return response.json()
+
+        admin = register_user("admin@north.example.com", "admin", north)
+        north_student = register_user("student@north.example.com", "student", north)
+        south_student = register_user("student@south.example.com", "student", south)
+
+        date = (datetime.utcnow() + timedelta(days=7)).isoformat()
+        events = {}
+        for college_id, title in ((north, "North talk"), (south, "South talk")):
+            response = client.post("/events", json={"title": title, "type": "Workshop", "date": date, "college_id": college_id},
+                                   headers=headers(admin))
+            assert response.status_code == 200, response.text
+            events[college_id] = response.json()["id"]
+        # Ids are per shard, so the two events share one
+        assert events[north] == events[south]
+
+        # An anonymous list reads both shards and merges them
+        listed = client.get("/events").json()
+        assert sorted(row["title"] for row in listed) == ["North talk", "South talk"]
+
+        # A single event needs its college to find the shard
+        assert client.get(f"/events/{events[south]}").status_code == 400
+        assert client.get(f"/events/{events[south]}", params={"college_id": south}).json()["title"] == "South talk"
+
+        # The watermark has one id per shard and each moves on its own
+        for student, college_id in ((north_student, north), (south_student, south)):
+            response = client.post("/registrations", json={"event_id": events[college_id]}, headers=headers(student))
+            assert response.status_code == 200, response.text
+        watermark, exported = export(client, admin)
+        assert watermark == "1,1" and len(exported) == 2
+        late_student = register_user("late@north.example.com", "student", north)
+        assert client.post("/registrations", json={"event_id": events[north]}, headers=headers(late_student)).status_code == 200
+        watermark, exported = export(client, admin, watermark)
+        assert watermark == "1,2" and exported == [late_student["id"]]
+
+        # The North admin manages South events on the other shard
+        updated = client.put(f"/events/{events[south]}", params={"college_id": south}, json={"title": "South talk, moved"},
+                             headers=headers(admin))
+        assert updated.status_code == 200 and updated.json()["title"] == "South talk, moved"
+        assert client.get(f"/events/{events[north]}", params={"college_id": north}).json()["title"] == "North talk"
+        social = client.post("/events", json={"title": "South social", "type": "Social", "date": date, "college_id": south},
+                             headers=headers(admin)).json()["id"]
+        assert client.delete(f"/events/{social}", params={"college_id": south}, headers=headers(admin)).status_code == 200
+        assert client.get(f"/events/{social}", params={"college_id": south}).status_code == 404
+        assert sorted(row["title"] for row in client.get("/events").json()) == ["North talk", "South talk, moved"]
+
+if __name__ == "__main__":
+    run_scenario()
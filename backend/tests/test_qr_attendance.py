@@ -0,0 +1,68 @@
+"""Signed QR tokens stop checking anyone in once their registration is cancelled."""
+from conftest import auth_headers
+
+def register(client, student, event):
+    response = client.post("/registrations", json={"event_id": event.id}, headers=auth_headers(student))
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def qr_token(client, student, registration_id):
+    return client.get(f"/registrations/{registration_id}/qr-token", headers=auth_headers(student)).json()["qr_token"]
+
+def cancel(client, student, registration_id):
+    assert client.delete(f"/registrations/{registration_id}", headers=auth_headers(student)).status_code == 200
+
+def scan(client, admin, event, token):
+    return client.post("/attendance/qr", json={"event_id": event.id, "qr_data": token}, headers=auth_headers(admin))
+
+def test_token_of_a_cancelled_registration_is_refused(client, make_event):
+    event, admin, (student, *_) = make_event(max_attendees=None)
+    registration_id = register(client, student, event)
+    token = qr_token(client, student, registration_id)
+    cancel(client, student, registration_id)
+
+    response = scan(client, admin, event, token)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Target user is not registered for this event"
+
+def test_token_is_refused_when_its_registration_id_goes_to_someone_else(client, make_event):
+    event, admin, (student, other, _) = make_event(max_attendees=None)
+    registration_id = register(client, student, event)
+    token = qr_token(client, student, registration_id)
+    cancel(client, student, registration_id)
+    register(client, other, event)  # Under a fresh id; the old one must not resolve to anyone
+
+    assert scan(client, admin, event, token).status_code == 400
+    batch = client.post("/attendance/qr/batch", json={"event_id": event.id, "scans": [{"qr_data": token}]},
+                        headers=auth_headers(admin)).json()
+    assert batch["not_registered"] == 1 and batch["marked"] == 0
+
+def test_token_of_an_earlier_registration_is_refused_after_registering_again(client, make_event):
+    event, admin, (student, other, _) = make_event(max_attendees=None)
+    first_id = register(client, student, event)
+    old_token = qr_token(client, student, first_id)
+    register(client, other, event)
+    cancel(client, student, first_id)
+    second_id = register(client, student, event)
+    assert second_id != first_id
+
+    response = scan(client, admin, event, old_token)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "QR code is for a cancelled registration"
+    batch = client.post("/attendance/qr/batch", json={"event_id": event.id, "scans": [{"qr_data": old_token}]},
+                        headers=auth_headers(admin)).json()
+    assert batch["not_registered"] == 1
+    assert scan(client, admin, event, qr_token(client, student, second_id)).json()["success"] is True
+
+def test_gate_roster_forgets_cancelled_registrations(client, make_event):
+    event, admin, (student, other, _) = make_event(max_attendees=None)
+    registration_id = register(client, student, event)
+    token = qr_token(client, student, registration_id)
+    other_token = qr_token(client, other, register(client, other, event))
+    assert client.post(f"/events/{event.id}/gate", headers=auth_headers(admin)).status_code == 200
+    try:
+        cancel(client, student, registration_id)
+        assert scan(client, admin, event, token).status_code == 400
+        assert scan(client, admin, event, other_token).json()["success"] is True
+    finally:
+        client.delete(f"/events/{event.id}/gate", headers=auth_headers(admin))
@@ -0,0 +1,19 @@
+"""Activity rollups: the reconciler finds drifted rows and recounts them from the raw tables."""
+from crud import reconcile_activity_rollups
+from models import EventActivitySummary, StudentActivitySummary
+
+from conftest import auth_headers
+
+def test_reconcile_fixes_drifted_rows_and_leaves_the_rest(client, db, make_event):
+    event, _, (first, second, _) = make_event(max_attendees=None)
+    for student in (first, second):
+        assert client.post("/registrations", json={"event_id": event.id}, headers=auth_headers(student)).status_code == 200
+    reconcile_activity_rollups(db)  # events made by other tests' fixtures have no rollup rows yet
+    db.query(EventActivitySummary).filter(EventActivitySummary.event_id == event.id).update({"registration_count": 5})
+    db.query(StudentActivitySummary).filter(StudentActivitySummary.student_id == first.id).delete()
+    db.commit()
+
+    assert reconcile_activity_rollups(db) == 2
+    assert db.get(EventActivitySummary, event.id).registration_count == 2
+    assert db.get(StudentActivitySummary, first.id).registration_count == 1
+    assert reconcile_activity_rollups(db) == 0
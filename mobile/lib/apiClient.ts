@@ -52,14 +52,18 @@ export const authAPI = {
 };
 
 export const eventAPI = {
-  list: async () => {
-    const res = await apiClient.get('/events');
+  list: async (params?: { when?: 'upcoming' | 'past'; date_from?: string; date_to?: string; type?: string; college_id?: number; limit?: number; after_id?: number }) => {
+    const res = await apiClient.get('/events', { params });
     return res.data as any[];
   },
   get: async (eventId: number) => {
     const res = await apiClient.get(`/events/${eventId}`);
     return res.data;
   },
+  search: async (params: { q?: string; type?: string; college_id?: number; date_from?: string; date_to?: string; limit?: number; offset?: number }) => {
+    const res = await apiClient.get('/events/search', { params });
+    return res.data;
+  },
 };
 
 export const registrationAPI = {
@@ -67,8 +71,8 @@ export const registrationAPI = {
     const res = await apiClient.post('/registrations', { event_id: eventId });
     return res.data;
   },
-  mine: async () => {
-    const res = await apiClient.get('/registrations/my');
+  mine: async (expand?: string) => {
+    const res = await apiClient.get('/registrations/my', { params: expand ? { expand } : undefined });
     return res.data as any[];
   },
 };
@@ -78,8 +82,8 @@ export const attendanceAPI = {
     const res = await apiClient.post(`/attendance/qr/student?event_id=${eventId}`);
     return res.data as any;
   },
-  myAttendance: async () => {
-    const res = await apiClient.get('/attendance/my');
+  myAttendance: async (expand?: string) => {
+    const res = await apiClient.get('/attendance/my', { params: expand ? { expand } : undefined });
     return res.data as any[];
   },
   create: async (registrationId: number, eventId: number) => {
@@ -107,8 +111,8 @@ export const feedbackAPI = {
     });
     return res.data as any;
   },
-  mine: async () => {
-    const res = await apiClient.get('/feedback/my');
+  mine: async (expand?: string) => {
+    const res = await apiClient.get('/feedback/my', { params: expand ? { expand } : undefined });
     return res.data as any[];
   },
 };
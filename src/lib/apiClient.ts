@@ -83,8 +83,15 @@ export const collegeAPI = {
 
 // Event API
 export const eventAPI = {
-  getEvents: async (skip = 0, limit = 100) => {
-    const response = await apiClient.get(`/events?skip=${skip}&limit=${limit}`);
+  // Students get their own college's events unless college_id says otherwise
+  getEvents: async (skip = 0, limit = 100, filters?: {
+    when?: 'upcoming' | 'past';
+    date_from?: string;
+    date_to?: string;
+    type?: string;
+    college_id?: number;
+  }) => {
+    const response = await apiClient.get('/events', { params: { skip, limit, ...filters } });
     return response.data;
   },
 
@@ -93,6 +100,67 @@ export const eventAPI = {
     return response.data;
   },
 
+  // Live registration/check-in counts over Server-Sent Events (admins only);
+  // returns a function that closes the stream. Read with fetch because
+  // EventSource can't send the Authorization header.
+  subscribeToEventCounters: (eventId: number, onUpdate: (counters: {
+    event_id: number;
+    registered: number;
+    checked_in: number;
+    capacity: number | null;
+    remaining: number | null;
+  }) => void, collegeId?: number) => {
+    const query = collegeId !== undefined ? `?college_id=${collegeId}` : '';
+    const controller = new AbortController();
+    const token = localStorage.getItem('access_token');
+    (async () => {
+      const response = await fetch(`${API_BASE_URL}/events/${eventId}/live${query}`, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
+        signal: controller.signal,
+      });
+      if (!response.ok || !response.body) {
+        return;
+      }
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) {
+          return;
+        }
+        buffer += value;
+        // Messages end with a blank line; keep-alive comments start with ':'
+        const messages = buffer.split('\n\n');
+        buffer = messages.pop() ?? '';
+        for (const message of messages) {
+          const lines = message.split('\n');
+          if (lines.includes('event: counters')) {
+            const data = lines.filter((line) => line.startsWith('data: ')).map((line) => line.slice(6)).join('\n');
+            onUpdate(JSON.parse(data));
+          }
+        }
+      }
+    })().catch((error) => {
+      if (error?.name !== 'AbortError') {
+        console.error('Live counters stream failed', error);
+      }
+    });
+    return () => controller.abort();
+  },
+
+  searchEvents: async (params: {
+    q?: string;
+    type?: string;
+    college_id?: number;
+    date_from?: string;
+    date_to?: string;
+    limit?: number;
+    offset?: number;
+  }) => {
+    const response = await apiClient.get('/events/search', { params });
+    return response.data;
+  },
+
   createEvent: async (eventData: {
     title: string;
     description?: string;
@@ -127,8 +195,9 @@ export const eventAPI = {
 
 // Registration API
 export const registrationAPI = {
-  getMyRegistrations: async () => {
-    const response = await apiClient.get('/registrations/my');
+  // expand: 'event' or 'event,college' nests each row's event in the same request
+  getMyRegistrations: async (expand?: string) => {
+    const response = await apiClient.get('/registrations/my', { params: expand ? { expand } : undefined });
     return response.data;
   },
 
@@ -137,16 +206,27 @@ export const registrationAPI = {
     return response.data;
   },
 
-  createRegistration: async (eventId: number) => {
-    const response = await apiClient.post('/registrations', { event_id: eventId });
+  // joinWaitlist: when the event is full, queue for a seat (202 with a position) instead of a 409
+  createRegistration: async (eventId: number, joinWaitlist = false) => {
+    const response = await apiClient.post('/registrations', { event_id: eventId, join_waitlist: joinWaitlist });
+    return response.data;
+  },
+
+  cancelRegistration: async (registrationId: number) => {
+    const response = await apiClient.delete(`/registrations/${registrationId}`);
+    return response.data;
+  },
+
+  leaveWaitlist: async (eventId: number) => {
+    const response = await apiClient.delete(`/events/${eventId}/waitlist`);
     return response.data;
   },
 };
 
 // Attendance API
 export const attendanceAPI = {
-  getMyAttendance: async () => {
-    const response = await apiClient.get('/attendance/my');
+  getMyAttendance: async (expand?: string) => {
+    const response = await apiClient.get('/attendance/my', { params: expand ? { expand } : undefined });
     return response.data;
   },
 
@@ -180,8 +260,8 @@ export const attendanceAPI = {
 
 // Feedback API
 export const feedbackAPI = {
-  getMyFeedback: async () => {
-    const response = await apiClient.get('/feedback/my');
+  getMyFeedback: async (expand?: string) => {
+    const response = await apiClient.get('/feedback/my', { params: expand ? { expand } : undefined });
     return response.data;
   },
 